@@ -168,6 +168,7 @@ default_parameters = {
 			'complianceCurrent':		{'type':'float',                   'units':'A',  'default': 100e-6, 'title':'Compliance Current', 'description':'Maximum current limit for the SMU.'},
 			'gateVoltage':				{'type':'float', 'essential':True, 'units':'V',  'default': 0,      'title':'Gate Voltage',       'description':'Gate voltage value.'},
 			'drainVoltage':				{'type':'float', 'essential':True, 'units':'V',  'default': 0.5,    'title':'Drain Voltage',      'description':'Drain voltage value.'}, 
+			'saveBinaryResults':		{'type':'bool',                                  'default': False,  'title':'Save Binary Results', 'description':'Store the measured arrays in a compact binary file next to the data file instead of as JSON text.'},
 		},
 		'NoiseGrid':{
 			'dependencies':				{'ignore':True, 'value':['NoiseCollection']},
@@ -324,6 +325,8 @@ default_parameters = {
 	},
 	'dataFolder':          {'type':'string', 'default':'../../AutexysData/',     'title':'Data Folder',           'description':''},
 	'experimentSubFolder': {'type':'string', 'default':EXPERIMENT_FOLDER_PREFIX, 'title':'Experiment Sub-Folder', 'description':''},
+	'prerenderPlots':      {'type':'bool',   'default':True,                    'title':'Pre-render Plots',      'description':'When the experiment finishes, render its most important plots in the background so they open instantly in the Browser.'},
+	'livePlotUpdateInterval': {'type':'float', 'default':0.05,                  'title':'Live-Plot Update Interval', 'description':'Number of seconds that live-plot points are collected over before being sent to the UI together. Use 0 to send every point as soon as it is measured.'},
 	'ParametersFormatVersion': {'default': 4},	
 	'Deployment': {'default': 'Development' if(INCLUDE_EVERYTHING) else 'Production'}
 }
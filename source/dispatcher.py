@@ -34,6 +34,9 @@ def dispatch(input_command, workspace_data_path=None, connection_status=None, sh
 	except Exception as e:
 		logging.exception(f'[D] Error: {e}')
 		raise
+	finally:
+		pipes.flushLiveUpdates(share)
+		launcher.closeConnectionPool()
 
 def run_file(schedule_file_path, workspace_data_path=None, connection_status=None, share=None):
 	"""Given a shedule file path, open the file and step through each experiment."""
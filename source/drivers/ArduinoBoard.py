@@ -63,6 +63,23 @@ class ArduinoSerial:
 				response = self.ser.readline().decode(encoding='UTF-8')
 		return response
 
+	def checkConnection(self, timeout=2):
+		# Discard anything left unread by an interrupted job, then ask the board to answer 'CONN!' again (its reply starts with '#')
+		try:
+			self.ser.reset_input_buffer()
+			self.writeSerial('CONN!')
+			deadline = time.time() + timeout
+			while(time.time() < deadline):
+				response = self.ser.readline().decode(encoding='UTF-8')
+				if(response.startswith('#')):
+					return True
+			return False
+		except:
+			return False
+
+	def disconnect(self):
+		self.ser.close()
+
 	def takeMeasurement(self):
 		self.writeSerial("MEAS!")
 		response = self.getResponse(startsWith='{')
@@ -78,6 +95,13 @@ class NullArduinoSerial(ArduinoSerial):
 	def __init__(self):
 		pass
 
+	# Never reused, so that an Arduino plugged in during a schedule is found by the next job
+	def checkConnection(self):
+		return False
+
+	def disconnect(self):
+		pass
+
 	def takeMeasurement(self):
 		return {}
 
@@ -4,6 +4,7 @@ connected to and the ports/MAC addresses need to connect."""
 # === Imports ===
 
 import ast
+import contextlib
 import random
 
 import serial as pySerial
@@ -22,6 +23,14 @@ import copy
 
 NON_BLUETOOTH_PORT_SIGNATURE = 'usb'
 
+# Longest program message sent by B2900A.commandBatch(), kept well below the size of the instrument's input buffer (a longer command, like a list sweep, is sent on its own)
+SCPI_BATCH_MAX_BYTES = 1024
+
+# Streamed sweeps of the B2900A are read from its trace buffers, which hold at most B2900A_TRACE_MAX_POINTS points per channel
+B2900A_TRACE_MAX_POINTS = 100000
+STREAM_SWEEP_POLL_INTERVAL = 0.5
+STREAM_SWEEP_MAX_CHUNK_POINTS = 10000
+
 
 
 # === Connection Status API ===
@@ -76,7 +85,14 @@ def availableConnections(includePySerial=True, includeVisa=True):
 	
 	return available_connections
 
-def testConnection(connected_system, silent_disconnect=False):
+def testConnection(connected_system, silent_disconnect=False, smu_instance=None):
+	# An open connection (e.g. one kept in the launcher's connection pool) is checked without opening a second connection to the system
+	if(smu_instance is not None):
+		try:
+			return smu_instance.checkConnection() and authenticateConnection(smu_instance)
+		except:
+			return False
+	
 	if((connected_system is None) or ('type' not in connected_system)):
 		return False
 	
@@ -185,6 +201,12 @@ class SourceMeasureUnit:
 	def disconnect(self, silent=False):
 		raise NotImplementedError("Please implement SourceMeasureUnit.disconnect()")
 	
+	def checkConnection(self):
+		raise NotImplementedError("Please implement SourceMeasureUnit.checkConnection()")
+	
+	def resetForNextJob(self, defaultComplianceCurrent=100e-6, smuTimeout=60000):
+		raise NotImplementedError("Please implement SourceMeasureUnit.resetForNextJob()")
+	
 	# --- Measurement Channels ---
 	def setComplianceCurrent(self, complianceCurrent):
 		raise NotImplementedError("Please implement SourceMeasureUnit.setComplianceCurrent()")
@@ -222,6 +244,12 @@ class SourceMeasureUnit:
 	def takeSweep(self, src1start, src1stop, src2start, src2stop, points, triggerInterval=None, src1vals=None, src2vals=None):
 		raise NotImplementedError("Please implement SourceMeasureUnit.takeSweep()")
 	
+	def streamSweep(self, src1start, src1stop, src2start, src2stop, points, triggerInterval=None, src1vals=None, src2vals=None, includeCurrents=True, includeVoltages=True, includeTimes=True):
+		"""Generator that yields the data of a sweep in chunks (dictionaries of numpy arrays with the same keys as takeSweep) while it is
+		being measured. Systems that cannot read a sweep before it finishes yield all of it as one chunk."""
+		results = self.takeSweep(src1start, src1stop, src2start, src2stop, points, triggerInterval=triggerInterval, src1vals=src1vals, src2vals=src2vals)
+		yield {key:(np.array(values) if(values is not None) else None) for key, values in results.items()}
+	
 	# --- Specific Channel Measurement ---
 	def getVds(self):
 		return self.takeMeasurement()['V_ds']
@@ -354,53 +382,120 @@ class B2900A(SourceMeasureUnit):
 		self.system_id = visa_id
 		self.system_settings = system_settings
 		self.use_binary = False
-		self.initialize()
-		self.setComplianceCurrent(defaultComplianceCurrent)
+		self.batched_commands = None
+		self.batch_depth = 0
+		with self.commandBatch():
+			self.initialize()
+			self.setComplianceCurrent(defaultComplianceCurrent)
 	
 	# --- Internal ---
-	def initialize(self):
-		if((self.system_settings is not None) and ('reset' in self.system_settings) and (not self.system_settings['reset'])):
-			pass # don't reset on startup if you are specifically told not to by the system settings
+	def write(self, command):
+		if(self.batched_commands is not None):
+			self.batched_commands.append(command)
 		else:
-			self.clearAndDisarm()
-			self.smu.write('*CLS') # Clear
-			self.smu.write("*RST") # Reset
+			self.smu.write(command)
+	
+	def query(self, command):
+		self.flushCommandBatch()
+		return self.smu.query(command)
+	
+	@contextlib.contextmanager
+	def commandBatch(self, checkErrors=True):
+		"""Collect the commands written inside this block and send them as few semicolon-joined program messages (of at most
+		SCPI_BATCH_MAX_BYTES) when it ends, followed by one check of the error queue. A query inside the block sends the commands
+		collected so far first, so commands still reach the instrument in order. Batches can be nested; the outermost one sends.
+		Setting 'batchCommands' to False in the system settings sends every command on its own instead."""
+		if((self.system_settings is not None) and (not self.system_settings.get('batchCommands', True))):
+			yield
+			return
 		
-		self.smu.write(':system:lfrequency 60')
+		if(self.batch_depth == 0):
+			self.batched_commands = []
+		self.batch_depth += 1
+		completed = False
+		try:
+			yield
+			completed = True
+		finally:
+			self.batch_depth -= 1
+			if(self.batch_depth == 0):
+				commands_sent = self.flushCommandBatch()
+				self.batched_commands = None
+				if(completed and checkErrors and (commands_sent > 0)):
+					self.checkErrorQueue()
+	
+	def flushCommandBatch(self):
+		"""Send the commands collected by commandBatch() so far, and return how many were sent."""
+		if(not self.batched_commands):
+			return 0
+		commands = self.batched_commands
+		self.batched_commands = []
 		
-		self.smu.write(':sense1:curr:range:auto ON')
-		self.smu.write(':sense1:curr:range:auto:llim 1e-8')
-		# self.smu.write(':sense1:curr:range 10E-6')
+		message = ''
+		for command in commands:
+			# Joined commands need a leading ':' so that each one starts from the root of the command tree
+			command = command if(command[:1] in [':', '*']) else (':' + command)
+			if((message != '') and (len(message) + 1 + len(command) > SCPI_BATCH_MAX_BYTES)):
+				self.smu.write(message)
+				message = ''
+			message = (message + ';' + command) if(message != '') else (command)
+		self.smu.write(message)
+		return len(commands)
+	
+	def checkErrorQueue(self):
+		errors = self.query(':system:error:all?').strip()
+		if(not errors.startswith(('+0,', '0,'))):
+			print('B2900A reported errors: ' + str(errors))
+		return errors
+	
+	def initialize(self):
+		with self.commandBatch():
+			if((self.system_settings is not None) and ('reset' in self.system_settings) and (not self.system_settings['reset'])):
+				pass # don't reset on startup if you are specifically told not to by the system settings
+			else:
+				self.clearAndDisarm()
+				self.write('*CLS') # Clear
+				self.write("*RST") # Reset
+		
+			self.configure()
+	
+	def configure(self):
+		self.write(':system:lfrequency 60')
+		self.setBinaryDataTransfer(self.system_settings.get('binaryDataTransfer', True) if(self.system_settings is not None) else True)
+		
+		self.write(':sense1:curr:range:auto ON')
+		self.write(':sense1:curr:range:auto:llim 1e-8')
+		# self.write(':sense1:curr:range 10E-6')
 		
-		self.smu.write(':sense2:curr:range:auto ON')
-		self.smu.write(':sense2:curr:range:auto:llim 1e-8')
-		# self.smu.write(':sense2:curr:range 10E-6')
+		self.write(':sense2:curr:range:auto ON')
+		self.write(':sense2:curr:range:auto:llim 1e-8')
+		# self.write(':sense2:curr:range 10E-6')
 		
 		if ((self.system_settings is not None) and ('channel1SourceMode' in self.system_settings)):
 			self.setChannel1SourceMode(self.system_settings['channel1SourceMode'])
 			self.setChannel2SourceMode(self.system_settings['channel2SourceMode'])
 		else:
-			self.smu.write(":source1:function:mode voltage")
-			self.smu.write(":source2:function:mode voltage")
+			self.write(":source1:function:mode voltage")
+			self.write(":source2:function:mode voltage")
 			
-			self.smu.write(":source1:voltage 0.0")
-			self.smu.write(":source2:voltage 0.0")
+			self.write(":source1:voltage 0.0")
+			self.write(":source2:voltage 0.0")
 		
-		self.smu.write(":sense1:curr:nplc 1")
-		self.smu.write(":sense2:curr:nplc 1")
+		self.write(":sense1:curr:nplc 1")
+		self.write(":sense2:curr:nplc 1")
 		
 		if ((self.system_settings is not None) and ('turnChannelsOn' in self.system_settings) and (self.system_settings['turnChannelsOn'])):
-			self.smu.write(":outp1 ON")
-			self.smu.write(":outp2 ON")
+			self.write(":outp1 ON")
+			self.write(":outp2 ON")
 		
-		self.smu.write("*WAI") # Explicitly wait for all of these commands to finish before handling new commands
+		self.write("*WAI") # Explicitly wait for all of these commands to finish before handling new commands
 	
 	def setTimeout(self, timeout_ms=60000):
 		self.smu.timeout = timeout_ms
 	
 	# --- Communication ---
 	def setParameter(self, parameter):
-		self.smu.write(parameter)
+		self.write(parameter)
 	
 	def setDevice(self, deviceID):
 		pass
@@ -411,6 +506,44 @@ class B2900A(SourceMeasureUnit):
 	def disconnect(self, silent=False):
 		pass
 	
+	def checkConnection(self, timeout_ms=5000):
+		# Clear anything left in the output buffer by an interrupted job first, so that the reply read here is the reply to '*OPC?'
+		previous_timeout = self.smu.timeout
+		try:
+			self.smu.timeout = timeout_ms
+			self.clearAndDisarm()
+			return (self.query('*OPC?').strip() == '1')
+		except:
+			return False
+		finally:
+			self.smu.timeout = previous_timeout
+	
+	def resetForNextJob(self, defaultComplianceCurrent=100e-6, smuTimeout=60000):
+		"""Undo the settings a job may have changed (instead of a full *RST): data format, timeout, sweep and list sources, arm and trigger
+		setup, and the configuration done by initialize()."""
+		with self.commandBatch():
+			self.clearAndDisarm()
+			self.write('*CLS')
+			self.setTimeout(smuTimeout)
+		
+			self.write(":source1:{}:mode fixed".format(self.source1_mode))
+			self.write(":source2:{}:mode fixed".format(self.source2_mode))
+			self.write(':arm1:acq:count 1')
+			self.write(':arm2:acq:count 1')
+			self.write(':arm1:all:source:signal aint')
+			self.write(':arm2:all:source:signal aint')
+			self.write(':trigger1:all:source:signal aint')
+			self.write(':trigger2:all:source:signal aint')
+			self.write(':trigger1:count 1')
+			self.write(':trigger2:count 1')
+			self.write(':trace1:feed:control never')
+			self.write(':trace2:feed:control never')
+			self.write(':format:elements:sense volt,curr,res,time,stat,sour')
+		
+			self.configure()
+			self.setNPLC(1)
+			self.setComplianceCurrent(defaultComplianceCurrent)
+	
 	# --- Measurement Channels ---	
 	def setComplianceCurrent(self, complianceCurrent=100e-6):
 		self.setParameter(":sense1:curr:prot {}".format(complianceCurrent))
@@ -441,10 +574,11 @@ class B2900A(SourceMeasureUnit):
 		self.setParameter(":output2 OFF")
 	
 	def setNPLC(self, nplc=1):
-		self.setParameter(":sense1:curr:nplc {}".format(nplc))
-		self.setParameter(":sense1:volt:nplc {}".format(nplc))
-		self.setParameter(":sense2:curr:nplc {}".format(nplc))
-		self.setParameter(":sense2:volt:nplc {}".format(nplc))	
+		with self.commandBatch():
+			self.setParameter(":sense1:curr:nplc {}".format(nplc))
+			self.setParameter(":sense1:volt:nplc {}".format(nplc))
+			self.setParameter(":sense2:curr:nplc {}".format(nplc))
+			self.setParameter(":sense2:volt:nplc {}".format(nplc))	
 
 	def turnAutoRangingOn(self):
 		self.setParameter(':sense1:curr:range:auto ON')
@@ -487,22 +621,25 @@ class B2900A(SourceMeasureUnit):
 	
 	# --- Measure ---	
 	def setBinaryDataTransfer(self, useBinary=True):
-		if useBinary and not self.use_binary:
-			self.smu.write(':form real,32')
-			self.smu.write(':form:border swap')
-			self.smu.values_format.use_binary('d', False, list)
-		
-		if not useBinary and self.use_binary:
-			self.smu.write(':form asc')
-			self.smu.write(':form:border norm')
-			self.smu.values_format.use_ascii('f', ',', list)
+		"""Choose whether measurements are read as 64-bit binary floats (the default, set up by configure()) or as ASCII text. Either way,
+		query_values() returns numpy arrays."""
+		with self.commandBatch(checkErrors=False):
+			if(useBinary):
+				self.write(':form real,64')
+				self.write(':form:border swap')
+				self.smu.values_format.use_binary('d', False, np.array)
+			else:
+				self.write(':form asc')
+				self.write(':form:border norm')
+				self.smu.values_format.use_ascii('f', ',', np.array)
 		
 		self.use_binary = useBinary
 		
 	def query_values(self, query):
+		self.flushCommandBatch()
 		if(self.use_binary):
-			return self.smu.query_binary_values(query)
-		return self.smu.query_ascii_values(query)
+			return self.smu.query_binary_values(query, datatype='d', is_big_endian=False, container=np.array)
+		return self.smu.query_ascii_values(query, container=np.array)
 	
 	def takeMeasurement(self, retries=3):
 		for i in range(retries):
@@ -532,58 +669,63 @@ class B2900A(SourceMeasureUnit):
 	# --- Sweep ---
 	# SWEEP: configure all hardware settings to prepare a sweep
 	def setupSweep(self, src1start, src1stop, src2start, src2stop, points, triggerInterval=None, src1vals=None, src2vals=None):
-		points = int(points)
+		with self.commandBatch():
+			points = int(points)
 		
-		# Set up voltages to apply
-		if src1vals is None:
-			self.smu.write(":source1:{}:mode sweep".format(self.source1_mode))
-			self.smu.write(":source1:{}:start {}".format(self.source1_mode, src1start))
-			self.smu.write(":source1:{}:stop {}".format(self.source1_mode, src1stop)) 
-			self.smu.write(":source1:{}:points {}".format(self.source1_mode, points))
-		else:
-			self.smu.write(':source1:{}:mode list'.format(self.source1_mode))
-			self.smu.write(':source1:list:{} {}'.format(self.source2_mode, ','.join(map(str, src1vals))))
-		
-		if src2vals is None:
-			self.smu.write(":source2:{}:mode sweep".format(self.source2_mode))
-			self.smu.write(":source2:{}:start {}".format(self.source2_mode, src2start))
-			self.smu.write(":source2:{}:stop {}".format(self.source2_mode, src2stop)) 
-			self.smu.write(":source2:{}:points {}".format(self.source2_mode, points))
-		else:
-			self.smu.write(':source2:{}:mode list'.format(self.source2_mode))
-			self.smu.write(':source2:list:{} {}'.format(self.source2_mode, ','.join(map(str, src2vals))))
-		
-		# Set up number of measurements to take
-		if triggerInterval is None:
-			self.smu.write(":trigger1:source aint")
-			self.smu.write(":trigger1:count {}".format(points))
-			self.smu.write(":trigger2:source aint")
-			self.smu.write(":trigger2:count {}".format(points))
-			timeToTakeMeasurements = (self.nplc)*(points/self.measurementsPerSecond)
-		else:
-			self.smu.write(":trigger1:source timer")
-			self.smu.write(":trigger1:timer {}".format(triggerInterval))
-			self.smu.write(":trigger1:count {}".format(points))
-			self.smu.write(":trigger2:source timer")
-			self.smu.write(":trigger2:timer {}".format(triggerInterval))
-			self.smu.write(":trigger2:count {}".format(points))
-			timeToTakeMeasurements = (triggerInterval*points)
+			# Set up voltages to apply
+			if src1vals is None:
+				self.write(":source1:{}:mode sweep".format(self.source1_mode))
+				self.write(":source1:{}:start {}".format(self.source1_mode, src1start))
+				self.write(":source1:{}:stop {}".format(self.source1_mode, src1stop)) 
+				self.write(":source1:{}:points {}".format(self.source1_mode, points))
+			else:
+				self.write(':source1:{}:mode list'.format(self.source1_mode))
+				self.write(':source1:list:{} {}'.format(self.source2_mode, ','.join(map(str, src1vals))))
 		
-		self.smu.write("*WAI")
+			if src2vals is None:
+				self.write(":source2:{}:mode sweep".format(self.source2_mode))
+				self.write(":source2:{}:start {}".format(self.source2_mode, src2start))
+				self.write(":source2:{}:stop {}".format(self.source2_mode, src2stop)) 
+				self.write(":source2:{}:points {}".format(self.source2_mode, points))
+			else:
+				self.write(':source2:{}:mode list'.format(self.source2_mode))
+				self.write(':source2:list:{} {}'.format(self.source2_mode, ','.join(map(str, src2vals))))
 		
-		return timeToTakeMeasurements
+			# Set up number of measurements to take
+			if triggerInterval is None:
+				self.write(":trigger1:source aint")
+				self.write(":trigger1:count {}".format(points))
+				self.write(":trigger2:source aint")
+				self.write(":trigger2:count {}".format(points))
+				timeToTakeMeasurements = (self.nplc)*(points/self.measurementsPerSecond)
+			else:
+				self.write(":trigger1:source timer")
+				self.write(":trigger1:timer {}".format(triggerInterval))
+				self.write(":trigger1:count {}".format(points))
+				self.write(":trigger2:source timer")
+				self.write(":trigger2:timer {}".format(triggerInterval))
+				self.write(":trigger2:count {}".format(points))
+				timeToTakeMeasurements = (triggerInterval*points)
+		
+			self.write("*WAI")
+		
+			return timeToTakeMeasurements
 	
 	# SWEEP: trigger a sweep to begin
 	def initSweep(self):
-		self.smu.write(":init (@1:2)")
-		self.smu.write("*WAI")
+		# Called for every line of a scan, so the error queue is not checked here
+		with self.commandBatch(checkErrors=False):
+			self.write(":init (@1:2)")
+			self.write("*WAI")
 	
 	# SWEEP: Setup and trigger a sweep to begin
 	def startSweep(self, src1start, src1stop, src2start, src2stop, points, triggerInterval=None, src1vals=None, src2vals=None):
 		timeToTakeMeasurements = self.setupSweep(src1start, src1stop, src2start, src2stop, points, triggerInterval=triggerInterval, src1vals=src1vals, src2vals=src2vals)
 		
-		self.smu.write("*WAI")
-		self.initSweep()
+		# The error queue is not checked after starting the sweep, since that query would wait for the whole sweep to finish
+		with self.commandBatch(checkErrors=False):
+			self.write("*WAI")
+			self.initSweep()
 		
 		return timeToTakeMeasurements
 	
@@ -609,8 +751,9 @@ class B2900A(SourceMeasureUnit):
 			timestamps = None
 		
 		if(endMode is not None):
-			self.smu.write(":source1:{}:mode {}".format(self.source1_mode, endMode))
-			self.smu.write(":source2:{}:mode {}".format(self.source2_mode, endMode))
+			with self.commandBatch(checkErrors=False):
+				self.write(":source1:{}:mode {}".format(self.source1_mode, endMode))
+				self.write(":source2:{}:mode {}".format(self.source2_mode, endMode))
 		
 		return {
 			'Vds_data': voltage1s,
@@ -628,6 +771,79 @@ class B2900A(SourceMeasureUnit):
 		
 		return self.endSweep(endMode='fixed', includeCurrents=includeCurrents, includeVoltages=includeVoltages, includeTimes=includeTimes)
 	
+	# SWEEP: Perform a hardware-driven sweep, reading its data from the trace buffers while it is being measured
+	def streamSweep(self, src1start, src1stop, src2start, src2stop, points, triggerInterval=None, src1vals=None, src2vals=None, includeCurrents=True, includeVoltages=True, includeTimes=True, pollInterval=STREAM_SWEEP_POLL_INTERVAL, maxChunkPoints=STREAM_SWEEP_MAX_CHUNK_POINTS, timeout=None):
+		"""Generator that starts a sweep and, every pollInterval seconds, yields the points measured since the last chunk (at most
+		maxChunkPoints at a time) as a dictionary of numpy arrays with the same keys as endSweep. Stops early with a warning if no new
+		points arrive for timeout seconds (by default, the expected length of the sweep plus 10 seconds). If the generator is closed before
+		the sweep is finished, the sweep is aborted."""
+		points = int(points)
+		if(points > B2900A_TRACE_MAX_POINTS):
+			raise ValueError('B2900A can stream at most {} points per sweep, not {}.'.format(B2900A_TRACE_MAX_POINTS, points))
+		if(not isinstance(includeCurrents, list)):
+			includeCurrents = [includeCurrents, includeCurrents]
+		if(not isinstance(includeVoltages, list)):
+			includeVoltages = [includeVoltages, includeVoltages]
+		
+		# Timestamps are taken from channel 2, like endSweep()
+		channels = [channel for channel in [1, 2] if(includeCurrents[channel-1] or includeVoltages[channel-1] or (includeTimes and (channel == 2)))]
+		
+		with self.commandBatch():
+			for channel in channels:
+				self.write(':trace{}:feed:control never'.format(channel))
+				self.write(':trace{}:clear'.format(channel))
+				self.write(':trace{}:points {}'.format(channel, points))
+				self.write(':trace{}:feed sens'.format(channel))
+				self.write(':trace{}:feed:control next'.format(channel))
+			self.write(':format:elements:sense volt,curr,time')
+			timeToTakeMeasurements = self.setupSweep(src1start, src1stop, src2start, src2stop, points, triggerInterval=triggerInterval, src1vals=src1vals, src2vals=src2vals)
+		
+		# Started without the '*WAI' of initSweep(), which would hold back the queries that read the trace buffers until the sweep is finished
+		self.write(':init (@1:2)')
+		
+		timeout = (timeToTakeMeasurements + 10) if(timeout is None) else (timeout)
+		pointsRead = 0
+		lastProgressTime = time.time()
+		try:
+			while(pointsRead < points):
+				time.sleep(min(pollInterval, max(timeToTakeMeasurements, 0.01)))
+				pointsMeasured = min(int(float(self.query(':trace{}:points:actual?'.format(channel)))) for channel in channels)
+				if(pointsMeasured <= pointsRead):
+					if(time.time() - lastProgressTime > timeout):
+						print('B2900A sweep stopped after {} of {} points.'.format(pointsRead, points))
+						break
+					continue
+				
+				while(pointsRead < pointsMeasured):
+					chunkPoints = min(pointsMeasured - pointsRead, maxChunkPoints)
+					yield self.readTraceChunk(pointsRead, chunkPoints, includeCurrents, includeVoltages, includeTimes)
+					pointsRead += chunkPoints
+				lastProgressTime = time.time()
+		finally:
+			if(pointsRead < points):
+				self.clearAndDisarm()
+			with self.commandBatch():
+				for channel in channels:
+					self.write(':trace{}:feed:control never'.format(channel))
+				self.write(':format:elements:sense volt,curr,res,time,stat,sour')
+				self.write(":source1:{}:mode fixed".format(self.source1_mode))
+				self.write(":source2:{}:mode fixed".format(self.source2_mode))
+	
+	def readTraceChunk(self, offset, size, includeCurrents, includeVoltages, includeTimes):
+		"""Read points offset to offset+size of the trace buffers filled by streamSweep(), which hold (voltage, current, time) for each point."""
+		traces = {}
+		for channel in [1, 2]:
+			if(includeCurrents[channel-1] or includeVoltages[channel-1] or (includeTimes and (channel == 2))):
+				traces[channel] = self.query_values(':trace{}:data? {},{}'.format(channel, offset, size)).reshape(-1, 3)
+		
+		return {
+			'Vds_data': traces[1][:,0] if(includeVoltages[0]) else None,
+			'Id_data':  traces[1][:,1] if(includeCurrents[0]) else None,
+			'Vgs_data': traces[2][:,0] if(includeVoltages[1]) else None,
+			'Ig_data':  traces[2][:,1] if(includeCurrents[1]) else None,
+			'timestamps': traces[2][:,2] if(includeTimes) else None
+		}
+	
 	# --- Arm ---
 	def arm(self, count=1):
 		"""Arm the instrument.
@@ -637,64 +853,68 @@ class B2900A(SourceMeasureUnit):
 		:param count: The number of hardware triggers that can be recieved before returning to the idle state. This can be float('inf') for a permanent armed state.
 		:type count: int, float"""
 		
-		print('Arming the instrument')
+		with self.commandBatch():
+			print('Arming the instrument')
 		
-		if count != float('inf'):
-			count = int(count)
+			if count != float('inf'):
+				count = int(count)
 		
-		self.smu.write(':arm1:acq:count {}'.format(count))
-		self.smu.write(':arm2:acq:count {}'.format(count))
+			self.write(':arm1:acq:count {}'.format(count))
+			self.write(':arm2:acq:count {}'.format(count))
 	
 	def clearAndDisarm(self):
+		self.flushCommandBatch()
 		self.smu.clear()
-		self.smu.write(':abort:all (@1,2)')
+		self.write(':abort:all (@1,2)')
 	
 	def enableHardwareTriggerReception(self, pin=1):
 		"""Configure the instrument to enable the reception of hardware triggers whenever it is armed."""
 		
-		print('Enabling hardware trigger reception on pin {}'.format(pin))
+		with self.commandBatch():
+			print('Enabling hardware trigger reception on pin {}'.format(pin))
 		
-		# Configure the digital pin
-		self.smu.write(':source:digital:ext{}:function tinp'.format(pin))
-		self.smu.write(':source:digital:ext{}:polarity pos'.format(pin))
-		self.smu.write(':source:digital:ext{}:toutput:type level'.format(pin))
-		self.smu.write(':source:digital:ext{}:toutput:width 0.01'.format(pin))
+			# Configure the digital pin
+			self.write(':source:digital:ext{}:function tinp'.format(pin))
+			self.write(':source:digital:ext{}:polarity pos'.format(pin))
+			self.write(':source:digital:ext{}:toutput:type level'.format(pin))
+			self.write(':source:digital:ext{}:toutput:width 0.01'.format(pin))
 		
-		# Set the input pin as the trigger source
-		self.smu.write(':trigger1:acq:source:signal ext{}'.format(pin))
-		self.smu.write(':trigger2:acq:source:signal ext{}'.format(pin))
+			# Set the input pin as the trigger source
+			self.write(':trigger1:acq:source:signal ext{}'.format(pin))
+			self.write(':trigger2:acq:source:signal ext{}'.format(pin))
 	
 	def enableHardwareArmReception(self, pin=1):
 		"""Configure the instrument to enable the reception of hardware arm events whenever it is initiated."""
 		
-		print('Enabling hardware arm reception on pin {}'.format(pin))
+		with self.commandBatch():
+			print('Enabling hardware arm reception on pin {}'.format(pin))
 		
-		# Configure the digital pin
-		self.smu.write(':source:digital:ext{}:function tinp'.format(pin))
-		self.smu.write(':source:digital:ext{}:polarity pos'.format(pin))
-		self.smu.write(':source:digital:ext{}:toutput:type level'.format(pin))
-		self.smu.write(':source:digital:ext{}:toutput:width 0.01'.format(pin))
+			# Configure the digital pin
+			self.write(':source:digital:ext{}:function tinp'.format(pin))
+			self.write(':source:digital:ext{}:polarity pos'.format(pin))
+			self.write(':source:digital:ext{}:toutput:type level'.format(pin))
+			self.write(':source:digital:ext{}:toutput:width 0.01'.format(pin))
 		
-		# Set the input pin as the trigger source
-		self.smu.write(':arm1:all:source:signal ext{}'.format(pin))
-		self.smu.write(':arm2:all:source:signal ext{}'.format(pin))
+			# Set the input pin as the trigger source
+			self.write(':arm1:all:source:signal ext{}'.format(pin))
+			self.write(':arm2:all:source:signal ext{}'.format(pin))
 	
 	# --- Digital GPIO ---
 	def digitalWrite(self, pin, signal):
 		if pin < 0:
 			return
 		
-		prior = self.smu.query(':source:digital:data?')
+		prior = self.query(':source:digital:data?')
 		decBin = pow(2, pin-1)
 		
-		self.smu.write(":format:digital ascii")
-		self.smu.write(":source:digital:external" + str(pin) + ":function DIO")
-		self.smu.write(":source:digital:external" + str(pin) + ":polarity positive")
+		self.write(":format:digital ascii")
+		self.write(":source:digital:external" + str(pin) + ":function DIO")
+		self.write(":source:digital:external" + str(pin) + ":polarity positive")
 		if signal == "HIGH":
-			self.smu.write(":source:digital:data " + str(int(prior) | decBin))
+			self.write(":source:digital:data " + str(int(prior) | decBin))
 		
 		elif signal == "LOW":
-			self.smu.write(":source:digital:data " + str(int(prior) & ~decBin))
+			self.write(":source:digital:data " + str(int(prior) & ~decBin))
 		
 
 
@@ -792,6 +1012,13 @@ class PCB_System(SourceMeasureUnit):
 			self.setParameter('deactivate !')
 		self.ser.close()
 	
+	def checkConnection(self):
+		return self.ser.is_open
+	
+	def resetForNextJob(self, defaultComplianceCurrent=100e-6, smuTimeout=60000):
+		# Every job selects its devices with setDevice(), which first disconnects all of the previous job's devices
+		pass
+	
 	def setTimeout(self, timeout_ms=60000):
 		self.ser.timeout = timeout_ms/1000
 	
@@ -1004,6 +1231,13 @@ class Emulator(SourceMeasureUnit):
 	
 	def disconnect(self, silent=False):
 		pass
+	
+	def checkConnection(self):
+		return True
+	
+	def resetForNextJob(self, defaultComplianceCurrent=100e-6, smuTimeout=60000):
+		self.vds = 0
+		self.vgs = 0
 
 	# --- Measurement Channels ---
 	def turnChannelsOn(self):
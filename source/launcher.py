@@ -6,6 +6,7 @@ in a schedule file and have a dispatcher handle execution."""
 import platform
 import copy
 import glob
+import json
 import os
 import pkgutil
 import sys
@@ -45,6 +46,9 @@ def run(additional_parameters, workspace_data_path=None, connection_status=None,
 
 	# Extract relevant system configuration information from SourceMeasureUnit.py
 	parameters['MeasurementSystem']['systems'] = defaults.system_configuration(parameters['MeasurementSystem']['systemType'])
+	
+	# Set how long live-plot points are collected before they are sent to the UI
+	pipes.configureLiveUpdates(share, window=parameters['livePlotUpdateInterval'])
 
 	# === SMU  ===
 	smu_systems = initializeMeasurementSystems(parameters, connection_status, share)		
@@ -99,10 +103,13 @@ def startProcedure(parameters, smu_systems, arduino_systems, share=None):
 			smu_instance.disconnect()
 
 		# Save data files to mark this experiment as ended before exiting
-		cleanUpDataSaving(parameters, target_devices, deviceIndexes)
+		cleanUpDataSaving(parameters, target_devices, deviceIndexes, share=share)
 		
 		print("ERROR: Exception raised during the experiment.")
 		raise
+	finally:
+		# Send the last live-plot points of the procedure to the UI
+		pipes.flushLiveUpdates(share, report=True)
 	# === Procedure Complete ===
 	
 	# Make sure to ramp down all SMU voltages now that the procedure has finished
@@ -110,7 +117,7 @@ def startProcedure(parameters, smu_systems, arduino_systems, share=None):
 		smu_instance.rampDownVoltages()
 	
 	# Save data files to mark this experiment as complete
-	cleanUpDataSaving(parameters, target_devices, deviceIndexes)
+	cleanUpDataSaving(parameters, target_devices, deviceIndexes, share=share)
 	print("Procedure complete.")
 
 
@@ -197,6 +204,9 @@ def setUpDataSaving(parameters, target_devices):
 		# Make sure that the data save folder exists before beginning
 		dlu.makeFolder(dlu.getDeviceDirectory(deviceParameters))
 		
+		# Keep this device's index lock file open for the duration of the procedure
+		dlu.openJSONIndexManager(dlu.getDeviceDirectory(deviceParameters))
+		
 		# Start a new experiment for each device
 		dlu.incrementJSONExperimentNumber(dlu.getDeviceDirectory(deviceParameters))
 		
@@ -211,7 +221,7 @@ def setUpDataSaving(parameters, target_devices):
 
 
 
-def cleanUpDataSaving(parameters, target_devices, deviceIndexes):
+def cleanUpDataSaving(parameters, target_devices, deviceIndexes, share=None):
 	"""This function runs at the end of a procedure to tie off loose ends and return the system to a safe state."""
 	
 	# Save a single ending timestamp for all target devices
@@ -228,9 +238,16 @@ def cleanUpDataSaving(parameters, target_devices, deviceIndexes):
 		deviceParameters['endIndexes'] = dlu.loadJSONIndex(dlu.getDeviceDirectory(deviceParameters))
 		deviceParameters['endIndexes']['timestamp'] = endTime
 		
+		# Close this device's index lock file now that the experiment is over
+		dlu.closeJSONIndexManager(dlu.getDeviceDirectory(deviceParameters))
+		
 		# Save finished result to 'ParametersHistory' file for each device
 		print("Saving to ParametersHistory...")
 		dlu.saveJSON(dlu.getDeviceDirectory(deviceParameters), 'ParametersHistory', deviceParameters, incrementIndex=False)
+		dlu.refreshExperimentSummaries(dlu.getDeviceDirectory(deviceParameters), [deviceParameters['startIndexes']['experimentNumber']])
+		
+		# Bring the workspace catalog's size and counts for this device up to date once, now that the experiment is over
+		dlu.updateWorkspaceCatalog(dlu.getDeviceDirectory(deviceParameters))
 		
 		# If there was a note for this procedure, save it now
 		note = deviceParameters['Identifiers']['note']
@@ -260,7 +277,15 @@ def cleanUpDataSaving(parameters, target_devices, deviceIndexes):
 		print("Saving to DeviceCycling...")
 		dlu.saveJSON(dlu.getDeviceDirectory(cyclingParameters), 'DeviceCycling', cyclingParameters, subDirectory=defaults.EXPERIMENT_FOLDER_PREFIX+str(cyclingParameters['startIndexes']['experimentNumber']))
 		dlu.saveJSON(dlu.getDeviceDirectory(cyclingParameters), 'ParametersHistory', cyclingParameters, incrementIndex=False)
-		
+		dlu.updateWorkspaceCatalog(dlu.getDeviceDirectory(cyclingParameters))
+	
+	# The Browser almost always opens the experiment that just finished, so have the manager render its most important plots in the background
+	if(parameters['prerenderPlots']):
+		prerenderJobs = []
+		for device in target_devices:
+			identifiers = {'user':parameters['Identifiers']['user'], 'project':parameters['Identifiers']['project'], 'wafer':parameters['Identifiers']['wafer'], 'chip':parameters['Identifiers']['chip'], 'device':device}
+			prerenderJobs.append({'dataFolder':parameters['dataFolder'], 'identifiers':identifiers, 'experimentNumber':deviceIndexes[device]['experimentNumber']})
+		pipes.send(share, 'QueueToManager', {'type':'PrerenderPlots', 'jobs':prerenderJobs})
 
 
 # === SMU Connection ===
@@ -280,18 +305,18 @@ def initializeMeasurementSystems(parameters, connection_status=None, share=None)
 				auto_acquired_type = connection_status['connected_system']['type']
 				auto_acquired_id   = connection_status['connected_system']['uniqueID']
 				if(auto_acquired_type == 'Serial'):
-					smu_systems[system_name] = smu.getConnectionToPCB(port=auto_acquired_id, baud=115200)
+					smu_systems[system_name] = pooledSMUConnection('PCB_SYSTEM', auto_acquired_id, {}, lambda: smu.getConnectionToPCB(port=auto_acquired_id, baud=115200))
 				elif(auto_acquired_type == 'Visa'):
-					smu_systems[system_name] = smu.getConnectionToVisaResource(auto_acquired_id, defaultComplianceCurrent=100e-6, smuTimeout=60*1000)
+					smu_systems[system_name] = pooledSMUConnection('B2900A', auto_acquired_id, {}, lambda: smu.getConnectionToVisaResource(auto_acquired_id, defaultComplianceCurrent=100e-6, smuTimeout=60*1000))
 				else:
 					NotImplementedError("Aborting: Launcher does not recognize the auto-acquired Measurement System.")
 			else:
 				raise RuntimeError("Aborting: Launcher was unable to auto-acquire the Measurement System.")
 		# Handle connection to any specifically requested measurement system	
 		elif(system_type == 'B2900A'):
-			smu_systems[system_name] = smu.getConnectionToVisaResource(system_id, defaultComplianceCurrent=100e-6, smuTimeout=60*1000, system_settings=system_settings)
+			smu_systems[system_name] = pooledSMUConnection(system_type, system_id, system_settings, lambda: smu.getConnectionToVisaResource(system_id, defaultComplianceCurrent=100e-6, smuTimeout=60*1000, system_settings=system_settings))
 		elif(system_type == 'PCB_SYSTEM'):
-			smu_systems[system_name] = smu.getConnectionToPCB(port=system_id, baud=115200, system_settings=system_settings)
+			smu_systems[system_name] = pooledSMUConnection(system_type, system_id, system_settings, lambda: smu.getConnectionToPCB(port=system_id, baud=115200, system_settings=system_settings))
 		elif(system_type == 'EMULATOR_SYSTEM'):
 			smu_systems[system_name] = smu.getConnectionToEmulator()
 		elif(system_type == 'ARDUINO_SYSTEM'):
@@ -320,13 +345,70 @@ def initializeArduino(parameters):
 		
 		# Only handle connections of type 'ARDUINO_SYSTEM'
 		if(system_type == 'ARDUINO_SYSTEM'):
-			arduino_systems[system_name] = arduinoBoard.getConnection(port=system_id, baud=115200, system_settings=system_settings)
+			arduino_systems[system_name] = pooledConnection(system_type, system_id, system_settings, lambda: arduinoBoard.getConnection(port=system_id, baud=115200, system_settings=system_settings), check=lambda arduino_instance: arduino_instance.checkConnection())
 	
 	# If no specific ARDUINO_SYSTEM was included in configuration, still check to see if any are available to connect 
 	if(len(arduino_systems.keys()) == 0):	
-		arduino_systems = {'MCU': arduinoBoard.getConnection(port='', baud=115200)}
+		arduino_systems = {'MCU': pooledConnection('ARDUINO_SYSTEM', '', {}, lambda: arduinoBoard.getConnection(port='', baud=115200), check=lambda arduino_instance: arduino_instance.checkConnection())}
 	
 	return arduino_systems
+
+
+
+# === Connection Pool ===
+def pooledConnection(system_type, system_id, system_settings, connect, check, reset=None):
+	"""Returns the connection to a system that was kept from a previous job in this process (usually the dispatcher) if check() says it
+	still responds, after reset() has undone the state left by that job. Otherwise (or if the system's settings have changed) the old
+	connection is closed, and a new one is made with connect() and kept for the next job."""
+	pool = connectionPool()
+	key = (system_type, system_id)
+	settings = json.dumps(system_settings, sort_keys=True, default=str)
+	
+	pooled = pool.get(key)
+	if(pooled is not None):
+		if((pooled['settings'] == settings) and check(pooled['instance'])):
+			try:
+				if(reset is not None):
+					reset(pooled['instance'])
+				pooled['jobs'] += 1
+				print("Reusing connection to " + str(system_type) + " system with ID: " + str(system_id) + " (job " + str(pooled['jobs']) + " on this connection)")
+				return pooled['instance']
+			except Exception as e:
+				print("Unable to reset connection to " + str(system_type) + " system with ID: " + str(system_id) + ", reconnecting.")
+				print(e)
+		elif(pooled['settings'] != settings):
+			print("Settings of " + str(system_type) + " system with ID: " + str(system_id) + " have changed, reconnecting.")
+		else:
+			print("Connection to " + str(system_type) + " system with ID: " + str(system_id) + " is no longer responding, reconnecting.")
+		closePooledConnection(key)
+	
+	instance = connect()
+	pool[key] = {'instance':instance, 'settings':settings, 'jobs':1}
+	return instance
+
+def pooledSMUConnection(system_type, system_id, system_settings, connect):
+	"""Pooled connection to an SMU, checked with smu.testConnection() and reset to its state at the start of a job."""
+	return pooledConnection(system_type, system_id, system_settings, connect,
+		check=lambda smu_instance: smu.testConnection(None, smu_instance=smu_instance),
+		reset=lambda smu_instance: smu_instance.resetForNextJob(defaultComplianceCurrent=100e-6, smuTimeout=60*1000))
+
+def connectionPool():
+	return connectionPool.connections
+connectionPool.connections = {}
+
+def closePooledConnection(key):
+	pooled = connectionPool().pop(key, None)
+	if(pooled is not None):
+		try:
+			pooled['instance'].disconnect()
+		except Exception as e:
+			print("Unable to cleanly disconnect from " + str(key[0]) + " system with ID: " + str(key[1]))
+			print(e)
+
+def closeConnectionPool():
+	"""Disconnects from every system kept in the pool. Called by the dispatcher once it has run all of its jobs."""
+	for key in list(connectionPool().keys()):
+		closePooledConnection(key)
 	
 	
 	
@@ -12,8 +12,9 @@ import pipes
 import time
 
 # === Constants ===
-MANAGER_THREAD_RESPONSE_TIME_SEC = 0.1
-CHECKER_THREAD_RESPONSE_TIME_SEC = 0.1
+# Messages and exiting sub-processes are handled as soon as they happen; these only limit how long each loop waits before checking anyway
+MANAGER_THREAD_RESPONSE_TIME_SEC = 1.0
+CHECKER_THREAD_RESPONSE_TIME_SEC = 1.0
 
 
 
@@ -30,6 +31,9 @@ def defaultShare():
 		'QueueToDispatcher':   mp.Queue(100),
 		'QueueToStatusChecker':mp.Queue(100),
 		
+		# Shared-memory ring buffers for streaming fast measurements from the dispatcher to the UI
+		'liveStreams': pipes.defaultLiveStreams(),
+		
 		'procedureStopLocations': sharedMemoryManager.list([])
 		
 		#'d': sharedMemoryManager.dict({'dispatcherRunning':False}),
@@ -102,6 +106,24 @@ def runUI(specific_port, share):
 
 
 
+# === Plot Pre-rendering ===
+def startPlotPrerender(jobs):
+	"""Start a lowest priority Process that renders the most important plots of recently finished experiments into the plot cache."""
+	prerenderProcess = mp.Process(target=runPlotPrerender, args=(jobs,))
+	prerenderProcess.start()
+	try:
+		changePriorityOfProcessAndChildren(prerenderProcess.pid, -2)
+	except Exception as e:
+		print('[MANAGER]: Unable to lower the priority of the plot pre-rendering process: ', e)
+	return prerenderProcess
+
+def runPlotPrerender(jobs):
+	"""A target method for pre-rendering plots that also imports the plot rendering utility so the parent process does not have that dependency."""
+	from utilities import PlotRenderUtility as pru
+	pru.runPlotPrerender(jobs)
+
+
+
 # === Dispatcher ===
 def startDispatcher(dispatcher_command, workspace_data_path, share, connection_status=None):
 	"""Start a Process running dispatcher.dispatch(dispatcher_command) and use shared Queues for communication."""
@@ -112,6 +134,10 @@ def startDispatcher(dispatcher_command, workspace_data_path, share, connection_s
 	# Clear the procedure stop locations since dispatcher is just beginning
 	share['procedureStopLocations'][:] = []
 	
+	# Release any live streams that a previous dispatcher did not close (e.g. because it crashed)
+	for stream in share['liveStreams']:
+		stream.inUse.value = pipes.LIVE_STREAM_FREE
+	
 	dispatcherProcess = mp.Process(target=runDispatcher, args=(dispatcher_command, workspace_data_path, share, connection_status))
 	dispatcherProcess.start()
 	return dispatcherProcess
@@ -159,11 +185,10 @@ def runStatusChecker(share):
 		return updateConnectionStatus(share)
 	
 	while(True):
-		if(not pipes.poll(share, 'QueueToStatusChecker')):
-			time.sleep(CHECKER_THREAD_RESPONSE_TIME_SEC)
-		else:
+		# Wait for the next message
+		message = pipes.recv(share, 'QueueToStatusChecker', timeout=CHECKER_THREAD_RESPONSE_TIME_SEC)
+		if(message is not None):
 			# Handle Queue messages
-			message = pipes.recv(share, 'QueueToStatusChecker')
 			print('[CHECKER]: received message: ' + str(message))
 		
 			# Check the current status of connected measurement systems, and report this to the Manager
@@ -195,6 +220,8 @@ def manage(on_startup_port=None, on_startup_schedule_file=None, on_startup_works
 	ui = startUI(on_startup_port, share)	
 	dispatcher = None
 	status_checker = startStatusChecker(share)
+	prerender = None
+	prerender_jobs = []
 	
 	# Spin out the optional "on-startup" Dispatcher sub-process
 	if(on_startup_schedule_file is not None):
@@ -204,12 +231,15 @@ def manage(on_startup_port=None, on_startup_schedule_file=None, on_startup_works
 	
 	# While UI is running, enter an event loop to handle messages that request spinning out a new sub-process
 	while(True):
+		# Wait until there is a message to handle or a sub-process has exited
+		waitQueues = ['QueueToManager'] + (['QueueToDispatcher'] if(dispatcher is None) else [])
+		waitSentinels = [process.sentinel for process in [dispatcher, prerender] if(process is not None)] + ([ui.sentinel] if(ui.is_alive()) else [])
+		pipes.wait(share, waitQueues, sentinels=waitSentinels, timeout=MANAGER_THREAD_RESPONSE_TIME_SEC)
+		
 		try:
-			if(not pipes.poll(share, 'QueueToManager')):
-				time.sleep(MANAGER_THREAD_RESPONSE_TIME_SEC)
-			else:
+			message = pipes.recv(share, 'QueueToManager')
+			if(message is not None):
 				# Handle Queue messages
-				message = pipes.recv(share, 'QueueToManager')
 				print('[MANAGER]: revieved message: ' + str(message))
 				
 				# Spin out a new dispatcher sub-process
@@ -226,6 +256,10 @@ def manage(on_startup_port=None, on_startup_schedule_file=None, on_startup_works
 					connection_status = message['status']	
 					pipes.send(share, 'QueueToUI', message)
 					print('[MANAGER]: Sent updated connection status to the UI.')		
+				
+				# Queue plots of a finished experiment to be pre-rendered (one pre-rendering sub-process runs at a time)
+				if(message.get('type') == 'PrerenderPlots'):
+					prerender_jobs.extend(message['jobs'])
 					
 		except Exception as e:
 			print('[MANAGER]: loop exception: ', e)
@@ -243,6 +277,14 @@ def manage(on_startup_port=None, on_startup_schedule_file=None, on_startup_works
 			dispatcher = None
 			pipes.send(share, 'QueueToUI', {'type':'DispatcherStatus', 'status':{'running':False, 'error':error_status}})
 		
+		# Start pre-rendering any queued plots once the previous pre-rendering sub-process has finished
+		if((prerender is not None) and (not prerender.is_alive())):
+			prerender.join()
+			prerender = None
+		if((prerender is None) and (len(prerender_jobs) > 0)):
+			prerender = startPlotPrerender(prerender_jobs)
+			prerender_jobs = []
+		
 		# If dispatcher is not running and UI is dead, exit the event loop
 		if((dispatcher is None) and (not ui.is_alive())):
 			break
@@ -256,6 +298,9 @@ def manage(on_startup_port=None, on_startup_schedule_file=None, on_startup_works
 		dispatcher.join()
 	status_checker.terminate()
 	status_checker.join()
+	if(prerender is not None):
+		prerender.terminate()
+		prerender.join()
 
 	
 		
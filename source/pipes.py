@@ -1,22 +1,50 @@
+import multiprocessing as mp
+import multiprocessing.connection
+import queue
+import threading
 import time
 
+import numpy as np
+
+# === Constants ===
+LIVE_UPDATE_WINDOW = 0.05
+LIVE_UPDATE_MAX_PENDING_POINTS = 10000
+
+LIVE_STREAM_COUNT = 2
+LIVE_STREAM_CAPACITY = 2**18
+LIVE_STREAM_CHANNELS = 4
+LIVE_STREAM_MAX_POINTS_PER_UPDATE = 500
+LIVE_STREAM_RELEASE_TIMEOUT = 10
+
+# Values of LiveStream.inUse
+LIVE_STREAM_FREE = 0
+LIVE_STREAM_WRITING = 1
+LIVE_STREAM_CLOSING = 2
+
+
+
 # === Basic Queue Communication ===
-def send(share, qName, message):
+def send(share, qName, message, quiet=False):
+	"""Put message on the 'qName' Queue without waiting, and return whether it was sent (it is not if the Queue is full)."""
 	if share is None: # Prevent null exceptions
-		return
+		return False
 	try:
 		if qName not in share:
-			return
+			return False
 		q = share[qName]
 		
 		# Send "message" to "qName" Queue
 		if(not q.full()):
 			q.put_nowait(message)
+			return True
 		else:
-			print('Queue is full')
+			if(not quiet):
+				print('Queue is full')
+			return False
 	
 	except Exception as e:
 		print(f"Queue put exception: {e}")
+		return False
 
 def poll(share, qName):
 	if share is None: # Prevent null exceptions
@@ -37,6 +65,7 @@ def poll(share, qName):
 		return False
 
 def recv(share, qName, timeout=0):
+	"""Get the next message from the 'qName' Queue, waiting up to timeout seconds for one to arrive. Returns None if there is none."""
 	if share is None: # Prevent null exceptions
 		return
 	try:
@@ -52,11 +81,24 @@ def recv(share, qName, timeout=0):
 				return None
 			return q.get_nowait()
 	
+	except queue.Empty:
+		return None
 	except Exception as e:
 		if(timeout > 0):
 			print(f"Queue get exception: {e}")
 		return None
 
+def wait(share, qNames, sentinels=[], timeout=None):
+	"""Block until a message arrives on any of the qNames Queues, any of the sentinels (e.g. Process.sentinel of a child process) is
+	ready, or timeout seconds have passed. Returns the list of whatever is ready (empty after a timeout)."""
+	readers = [share[qName]._reader for qName in qNames if((share is not None) and (qName in share))]
+	try:
+		return multiprocessing.connection.wait(readers + list(sentinels), timeout)
+	except Exception as e:
+		print(f"Queue wait exception: {e}")
+		time.sleep(timeout if(timeout is not None) else 0)
+		return []
+
 def clear(share, qName):
 	if share is None: # Prevent null exceptions
 		return
@@ -83,18 +125,15 @@ def progressUpdate(share, progressName, start, current, end, barType='Procedure'
 	if(share is None): # Prevent null exceptions
 		return
 	try:
-		send(share, 'QueueToUI', {
-				'type':'Progress',
-				'progress': {
-					'name': progressName,
-					'barType': barType,
-					'start': start,
-					'current': current,
-					'end': end,
-					'timestamp':time.time()
-				},
-			}
-		)		
+		# Only the latest progress of each bar is sent to the UI each live-update window
+		liveUpdates(share).addProgress({
+			'name': progressName,
+			'barType': barType,
+			'start': start,
+			'current': current,
+			'end': end,
+			'timestamp':time.time()
+		})
 	except Exception as e:
 		print(f'Progress-Update exception: {e}')
 	
@@ -118,6 +157,7 @@ def broadcastError(share, exception):
 	exception_type = ''.join(f"{' ' if(c.isupper()) else ''}{c}" for c in exception_type).strip() 
 	
 	try:
+		flushLiveUpdates(share)
 		send(share, 'QueueToUI', {
 				'type':'ErrorNotification',
 				'error': {
@@ -139,12 +179,8 @@ def livePlotUpdate(share, plots):
 		if(share is None):
 			return
 		
-		# Send a data-type message to the UI
-		send(share, 'QueueToUI', {
-				'type':'Data',
-				'plots': [plot.toDict() for plot in plots]
-			}
-		)
+		# Points are combined with any others sent during the same live-update window, and sent to the UI as one data-type message
+		liveUpdates(share).addPlots([plot.toDict() for plot in plots])
 
 	# Handle generic exceptions	
 	except Exception as e:
@@ -156,7 +192,8 @@ def jobNumberUpdate(share, number):
 		if(share is None):
 			return
 			
-		# Send a jobnumber-type message to the UI
+		# Send a jobnumber-type message to the UI (after any points of the previous job)
+		flushLiveUpdates(share)
 		send(share, 'QueueToUI', {
 				'type':'JobNumberUpdate',
 				'number':number
@@ -173,7 +210,8 @@ def deviceNumberUpdate(share, number):
 		if(share is None):
 			return
 
-		# Send a devicenumber-type message to the UI
+		# Send a devicenumber-type message to the UI (after any points of the previous device)
+		flushLiveUpdates(share)
 		send(share, 'QueueToUI', {
 				'type':'DeviceNumberUpdate',
 				'number':number
@@ -183,7 +221,300 @@ def deviceNumberUpdate(share, number):
 	# Handle generic exceptions	
 	except Exception as e:
 		print('Device-number update exception: ', e)
+
+
+
+# === Live-Update Coalescing ===
+class LiveUpdateCoalescer:
+	"""Combines the live-plot points and progress updates sent by a procedure so that at most one data-type message (holding arrays
+	of every point of each trace) and one progress message per bar are put on 'QueueToUI' every window seconds. If the Queue is full
+	they are kept and sent with the next window instead, and only if a trace has more than maxPendingPoints waiting are its oldest
+	points dropped."""
+	def __init__(self, share, window=LIVE_UPDATE_WINDOW, maxPendingPoints=LIVE_UPDATE_MAX_PENDING_POINTS):
+		self.share = share
+		self.window = window
+		self.maxPendingPoints = maxPendingPoints
+		self.lock = threading.Lock()
+		self.pendingPlots = {}
+		self.pendingPoints = 0
+		self.pendingDroppedPoints = 0
+		self.pendingProgress = {}
+		self.lastFlushTime = 0
+		self.flushThread = None
+		self.stopFlushing = None
+		self.points = 0
+		self.messages = 0
+		self.droppedPoints = 0
+	
+	def addPlots(self, plots):
+		"""Add one point (to each trace) of each plot in plots, given as Live_Plot_Figure.toDict() dictionaries."""
+		with self.lock:
+			for plot in plots:
+				pendingPlot = self.pendingPlots.get(plot['plotID'])
+				if(pendingPlot is None):
+					pendingPlot = self.pendingPlots[plot['plotID']] = dict(plot, traces={})
+				else:
+					pendingPlot.update({key:value for key, value in plot.items() if(key != 'traces')})
+				
+				for traceID, trace in plot['traces'].items():
+					pendingTrace = pendingPlot['traces'].get(traceID)
+					if(pendingTrace is None):
+						pendingTrace = pendingPlot['traces'][traceID] = dict(trace, xData=[], yData=[])
+					pendingTrace['xData'].append(trace['xData'])
+					pendingTrace['yData'].append(trace['yData'])
+					
+					overflow = len(pendingTrace['xData']) - self.maxPendingPoints
+					if(overflow > 0):
+						del pendingTrace['xData'][:overflow]
+						del pendingTrace['yData'][:overflow]
+						self.pendingDroppedPoints += overflow
+			self.pendingPoints += 1
+		self.flushIfDue()
+	
+	def addProgress(self, progress):
+		"""Replace any progress update of the same bar that has not been sent yet."""
+		with self.lock:
+			self.pendingProgress[progress['barType']] = progress
+		self.flushIfDue()
+	
+	def flushIfDue(self):
+		"""Send everything now if the window has passed since the last message, otherwise make sure it is sent once it has."""
+		if(time.time() - self.lastFlushTime >= self.window):
+			self.flush()
+			return
+		with self.lock:
+			if(self.flushThread is None):
+				self.stopFlushing = threading.Event()
+				self.flushThread = threading.Thread(target=self.flushContinuously, args=(self.stopFlushing,), daemon=True)
+				self.flushThread.start()
+	
+	def flush(self):
+		"""Send the points and progress updates waiting to be sent, keeping whatever does not fit on the Queue for the next window."""
+		with self.lock:
+			self.lastFlushTime = time.time()
+			if(len(self.pendingPlots) > 0):
+				message = {'type':'Data', 'plots':list(self.pendingPlots.values()), 'batched':True, 'points':self.pendingPoints, 'droppedPoints':self.pendingDroppedPoints}
+				if(send(self.share, 'QueueToUI', message, quiet=True)):
+					self.points += self.pendingPoints
+					self.messages += 1
+					self.droppedPoints += self.pendingDroppedPoints
+					self.pendingPlots = {}
+					self.pendingPoints = 0
+					self.pendingDroppedPoints = 0
+			for barType, progress in list(self.pendingProgress.items()):
+				if(send(self.share, 'QueueToUI', {'type':'Progress', 'progress':progress}, quiet=True)):
+					del self.pendingProgress[barType]
+	
+	def flushContinuously(self, stopFlushing):
+		while(not stopFlushing.wait(self.window)):
+			with self.lock:
+				pending = (len(self.pendingPlots) > 0) or (len(self.pendingProgress) > 0)
+			if(pending):
+				self.flush()
+	
+	def close(self):
+		"""Stop the thread that sends updates once each window has passed, then send whatever is still waiting. Adding more updates
+		afterwards starts a new thread."""
+		with self.lock:
+			flushThread, stopFlushing = self.flushThread, self.stopFlushing
+			self.flushThread = None
+			self.stopFlushing = None
+		if(flushThread is not None):
+			stopFlushing.set()
+			if(flushThread is not threading.current_thread()):
+				flushThread.join()
+		self.flush()
+	
+	def stats(self):
+		"""The number of points sent and the number of messages they were coalesced into, and the number of points dropped."""
+		with self.lock:
+			return {'points':self.points, 'messages':self.messages, 'coalescedPoints':self.points - self.messages, 'droppedPoints':self.droppedPoints}
+
+def liveUpdates(share):
+	"""The LiveUpdateCoalescer of this process for share, which is created the first time it is needed."""
+	if((liveUpdates.coalescer is None) or (liveUpdates.coalescer.share is not share)):
+		if(liveUpdates.coalescer is not None):
+			liveUpdates.coalescer.close()
+		liveUpdates.coalescer = LiveUpdateCoalescer(share, window=liveUpdates.window)
+	return liveUpdates.coalescer
+liveUpdates.coalescer = None
+liveUpdates.window = LIVE_UPDATE_WINDOW
+
+def configureLiveUpdates(share, window=LIVE_UPDATE_WINDOW):
+	"""Set the number of seconds that live-plot points and progress updates are combined over before being sent to the UI."""
+	liveUpdates.window = window
+	liveUpdates(share).window = window
+
+def flushLiveUpdates(share, report=False):
+	"""Send any live-plot points and progress updates still waiting to be sent. With report (i.e. at the end of a procedure), also stop the
+	coalescer's flushing thread and print how many were coalesced or dropped."""
+	if((share is None) or (liveUpdates.coalescer is None)):
+		return
+	coalescer = liveUpdates(share)
+	if(not report):
+		coalescer.flush()
+		return
+	coalescer.close()
+	stats = coalescer.stats()
+	print(f"Live-plot updates: {stats['points']} points sent in {stats['messages']} messages ({stats['coalescedPoints']} coalesced, {stats['droppedPoints']} dropped).")
+
+
+
+# === Live Streams ===
+class LiveStream:
+	"""A ring buffer of float64 samples in shared memory, for sending fast measurements (e.g. 1-100 kHz sweeps) from a procedure to
+	the UI without putting them on a Queue. Each row holds an x value followed by one y value per trace. Only one process writes to a
+	stream at a time; readers copy only the rows they need out of it, and notice if the writer has overwritten them while they read.
+	Streams are created in the 'share' dictionary before any sub-process starts, and are opened by a procedure with openLiveStream().
+	Readers only read the newest half of the buffer, and write() publishes at most half of the capacity at a time, so that the rows being
+	written while they read are never the ones they copy. A closed stream is only free again once its reader has read the rest of it
+	(or after LIVE_STREAM_RELEASE_TIMEOUT seconds, in case there is no reader)."""
+	def __init__(self, capacity=LIVE_STREAM_CAPACITY, channels=LIVE_STREAM_CHANNELS):
+		self.capacity = capacity
+		self.channels = channels
+		self.buffer = mp.RawArray('d', capacity*channels)
+		self.rowsWritten = mp.RawValue('Q', 0)
+		self.generation = mp.RawValue('Q', 0)
+		self.inUse = mp.RawValue('i', LIVE_STREAM_FREE)
+		self.closedTime = mp.RawValue('d', 0)
+		self.lock = mp.Lock()
+		self.rowView = None
+	
+	def __getstate__(self):
+		# The numpy view of the buffer is made again by each process that uses the stream
+		state = dict(self.__dict__)
+		state['rowView'] = None
+		return state
+	
+	def rows(self):
+		"""The buffer as a (capacity, channels) numpy array, without copying it."""
+		if(self.rowView is None):
+			self.rowView = np.frombuffer(self.buffer, dtype=np.float64).reshape(self.capacity, self.channels)
+		return self.rowView
+	
+	def reset(self):
+		"""Start a new trace: readers that see the generation change start again from the first row written after this."""
+		self.rowsWritten.value = 0
+		self.generation.value += 1
+	
+	def write(self, x, ys):
+		"""Append samples: x is an array of n values and ys is a list of arrays of n values (one per trace, at most channels - 1 of them)."""
+		x = np.asarray(x, dtype=np.float64)
+		count = len(x)
+		if(count == 0):
+			return
 		
+		# Only the most recent capacity samples can be kept
+		skipped = max(0, count - self.capacity)
+		samples = np.full((count - skipped, self.channels), np.nan)
+		samples[:, 0] = x[skipped:]
+		for i, y in enumerate(ys[:self.channels - 1]):
+			samples[:, i + 1] = np.asarray(y, dtype=np.float64)[skipped:]
 		
+		# Copy the rows into place at most half of the buffer at a time (in two parts if they wrap around the end of the buffer), publishing
+		# each part by updating rowsWritten before the next one starts to overwrite older rows
+		rows = self.rows()
+		rowsWritten = self.rowsWritten.value + skipped
+		for part in range(0, len(samples), max(1, self.capacity//2)):
+			partSamples = samples[part:part + max(1, self.capacity//2)]
+			start = rowsWritten % self.capacity
+			firstPart = min(len(partSamples), self.capacity - start)
+			rows[start:start + firstPart] = partSamples[:firstPart]
+			rows[:len(partSamples) - firstPart] = partSamples[firstPart:]
+			rowsWritten += len(partSamples)
+			self.rowsWritten.value = rowsWritten
+	
+	def claim(self):
+		"""Take the stream for a new trace if it is free (or its reader never released it), returning True if it was taken."""
+		with self.lock:
+			abandoned = (self.inUse.value == LIVE_STREAM_CLOSING) and (time.time() - self.closedTime.value > LIVE_STREAM_RELEASE_TIMEOUT)
+			if((self.inUse.value != LIVE_STREAM_FREE) and not abandoned):
+				return False
+			self.inUse.value = LIVE_STREAM_WRITING
+			self.reset()
+			return True
+	
+	def close(self):
+		"""Mark the trace as complete. The stream stays taken until its reader calls release()."""
+		with self.lock:
+			self.inUse.value = LIVE_STREAM_CLOSING
+			self.closedTime.value = time.time()
+	
+	def release(self, generation):
+		"""Free the stream once the reader of the given generation has read all of it."""
+		with self.lock:
+			if((self.generation.value == generation) and (self.inUse.value == LIVE_STREAM_CLOSING)):
+				self.inUse.value = LIVE_STREAM_FREE
+	
+	def read(self, position, maxRows=LIVE_STREAM_MAX_POINTS_PER_UPDATE):
+		"""Get the rows written since position (a number of rows previously returned by read()), keeping every n-th row so that at most
+		maxRows are returned. Returns (rows, new position). Rows that were overwritten before they could be read are skipped."""
+		rowsWritten = self.rowsWritten.value
+		start = max(position, rowsWritten - self.capacity//2)
+		if(rowsWritten <= start):
+			return (np.empty((0, self.channels)), rowsWritten)
+		
+		step = int(np.ceil((rowsWritten - start) / maxRows))
+		indexes = np.arange(start, rowsWritten, step)
+		samples = self.rows()[indexes % self.capacity]
+		
+		# If the writer wrapped around past some of these rows while they were being copied, drop them
+		overwrittenBefore = self.rowsWritten.value - self.capacity//2
+		return (samples[indexes >= overwrittenBefore], rowsWritten)
+
+def defaultLiveStreams():
+	"""The LiveStreams to put in the 'share' dictionary (they must exist before the processes that use them are started)."""
+	return [LiveStream() for i in range(LIVE_STREAM_COUNT)]
+
+def openLiveStream(share, plotID, labels, xAxisTitle='', yAxisTitle='', yscale='linear', plotMode='lines'):
+	"""Claim an unused LiveStream for a live plot with one trace per label and tell the UI to start showing it. Returns None if there
+	are no free streams (or no UI), in which case the procedure should send its data another way (e.g. with livePlotUpdate)."""
+	if((share is None) or ('liveStreams' not in share)):
+		return None
+	for index, stream in enumerate(share['liveStreams']):
+		if(stream.claim()):
+			flushLiveUpdates(share)
+			send(share, 'QueueToUI', {
+				'type':'LiveStreamStarted',
+				'stream':index,
+				'generation':stream.generation.value,
+				'plot':{'plotID':plotID, 'labels':labels[:stream.channels - 1], 'xAxisTitle':xAxisTitle, 'yAxisTitle':yAxisTitle, 'yScale':yscale, 'plotMode':plotMode},
+			})
+			return stream
+	print('No free live streams; live data will not be streamed to the UI.')
+	return None
+
+def closeLiveStream(share, stream):
+	"""Tell the UI that a LiveStream is complete. The UI releases it for other procedures once it has read the rest of it."""
+	if(stream is None):
+		return
+	stream.close()
+	send(share, 'QueueToUI', {'type':'LiveStreamStopped', 'stream':share['liveStreams'].index(stream), 'generation':stream.generation.value})
+
+class LiveStreamReader:
+	"""Reads new rows from one LiveStream, for one LiveStreamStarted message, and formats them as a batched 'Data' live-plot message."""
+	def __init__(self, share, message):
+		self.stream = share['liveStreams'][message['stream']]
+		self.generation = message['generation']
+		self.plot = message['plot']
+		self.position = 0
+		self.stopped = False
+	
+	def readPlotMessage(self, maxRows=LIVE_STREAM_MAX_POINTS_PER_UPDATE):
+		"""The rows written since the last call as a live-plot data message, or None if there are none (or the stream was reused)."""
+		if(self.stream.generation.value != self.generation):
+			return None
+		rows, self.position = self.stream.read(self.position, maxRows)
+		if((len(rows) == 0) or (self.stream.generation.value != self.generation)):
+			return None
 		
-		
\ No newline at end of file
+		traces = {}
+		for i, label in enumerate(self.plot['labels']):
+			traces[label] = {'traceID':label, 'xData':rows[:, 0].tolist(), 'yData':rows[:, i + 1].tolist(), 'color':'', 'mode':self.plot['plotMode']}
+		plot = {'plotID':self.plot['plotID'], 'xAxisTitle':self.plot['xAxisTitle'], 'yAxisTitle':self.plot['yAxisTitle'], 'yScale':self.plot['yScale'], 'plotMode':self.plot['plotMode'], 'color':'', 'size':6, 'traces':traces}
+		return {'type':'Data', 'plots':[plot], 'batched':True, 'points':len(rows), 'droppedPoints':0}
+	
+	def release(self):
+		"""Let the stream be used for another trace, once this reader has been stopped and has read the rest of it."""
+		self.stream.release(self.generation)
+
@@ -24,6 +24,8 @@ default_ch_parameters = {
 	'maxGateCurrent': None,
 	'showFigures': True,
 	'specificPlotToCreate': '',
+	'loadingWorkers': 4,
+	'loadWithProcesses': False,
 }
 
 
@@ -33,7 +35,8 @@ def makePlots(userID, projectID, waferID, chipID, specificPlot='',
 				minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), 
 				loadOnlyMostRecentExperiments=True, numberOfRecentExperiments=1, numberOfRecentIndexes=1, specificDeviceList=None, 
 				minOnCurrent=None, maxOnCurrent=None, maxOffCurrent=None, maxGateCurrent=None, deviceCategoryLists=None, 
-				dataFolder=None, saveFolder=None, plotSaveName='', saveFigures=False, showFigures=True, plot_mode_parameters=None):
+				dataFolder=None, saveFolder=None, plotSaveName='', saveFigures=False, showFigures=True, plot_mode_parameters=None,
+				loadingWorkers=None, loadWithProcesses=None):
 
 	parameters = {}	
 	mode_parameters = {}
@@ -63,6 +66,10 @@ def makePlots(userID, projectID, waferID, chipID, specificPlot='',
 	parameters['maxOffCurrent'] = maxOffCurrent
 	parameters['maxGateCurrent'] = maxGateCurrent
 	parameters['deviceGroupList'] = deviceCategoryLists
+	if(loadingWorkers is not None):
+		parameters['loadingWorkers'] = loadingWorkers
+	if(loadWithProcesses is not None):
+		parameters['loadWithProcesses'] = loadWithProcesses
 		
 	# Plot selection parameters	
 	parameters['showFigures'] = showFigures
@@ -97,7 +104,7 @@ def run(additional_parameters, plot_mode_parameters=None):
 	# If desired, look at the on-current from a gate sweep for each device before deciding to include it based on a cutoff value
 	devicesToInclude = parameters['specificDeviceList']
 	if((parameters['minOnCurrent'] is not None) or (parameters['maxOnCurrent'] is not None) or (parameters['maxOffCurrent'] is not None) or(parameters['maxGateCurrent'] is not None)):
-		(chipIndexes, firstRunChipHistory, recentRunChipHistory, specificRunChipHistory, groupedChipHistory) = loadDataBasedOnPlotDependencies(['GateSweep.json'], parameters, minIndex=parameters['minJSONIndex'], maxIndex=parameters['maxJSONIndex'], minExperiment=parameters['minJSONExperimentNumber'], maxExperiment=parameters['maxJSONExperimentNumber'], minRelativeIndex=parameters['minJSONRelativeIndex'], maxRelativeIndex=parameters['maxJSONRelativeIndex'], loadOnlyMostRecentExperiments=parameters['loadOnlyMostRecentExperiments'], numberOfOldestExperiments=1, numberOfOldestIndexes=1, numberOfRecentExperiments=parameters['numberOfRecentExperiments'], numberOfRecentIndexes=parameters['numberOfRecentIndexes'], specificDeviceList=devicesToInclude, deviceGroupList=parameters['deviceGroupList'])
+		(chipIndexes, firstRunChipHistory, recentRunChipHistory, specificRunChipHistory, groupedChipHistory) = loadDataBasedOnPlotDependencies(['GateSweep.json'], parameters, minIndex=parameters['minJSONIndex'], maxIndex=parameters['maxJSONIndex'], minExperiment=parameters['minJSONExperimentNumber'], maxExperiment=parameters['maxJSONExperimentNumber'], minRelativeIndex=parameters['minJSONRelativeIndex'], maxRelativeIndex=parameters['maxJSONRelativeIndex'], loadOnlyMostRecentExperiments=parameters['loadOnlyMostRecentExperiments'], numberOfOldestExperiments=1, numberOfOldestIndexes=1, numberOfRecentExperiments=parameters['numberOfRecentExperiments'], numberOfRecentIndexes=parameters['numberOfRecentIndexes'], specificDeviceList=devicesToInclude, deviceGroupList=parameters['deviceGroupList'], workers=parameters['loadingWorkers'], useProcesses=parameters['loadWithProcesses'])
 		devicesToInclude = []
 		for deviceRun in specificRunChipHistory:
 			abs_max_drain_current = max(np.max(deviceRun['Results']['id_data']), abs(np.min(deviceRun['Results']['id_data'])))
@@ -110,7 +117,7 @@ def run(additional_parameters, plot_mode_parameters=None):
 	plotsToCreate = [parameters['specificPlotToCreate']] if(parameters['specificPlotToCreate'] != '') else [entry['type'] for entry in plotsForExperiments(parameters, minExperiment=0, maxExperiment=float('inf'))]
 	for plotType in plotsToCreate:
 		dataFileDependencies = dpu.getDataFileDependencies(plotType)		
-		(chipIndexes, firstRunChipHistory, recentRunChipHistory, specificRunChipHistory, groupedChipHistory) = loadDataBasedOnPlotDependencies(dataFileDependencies, parameters, minIndex=parameters['minJSONIndex'], maxIndex=parameters['maxJSONIndex'], minExperiment=parameters['minJSONExperimentNumber'], maxExperiment=parameters['maxJSONExperimentNumber'], minRelativeIndex=parameters['minJSONRelativeIndex'], maxRelativeIndex=parameters['maxJSONRelativeIndex'], loadOnlyMostRecentExperiments=parameters['loadOnlyMostRecentExperiments'], numberOfOldestExperiments=1, numberOfOldestIndexes=1, numberOfRecentExperiments=parameters['numberOfRecentExperiments'], numberOfRecentIndexes=parameters['numberOfRecentIndexes'], specificDeviceList=devicesToInclude, deviceGroupList=parameters['deviceGroupList'])
+		(chipIndexes, firstRunChipHistory, recentRunChipHistory, specificRunChipHistory, groupedChipHistory) = loadDataBasedOnPlotDependencies(dataFileDependencies, parameters, minIndex=parameters['minJSONIndex'], maxIndex=parameters['maxJSONIndex'], minExperiment=parameters['minJSONExperimentNumber'], maxExperiment=parameters['maxJSONExperimentNumber'], minRelativeIndex=parameters['minJSONRelativeIndex'], maxRelativeIndex=parameters['maxJSONRelativeIndex'], loadOnlyMostRecentExperiments=parameters['loadOnlyMostRecentExperiments'], numberOfOldestExperiments=1, numberOfOldestIndexes=1, numberOfRecentExperiments=parameters['numberOfRecentExperiments'], numberOfRecentIndexes=parameters['numberOfRecentIndexes'], specificDeviceList=devicesToInclude, deviceGroupList=parameters['deviceGroupList'], workers=parameters['loadingWorkers'], useProcesses=parameters['loadWithProcesses'])
 		plot = dpu.makeChipPlot(plotType, parameters['Identifiers'], chipIndexes=chipIndexes, firstRunChipHistory=firstRunChipHistory, recentRunChipHistory=recentRunChipHistory, specificRunChipHistory=specificRunChipHistory, groupedChipHistory=groupedChipHistory, mode_parameters=mode_parameters)
 		plotList.append(plot)
 	
@@ -122,7 +129,7 @@ def run(additional_parameters, plot_mode_parameters=None):
 
 
 
-def loadDataBasedOnPlotDependencies(dataFileDependencies, parameters, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), loadOnlyMostRecentExperiments=True, numberOfOldestExperiments=1, numberOfOldestIndexes=1, numberOfRecentExperiments=1, numberOfRecentIndexes=1, specificDeviceList=None, deviceGroupList=None):
+def loadDataBasedOnPlotDependencies(dataFileDependencies, parameters, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), loadOnlyMostRecentExperiments=True, numberOfOldestExperiments=1, numberOfOldestIndexes=1, numberOfRecentExperiments=1, numberOfRecentIndexes=1, specificDeviceList=None, deviceGroupList=None, workers=1, useProcesses=False):
 	# Define data arrays to return
 	chipIndexes = None
 	firstRunChipHistory = None
@@ -135,16 +142,16 @@ def loadDataBasedOnPlotDependencies(dataFileDependencies, parameters, minIndex=0
 		if(dependency == 'index.json'):
 			chipIndexes = dlu.loadChipIndexes(dlu.getChipDirectory(parameters))
 		elif(dependency in ['GateSweep.json', 'DrainSweep.json']):
-			firstRunChipHistory = dlu.loadOldestChipHistory(dlu.getChipDirectory(parameters), dependency, numberOfOldestExperiments=numberOfOldestExperiments, numberOfOldestIndexes=numberOfOldestIndexes, specificDeviceList=specificDeviceList)
-			recentRunChipHistory = dlu.loadMostRecentChipHistory(dlu.getChipDirectory(parameters), dependency, numberOfRecentExperiments=numberOfRecentExperiments, numberOfRecentIndexes=numberOfRecentIndexes, specificDeviceList=specificDeviceList)
+			firstRunChipHistory = dlu.loadOldestChipHistory(dlu.getChipDirectory(parameters), dependency, numberOfOldestExperiments=numberOfOldestExperiments, numberOfOldestIndexes=numberOfOldestIndexes, specificDeviceList=specificDeviceList, workers=workers, useProcesses=useProcesses)
+			recentRunChipHistory = dlu.loadMostRecentChipHistory(dlu.getChipDirectory(parameters), dependency, numberOfRecentExperiments=numberOfRecentExperiments, numberOfRecentIndexes=numberOfRecentIndexes, specificDeviceList=specificDeviceList, workers=workers, useProcesses=useProcesses)
 			if(loadOnlyMostRecentExperiments):
 				specificRunChipHistory = recentRunChipHistory.copy()
 			else:
-				specificRunChipHistory = dlu.loadSpecificChipHistory(dlu.getChipDirectory(parameters), dependency, specificDeviceList=specificDeviceList, minIndex=minIndex, maxIndex=maxIndex, minExperiment=minExperiment, maxExperiment=maxExperiment, minRelativeIndex=minRelativeIndex, maxRelativeIndex=maxRelativeIndex)
+				specificRunChipHistory = dlu.loadSpecificChipHistory(dlu.getChipDirectory(parameters), dependency, specificDeviceList=specificDeviceList, minIndex=minIndex, maxIndex=maxIndex, minExperiment=minExperiment, maxExperiment=maxExperiment, minRelativeIndex=minRelativeIndex, maxRelativeIndex=maxRelativeIndex, workers=workers, useProcesses=useProcesses)
 				if(deviceGroupList is not None):
 					groupedChipHistory = []
 					for deviceGroup in deviceGroupList:
-						chipHistoryForDeviceGroup = dlu.loadSpecificChipHistory(dlu.getChipDirectory(parameters), dependency, specificDeviceList=deviceGroup, minIndex=minIndex, maxIndex=maxIndex, minExperiment=minExperiment, maxExperiment=maxExperiment, minRelativeIndex=minRelativeIndex, maxRelativeIndex=maxRelativeIndex)
+						chipHistoryForDeviceGroup = dlu.loadSpecificChipHistory(dlu.getChipDirectory(parameters), dependency, specificDeviceList=deviceGroup, minIndex=minIndex, maxIndex=maxIndex, minExperiment=minExperiment, maxExperiment=maxExperiment, minRelativeIndex=minRelativeIndex, maxRelativeIndex=maxRelativeIndex, workers=workers, useProcesses=useProcesses)
 						groupedChipHistory.append(chipHistoryForDeviceGroup)
 						
 	return (chipIndexes, firstRunChipHistory, recentRunChipHistory, specificRunChipHistory, groupedChipHistory)
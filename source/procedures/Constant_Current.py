@@ -21,8 +21,14 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 	# Print the starting message
 	print('Constant Current is starting.')
 	
+	# Stream the results to disk while they are collected
+	print('Streaming JSON: ' + str(dlu.getDeviceDirectory(parameters)))
+	recordData = dict(parameters)
+	recordData['Results'] = {key:[] for key in CONSTANT_CURRENT_RESULT_KEYS}
+	record = dlu.openJSONRecord(dlu.getDeviceDirectory(parameters), cc_parameters['saveFileName'], recordData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']))
+	
 	# === START ===
-	results = runConstantCurrent(smu_instance,
+	runConstantCurrent(smu_instance,
 								 currentApplied=cc_parameters['currentAppliedMilliamps']/1000,
 								 currentDuration=cc_parameters['currentDuration'],
 								 currentDataInterval=cc_parameters['currentDataInterval'],
@@ -33,6 +39,7 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 								 sweepSteps=cc_parameters['sweepSteps'],
 								 sweepDelayBetweenMeasurements=cc_parameters['sweepDelayBetweenMeasurements'],
 								 sweepFrequency=cc_parameters['sweepFrequency'],
+								 record=record,
 								 share=share)
 	
 	smu_instance.turnChannelsOff()
@@ -43,25 +50,16 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 	smu_instance.turnChannelsOn()
 	# === COMPLETE ===
 	
-	# Copy parameters and add in the test results
+	# Finish the streamed JSON object (the results are already on disk, so they are not returned)
 	jsonData = dict(parameters)
-	jsonData['Results'] = results['Raw']
-	
-	# Save results as a JSON object
-	print('Saving JSON: ' + str(dlu.getDeviceDirectory(parameters)))
-	dlu.saveJSON(dlu.getDeviceDirectory(parameters), cc_parameters['saveFileName'], jsonData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']))
+	record.close(jsonData)
 	
 	return jsonData
 
-def runConstantCurrent(smu_instance, currentApplied, currentDuration, currentDataInterval, complianceVoltage, enableSweep, sweepStart, sweepEnd, sweepSteps, sweepDelayBetweenMeasurements, sweepFrequency, share=None):
-	voltage_data = []
-	current_data = []
-	timestamps = []
-	sweep_voltage_data = []
-	sweep_current_data = []
-	sweep_timestamps = []
-	sweep_number = []
-	
+CONSTANT_CURRENT_RESULT_KEYS = ['voltage_data', 'current_data', 'timestamps', 'sweep_voltage_data', 'sweep_current_data', 'sweep_timestamps', 'sweep_number']
+
+def runConstantCurrent(smu_instance, currentApplied, currentDuration, currentDataInterval, complianceVoltage, enableSweep, sweepStart, sweepEnd, sweepSteps, sweepDelayBetweenMeasurements, sweepFrequency, record, share=None):
+	"""Collect constant current data (and the occasional sweep), appending each measurement and sweep to the streamed record."""
 	# Define our sweep function
 	def run_sweep(sweepStart, sweepEnd, sweepSteps, sweepDelayBetweenMeasurements, sweepNumber=0):
 		# Configure Channels to Run Sweep
@@ -94,10 +92,7 @@ def runConstantCurrent(smu_instance, currentApplied, currentDuration, currentDat
 				run_timestamps.append(timestamp)
 				run_sweep_numbers.append(sweepNumber)
 			
-		sweep_voltage_data.append(run_voltages)
-		sweep_current_data.append(run_currents)
-		sweep_timestamps.append(run_timestamps)
-		sweep_number.append(run_sweep_numbers)
+		record.append({'sweep_voltage_data':run_voltages, 'sweep_current_data':run_currents, 'sweep_timestamps':run_timestamps, 'sweep_number':run_sweep_numbers})
 		
 		# Configure Channels to Run Constant Current
 		smu_instance.turnChannelsOff()
@@ -151,9 +146,7 @@ def runConstantCurrent(smu_instance, currentApplied, currentDuration, currentDat
 		timestamp = time.time()
 		measurement = smu_instance.takeSingleChannelMeasurement(channel=1)
 		
-		voltage_data.append(measurement['V'])
-		current_data.append(measurement['I'])
-		timestamps.append(timestamp)
+		record.append({'voltage_data':measurement['V'], 'current_data':measurement['I'], 'timestamps':timestamp})
 		
 		# Pause for the interval time
 		if(currentDataInterval > 0):
@@ -182,18 +175,6 @@ def runConstantCurrent(smu_instance, currentApplied, currentDuration, currentDat
 			break # exit the while loop to stop the experiment
 		# =============
 	
-	return {
-		'Raw': {
-			'voltage_data':voltage_data,
-			'current_data':current_data,
-			'timestamps':timestamps,
-			'sweep_voltage_data':sweep_voltage_data,
-			'sweep_current_data':sweep_current_data,
-			'sweep_timestamps':sweep_timestamps,
-			'sweep_number':sweep_number,
-		}
-	}
-	
 	
 	
 	
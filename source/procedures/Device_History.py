@@ -33,7 +33,7 @@ default_linking_file = 'DeviceCycling.json'
 def makePlots(userID, projectID, waferID, chipID, deviceID, specificPlot='', 
 				minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'),
 				loadOnlyMostRecentExperiments=False, numberOfRecentExperiments=1, numberOfRecentIndexes=float('inf'),
-				dataFolder=None, saveFolder=None, plotSaveName='', saveFigures=False, showFigures=True, plot_mode_parameters=None, cacheBust=None):
+				dataFolder=None, saveFolder=None, plotSaveName='', saveFigures=False, showFigures=True, plot_mode_parameters=None, useCache=False):
 	"""Make plots for the device found in the userID/projectID/waferID/chipID/deviceID folder.
 
 	specificPlot can be specified to only make one specific plot found in the plotDefintions folder, or by default all available plots are made.
@@ -42,6 +42,7 @@ def makePlots(userID, projectID, waferID, chipID, deviceID, specificPlot='',
 	dataFolder and saveFolder can specify the paths for loading .json data and saving .png plots, but they should not be necessary by default.
 	plotSaveName can add extra characters to the .png saved by this function if that is desireable.
 	saveFigures and showFigures are booleans that specify if a plot should be shown with the matplotlib pyplot interface or saved as a .png
+	useCache allows data loaded for previous plots to be reused (it is reloaded automatically whenever the device's data files change)
 	
 	plot_mode_parameters is a catch-all dictionary for parameters that affect the style of plots (but not the data shown!). See the DataPlotterUtility
 	for more information about available plot_mode_parameters."""
@@ -79,12 +80,12 @@ def makePlots(userID, projectID, waferID, chipID, deviceID, specificPlot='',
 	mode_parameters['showFigures'] = showFigures
 	mode_parameters['plotSaveName'] = plotSaveName
 
-	return run(parameters, plot_mode_parameters=mode_parameters, cacheBust=cacheBust)
+	return run(parameters, plot_mode_parameters=mode_parameters, useCache=useCache)
 
 
 
 # === Main ===
-def run(additional_parameters, plot_mode_parameters=None, cacheBust=None):
+def run(additional_parameters, plot_mode_parameters=None, useCache=False):
 	"""Legacy 'run' function from when DeviceHistory was treated more like a typical procedure with parameters."""
 
 	# Combine additional_parameters with the defaults
@@ -129,10 +130,11 @@ def run(additional_parameters, plot_mode_parameters=None, cacheBust=None):
 			deviceHistory = []
 			for dataFile in dataFileDependencies:
 				if(p['loadOnlyMostRecentExperiments']):
-					deviceHistory += dlu.loadMostRecentDeviceHistory(dlu.getDeviceDirectory(parameters), dataFile, numberOfRecentExperiments=p['numberOfRecentExperiments'], numberOfRecentIndexes=p['numberOfRecentIndexes'])
+					loadMostRecentDeviceHistory = dlu.loadMostRecentDeviceHistoryWithCaching if(useCache) else dlu.loadMostRecentDeviceHistory
+					deviceHistory += loadMostRecentDeviceHistory(dlu.getDeviceDirectory(parameters), dataFile, numberOfRecentExperiments=p['numberOfRecentExperiments'], numberOfRecentIndexes=p['numberOfRecentIndexes'])
 				else:
-					#deviceHistory += dlu.loadSpecificDeviceHistoryWithCaching((time.time() if(cacheBust is None) else cacheBust), dlu.getDeviceDirectory(parameters), dataFile, minIndex=p['minJSONIndex'], maxIndex=p['maxJSONIndex'], minExperiment=p['minJSONExperimentNumber'], maxExperiment=p['maxJSONExperimentNumber'], minRelativeIndex=p['minJSONRelativeIndex'], maxRelativeIndex=p['maxJSONRelativeIndex'])
-					deviceHistory += dlu.loadSpecificDeviceHistory(dlu.getDeviceDirectory(parameters), dataFile, minIndex=p['minJSONIndex'], maxIndex=p['maxJSONIndex'], minExperiment=p['minJSONExperimentNumber'], maxExperiment=p['maxJSONExperimentNumber'], minRelativeIndex=p['minJSONRelativeIndex'], maxRelativeIndex=p['maxJSONRelativeIndex'])
+					loadSpecificDeviceHistory = dlu.loadSpecificDeviceHistoryWithCaching if(useCache) else dlu.loadSpecificDeviceHistory
+					deviceHistory += loadSpecificDeviceHistory(dlu.getDeviceDirectory(parameters), dataFile, minIndex=p['minJSONIndex'], maxIndex=p['maxJSONIndex'], minExperiment=p['minJSONExperimentNumber'], maxExperiment=p['maxJSONExperimentNumber'], minRelativeIndex=p['minJSONRelativeIndex'], maxRelativeIndex=p['maxJSONRelativeIndex'])
 			
 			# If no data was loaded directly, check for possible linked data files
 			if(len(deviceHistory) == 0):
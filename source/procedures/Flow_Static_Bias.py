@@ -34,6 +34,12 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 		time.sleep(fsb_parameters['delayBeforeMeasurementsBegin'])
 	'''
 
+	# Stream the results to disk while they are collected
+	print('Streaming JSON: ' + str(dlu.getDeviceDirectory(parameters)))
+	recordData = dict(parameters)
+	recordData['Results'] = {key:[] for key in FLOW_STATIC_BIAS_RESULT_KEYS}
+	record = dlu.openJSONRecord(dlu.getDeviceDirectory(parameters), fsb_parameters['saveFileName'], recordData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']))
+	
 	results = runFlowStaticBias(smu_instance, 
 							drainVoltageSetPoint=fsb_parameters['drainVoltageSetPoint'],
 							gateVoltageSetPoint=fsb_parameters['gateVoltageSetPoint'],
@@ -45,6 +51,7 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 							flushPins=fsb_parameters['flushPins'],
 							cycleCount=fsb_parameters['cycleCount'],
 							solutions=fsb_parameters['solutions'],
+							record=record,
 							share=share)
 	smu_instance.rampGateVoltageTo(fsb_parameters['gateVoltageWhenDone'])
 	smu_instance.rampDrainVoltageTo(fsb_parameters['drainVoltageWhenDone'])
@@ -73,13 +80,9 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 	print('Min current: {:.4f}'.format(results['Computed']['id_min']))
 	print('Average noise: {:.4f}'.format(results['Computed']['avg_id_std']))
 
-	# Copy parameters and add in the test results
+	# Finish the streamed JSON object with the final parameters (the results are already on disk, so they are not returned)
 	jsonData = dict(parameters)
-	jsonData['Results'] = results['Raw']
-	
-	# Save results as a JSON object
-	print('Saving JSON: ' + str(dlu.getDeviceDirectory(parameters)))
-	dlu.saveJSON(dlu.getDeviceDirectory(parameters), fsb_parameters['saveFileName'], jsonData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']))
+	record.close(jsonData)
 	
 	return jsonData
 
@@ -110,21 +113,14 @@ def flushingPins(smu_instance, flushPins, reversePumpPins, pinToFlush):
 	time.sleep(1)
 
 # === Data Collection ===
-def runFlowStaticBias(smu_instance, drainVoltageSetPoint, gateVoltageSetPoint, measurementTime, flowDurations, subCycleDurations, pumpPins, reversePumpPins, flushPins, cycleCount, solutions, share=None):
-	
+FLOW_STATIC_BIAS_RESULT_KEYS = ['vds_data', 'id_data', 'vgs_data', 'ig_data', 'pump_on_intervals', 'pump_on_intervals_pin', 'timestamps', 'id_std', 'ig_std']
+
+def runFlowStaticBias(smu_instance, drainVoltageSetPoint, gateVoltageSetPoint, measurementTime, flowDurations, subCycleDurations, pumpPins, reversePumpPins, flushPins, cycleCount, solutions, record, share=None):
+	"""Collect flow static bias data, appending each point to the streamed record. Only the running statistics needed for the 'Computed'
+	values are kept in memory."""
 	smu_instance.digitalWrite(1, "LOW")
 	
-	vds_data = []
-	id_data = []
-	vgs_data = []
-	ig_data = []
-	pump_on_intervals = []
-	pump_on_intervals_pin = []
-	timestamps = []
-	vds_std = []
-	id_std = []
-	vgs_std = []
-	ig_std = []
+	statistics = dlu.newStreamedStatistics()
 	printStatement = "Starting Flow Static Bias"
 	printStatement = printStatement + (40 - len(printStatement)) * " "
 	# casting stuff as ints from strings
@@ -292,19 +288,10 @@ def runFlowStaticBias(smu_instance, drainVoltageSetPoint, gateVoltageSetPoint, m
 		# Save the median of all the measurements taken in this measurementTime window
 		timestamp = time.time()
 		vds_data_median = np.median(measurements['Vds_data'])
-		vds_data.append(vds_data_median)
 		id_data_median = np.median(measurements['Id_data'])
-		id_data.append(id_data_median)
 		vgs_data_median = np.median(measurements['Vgs_data'])
-		vgs_data.append(vgs_data_median)
 		ig_data_median = np.median(measurements['Ig_data'])
-		ig_data.append(ig_data_median)
-		timestamps.append(timestamp)
-		
-		pump_on_intervals.append(time.time() - startTime)
-		pump_on_intervals_pin.append(pinInQuestion)
-
-		timestamps.append(timestamp)
+		pump_on_interval = time.time() - startTime
 		
 		# If multiple data points were collected in this measurementTime, save their standard deviation
 		id_normalized = measurements['Id_data']
@@ -313,8 +300,12 @@ def runFlowStaticBias(smu_instance, drainVoltageSetPoint, gateVoltageSetPoint, m
 		ig_normalized = measurements['Ig_data']	
 		if(len(measurements['Ig_data']) >= 2):
 			ig_normalized = np.array(measurements['Ig_data']) - np.polyval(np.polyfit(range(len(measurements['Ig_data'])), measurements['Ig_data'], 1), np.array(measurements['Ig_data']))			
-		id_std.append(np.std(id_normalized))
-		ig_std.append(np.std(ig_normalized))
+		id_std = np.std(id_normalized)
+		ig_std = np.std(ig_normalized)
+		
+		# Stream this point to disk (each timestamp is saved twice, as it always has been) and update the running statistics
+		record.extend({'vds_data':[vds_data_median], 'id_data':[id_data_median], 'vgs_data':[vgs_data_median], 'ig_data':[ig_data_median], 'pump_on_intervals':[pump_on_interval], 'pump_on_intervals_pin':[pinInQuestion], 'timestamps':[timestamp, timestamp], 'id_std':[id_std], 'ig_std':[ig_std]})
+		dlu.updateStreamedStatistics(statistics, id_data_median, id_std, timestamp)
 
 		# Send a data message
 		pipes.livePlotUpdate(share,plots=
@@ -355,39 +346,10 @@ def runFlowStaticBias(smu_instance, drainVoltageSetPoint, gateVoltageSetPoint, m
 	print('Completed static bias in "' + '{:.4f}'.format(endTime - startTime) + '" seconds.')
 
 	return {
-		'Raw':{
-			'vds_data':vds_data,
-			'id_data':id_data,
-			'vgs_data':vgs_data,
-			'ig_data':ig_data,
-			'pump_on_intervals':pump_on_intervals,
-			'pump_on_intervals_pin':pump_on_intervals_pin,
-			'timestamps':timestamps,
-			'id_std':id_std,
-			'ig_std':ig_std,
-		},
 		'Computed':{
-			'id_max':max(id_data),
-			'id_min':min(id_data),
-			'avg_id_std':np.mean(id_std),
-			'tau_settle':settlingTimeConstant(timestamps, id_data)
+			'id_max':statistics['id_max'],
+			'id_min':statistics['id_min'],
+			'avg_id_std':statistics['id_std_sum']/max(statistics['count'], 1),
+			'tau_settle':dlu.streamedSettlingTimeConstant(record, statistics)
 		}
 	}
-	
-	
-	
-	
-def settlingTimeConstant(timestamps, id_data):
-	id_start = id_data[0]
-	id_mean = np.mean(id_data)
-	id_settled = (id_start - id_mean)*np.exp(-1) + id_mean
-	i_settled = -1
-	if(len(id_data) > 2):
-		for i in range(len(id_data) - 1):
-			if(((id_data[i] <= id_settled) and (id_data[i+1] >= id_settled)) or ((id_data[i] >= id_settled) and (id_data[i+1] <= id_settled))):
-				i_settled = i
-				break
-	return (timestamps[i_settled] - timestamps[0])
-	
-
-
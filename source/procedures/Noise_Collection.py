@@ -48,19 +48,36 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 	
 	# Save results as a JSON object
 	print('Saving JSON: ' + str(dlu.getDeviceDirectory(parameters)))
-	dlu.saveJSON(dlu.getDeviceDirectory(parameters), rt_params['saveFileName'], jsonData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']))
+	dlu.saveJSON(dlu.getDeviceDirectory(parameters), rt_params['saveFileName'], jsonData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']), binaryResults=rt_params['saveBinaryResults'])
 	
 	return jsonData
 
 # === Data Collection ===
 def runNoiseCollection(smu_instance, measurementSpeed, drainVoltage, gateVoltage, points, share=None):
 	triggerInterval = 1/measurementSpeed
-	points = min(points, 100e3)
+	points = int(min(points, 100e3))
 	startTime = time.time()
 
-	pipes.progressUpdate(share, 'Noise Collection', start=0, current=0, end=1)
-	measurements = smu_instance.takeSweep(drainVoltage, drainVoltage, gateVoltage, gateVoltage, points, triggerInterval=triggerInterval, includeVoltages=False)
-	pipes.progressUpdate(share, 'Noise Collection', start=0, current=1, end=1)
+	# Read the samples while they are being measured, streaming each chunk to the UI through shared memory (too many points to send as live-plot messages)
+	pipes.progressUpdate(share, 'Noise Collection', start=0, current=0, end=points)
+	stream = pipes.openLiveStream(share, plotID='Noise', labels=['Drain Current', 'Gate Current'], xAxisTitle='Time (s)', yAxisTitle='Current (A)')
+	sweep = smu_instance.streamSweep(drainVoltage, drainVoltage, gateVoltage, gateVoltage, points, triggerInterval=triggerInterval, includeVoltages=False)
+	chunks = []
+	pointsCollected = 0
+	try:
+		for chunk in sweep:
+			chunks.append(chunk)
+			pointsCollected += len(chunk['timestamps'])
+			if(stream is not None):
+				stream.write(chunk['timestamps'], [chunk['Id_data'], chunk['Ig_data']])
+			pipes.progressUpdate(share, 'Noise Collection', start=0, current=pointsCollected, end=points)
+			pipes.checkAbortStatus(share)
+	finally:
+		# Stops the sweep on the instrument if the procedure was aborted
+		sweep.close()
+		pipes.closeLiveStream(share, stream)
+	
+	measurements = {key:np.concatenate([chunk[key] for chunk in chunks]) if(len(chunks) > 0) else np.array([]) for key in ['Id_data', 'Ig_data', 'timestamps']}
 
 	print('Time elapsed is {} s'.format(time.time() - startTime))
 
@@ -68,12 +85,9 @@ def runNoiseCollection(smu_instance, measurementSpeed, drainVoltage, gateVoltage
 		'Raw':{
 			'id_data': measurements['Id_data'],
 			'ig_data': measurements['Ig_data'],
-			'timestamps': [t + startTime for t in measurements['timestamps']]
+			'timestamps': measurements['timestamps'] + startTime
 		},
 		'Computed':{
 			
 		}
 	}
-
-
-	
\ No newline at end of file
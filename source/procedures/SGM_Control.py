@@ -108,6 +108,22 @@ def runAFM(parameters, smu_systems, share=None):
 	if(afm_parameters['startOnFrameSwitch']):
 		waitForFrameSwitch(smu_secondary, lineTime)
 	
+	# Stream the device current of every line to the UI through shared memory (too many points to send as live-plot messages)
+	stream = pipes.openLiveStream(share, plotID='SGM Current vs. Time', labels=['Drain Current', 'Gate Current'], xAxisTitle='Time (s)', yAxisTitle='Current (A)')
+	streamStartTime = time.time()
+	try:
+		runAFMscans(parameters, smu_systems, afm_parameters, sleep_time1, sleep_time2, lineTime, stream, streamStartTime)
+	finally:
+		pipes.closeLiveStream(share, stream)
+	
+	# smu_device.turnChannelsOff()
+
+
+
+def runAFMscans(parameters, smu_systems, afm_parameters, sleep_time1, sleep_time2, lineTime, stream=None, streamStartTime=0):
+	smu_device = smu_systems['deviceSMU']
+	smu_secondary = smu_systems['secondarySMU']
+	
 	for scan in range(afm_parameters['scans']):
 		print('Starting scan {} of {}'.format(scan+1, afm_parameters['scans']))
 		
@@ -131,6 +147,9 @@ def runAFM(parameters, smu_systems, share=None):
 				print('Ending scan due to line timeout')
 				break
 			
+			if(stream is not None):
+				stream.write(np.array(results['Raw']['timestamps_device']) - streamStartTime, [results['Raw']['id_data'], results['Raw']['ig_data']])
+			
 			# Determine frame switch
 			if False:
 				meanY = np.mean(results['Raw']['smu2_v1_data'])
@@ -158,8 +177,6 @@ def runAFM(parameters, smu_systems, share=None):
 			threading.Thread(target=dlu.saveJSON,
 				args=(dlu.getDeviceDirectory(parameters), afm_parameters['saveFileName'], jsonData, parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']))
 			).start()
-	
-	# smu_device.turnChannelsOff()
 
 
 
@@ -44,10 +44,20 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 		print('Waiting for: ' + str(sb_parameters['delayBeforeMeasurementsBegin']) + ' seconds before measurements begin.')
 		time.sleep(sb_parameters['delayBeforeMeasurementsBegin'])
 
+	# Stream the results to disk while they are collected (plus a 2nd data file under a different name if one or more of the channels is in high-resistance mode)
+	print('Streaming JSON: ' + str(dlu.getDeviceDirectory(parameters)))
+	recordData = dict(parameters)
+	recordData['Results'] = {key:[] for key in STATIC_BIAS_RESULT_KEYS}
+	saveFileNames = [sb_parameters['saveFileName']]
+	if((not sb_parameters['supplyGateVoltage']) or (not sb_parameters['supplyDrainVoltage'])):
+		saveFileNames.append(sb_parameters['secondaryFileName'])
+	records = [dlu.openJSONRecord(dlu.getDeviceDirectory(parameters), saveFileName, recordData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber'])) for saveFileName in saveFileNames]
+	
 	results = runStaticBias(smu_instance, 
 							arduino_instance,
 							totalBiasTime=sb_parameters['totalBiasTime'], 
 							measurementTime=sb_parameters['measurementTime'],
+							records=records,
 							share=share)
 	
 	# Ramp bias voltages to their "when done" values (or exit high-resistance mode if it was previously enabled)
@@ -87,32 +97,20 @@ def run(parameters, smu_systems, arduino_systems, share=None):
 	print('Min current: {:.4f}'.format(results['Computed']['id_min']))
 	print('Average noise: {:.4f}'.format(results['Computed']['avg_id_std']))
 
-	# Copy parameters and add in the test results
+	# Finish the streamed JSON objects with the final parameters (the results are already on disk, so they are not returned)
 	jsonData = dict(parameters)
-	jsonData['Results'] = results['Raw']
-	
-	# Save results as a JSON object
-	print('Saving JSON: ' + str(dlu.getDeviceDirectory(parameters)))
-	dlu.saveJSON(dlu.getDeviceDirectory(parameters), sb_parameters['saveFileName'], jsonData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']))
-	
-	# Save a 2nd data file under a different name if one or more of the channels was in high-resistance mode
-	if((not sb_parameters['supplyGateVoltage']) or (not sb_parameters['supplyDrainVoltage'])):
-		dlu.saveJSON(dlu.getDeviceDirectory(parameters), sb_parameters['secondaryFileName'], jsonData, subDirectory=parameters['experimentSubFolder']+str(parameters['startIndexes']['experimentNumber']))
+	for record in records:
+		record.close(jsonData)
 	
 	return jsonData
 
 # === Data Collection ===
-def runStaticBias(smu_instance, arduino_instance, totalBiasTime, measurementTime, share=None):
-	vds_data = []
-	id_data = []
-	vgs_data = []
-	ig_data = []
-	timestamps = []
-	vds_std = []
-	id_std = []
-	vgs_std = []
-	ig_std = []
-	arduino_data = []
+STATIC_BIAS_RESULT_KEYS = ['vds_data', 'id_data', 'vgs_data', 'ig_data', 'timestamps', 'id_std', 'ig_std', 'arduino_data']
+
+def runStaticBias(smu_instance, arduino_instance, totalBiasTime, measurementTime, records, share=None):
+	"""Collect static bias data, appending each point to every streamed record in records. Only the running statistics needed for
+	the 'Computed' values are kept in memory."""
+	statistics = dlu.newStreamedStatistics()
 
 	# Get the SMU measurement speed
 	smu_measurementsPerSecond = smu_instance.measurementsPerSecond
@@ -170,12 +168,7 @@ def runStaticBias(smu_instance, arduino_instance, totalBiasTime, measurementTime
 		id_data_median = np.median(measurements['Id_data'])
 		vgs_data_median = np.median(measurements['Vgs_data'])
 		ig_data_median = np.median(measurements['Ig_data'])
-		vds_data.append(vds_data_median)
-		id_data.append(id_data_median)
-		vgs_data.append(vgs_data_median)
-		ig_data.append(ig_data_median)
-		timestamps.append(timestamp)
-		arduino_data.append(arduino_instance.takeMeasurement())
+		arduino_data = arduino_instance.takeMeasurement()
 
 		# If multiple data points were collected in this measurementTime, save their standard deviation
 		id_normalized = measurements['Id_data']
@@ -184,8 +177,13 @@ def runStaticBias(smu_instance, arduino_instance, totalBiasTime, measurementTime
 		ig_normalized = measurements['Ig_data']	
 		if(len(measurements['Ig_data']) >= 2):
 			ig_normalized = np.array(measurements['Ig_data']) - np.polyval(np.polyfit(range(len(measurements['Ig_data'])), measurements['Ig_data'], 1), np.array(measurements['Ig_data']))			
-		id_std.append(np.std(id_normalized))
-		ig_std.append(np.std(ig_normalized))
+		id_std = np.std(id_normalized)
+		ig_std = np.std(ig_normalized)
+		
+		# Stream this point to disk and update the running statistics
+		for record in records:
+			record.append({'vds_data':vds_data_median, 'id_data':id_data_median, 'vgs_data':vgs_data_median, 'ig_data':ig_data_median, 'timestamps':timestamp, 'id_std':id_std, 'ig_std':ig_std, 'arduino_data':arduino_data})
+		dlu.updateStreamedStatistics(statistics, id_data_median, id_std, timestamp)
 
 		# Send a data message
 		pipes.livePlotUpdate(share,plots=
@@ -212,32 +210,10 @@ def runStaticBias(smu_instance, arduino_instance, totalBiasTime, measurementTime
 	print('Completed static bias in "' + '{:.4f}'.format(endTime - startTime) + '" seconds.')
 
 	return {
-		'Raw':{
-			'vds_data':vds_data,
-			'id_data':id_data,
-			'vgs_data':vgs_data,
-			'ig_data':ig_data,
-			'timestamps':timestamps,
-			'id_std':id_std,
-			'ig_std':ig_std,
-			'arduino_data':arduino_data,
-		},
 		'Computed':{
-			'id_max':max(id_data),
-			'id_min':min(id_data),
-			'avg_id_std':np.mean(id_std),
-			'tau_settle':settlingTimeConstant(timestamps, id_data)
+			'id_max':statistics['id_max'],
+			'id_min':statistics['id_min'],
+			'avg_id_std':statistics['id_std_sum']/max(statistics['count'], 1),
+			'tau_settle':dlu.streamedSettlingTimeConstant(records[0], statistics)
 		}
 	}
-	
-def settlingTimeConstant(timestamps, id_data):
-	id_start = id_data[0]
-	id_mean = np.mean(id_data)
-	id_settled = (id_start - id_mean)*np.exp(-1) + id_mean
-	i_settled = -1
-	if(len(id_data) > 2):
-		for i in range(len(id_data) - 1):
-			if(((id_data[i] <= id_settled) and (id_data[i+1] >= id_settled)) or ((id_data[i] >= id_settled) and (id_data[i+1] <= id_settled))):
-				i_settled = i
-				break
-	return (timestamps[i_settled] - timestamps[0])
@@ -0,0 +1,63 @@
+"""Run from the 'source' folder with: python -m pytest tests"""
+
+import numpy as np
+
+from utilities import DataLoggerUtility as dlu
+
+
+
+# === Loose Filtering ===
+def saveEntries(directory, count):
+	for i in range(count):
+		dlu.saveJSON(str(directory), 'GateSweep', {'Results':{'id_data':[i]}})
+
+def test_looseFilteringFindsHeaderOfSerializedLines(tmp_path):
+	line = dlu.serializeJSONLine({'index':3, 'experimentNumber':1, 'Results':{'id_data':[1]}})[0].decode('utf-8')
+	assert line.startswith('{"index": 3')
+	assert dlu.fileLineHasLooseValue(line, 'index', 3)
+	assert dlu.filterFileLines([line], 'index', 3, looseFiltering=True) == [line]
+
+def test_looseFilteringKeepsEveryLineThatStrictFilteringKeeps(tmp_path):
+	saveEntries(tmp_path, 3)
+	strict = dlu.loadJSON_fast(str(tmp_path), 'GateSweep.json', minIndex=0, maxIndex=10)
+	loose = dlu.loadJSON_fast(str(tmp_path), 'GateSweep.json', minIndex=0, maxIndex=10, looseFiltering=True)
+	assert len(strict) == 3
+	assert [entry['index'] for entry in loose] == [entry['index'] for entry in strict]
+	assert [entry['index'] for entry in dlu.loadJSON_fast(str(tmp_path), 'GateSweep.json', minIndex=1, maxIndex=1, looseFiltering=True)] == [1]
+
+def test_looseFilteringMatchesNestedValues(tmp_path):
+	line = dlu.serializeJSONLine({'index':0, 'experimentNumber':1, 'DeviceCycling':{'deviceIndexes':{'1':{'index':7, 'experimentNumber':4}}}})[0].decode('utf-8')
+	assert dlu.filterStringArrayByIndexAndExperiment(str(tmp_path), [line], minExperiment=4, maxExperiment=4, looseFiltering=True) == [line]
+	assert dlu.filterStringArrayByIndexAndExperiment(str(tmp_path), [line], minExperiment=4, maxExperiment=4) == []
+
+
+
+# === Binary Results ===
+def test_binaryResultsLoadAsTheSameListsAsJSON(tmp_path):
+	results = {'id_data':[0.5, 1.5, 2.5], 'vgs_data':[[1.0, 2.0], [3.0, 4.0]], 'rows':[[1.0], [2.0, 3.0]], 'note':'text'}
+	dlu.saveJSON(str(tmp_path), 'Binary', {'Results':dict(results, id_data=np.array(results['id_data']))}, binaryResults=True)
+	dlu.saveJSON(str(tmp_path), 'Text', {'Results':results})
+	binaryResults = dlu.loadJSON(str(tmp_path), 'Binary.json')[0]['Results']
+	assert binaryResults == dlu.loadJSON(str(tmp_path), 'Text.json')[0]['Results']
+	assert all(isinstance(binaryResults[key], list) for key in ['id_data', 'vgs_data', 'rows'])
+
+
+
+# === Line Index ===
+def test_lineIndexEntriesWithoutPropertiesAreSkipped(tmp_path):
+	experimentDirectory = tmp_path / 'Ex1'
+	experimentDirectory.mkdir()
+	with open(str(experimentDirectory / 'GateSweep.json'), 'wb') as file:
+		for i in range(2):
+			file.write(dlu.serializeJSONLine({'index':i, 'experimentNumber':1, 'Results':{'id_data':[i]}})[0])
+		file.write(b'{"Results": {"id_data": [2]}}\n')
+	assert dlu.buildJSONLineIndex(str(experimentDirectory), 'GateSweep.json') is not None
+	assert dlu.getIndexesForExperiments(str(tmp_path), 0, 10) == [0, 1]
+
+def test_loadingDoesNotRewriteTheLineIndex(tmp_path):
+	saveEntries(tmp_path, 2)
+	with open(str(tmp_path / 'GateSweep.json'), 'a') as file:
+		file.write('{"Results": {"id_data": [2]}}\n')
+	dlu.removeJSONLineIndex(str(tmp_path), 'GateSweep.json')
+	assert len(dlu.loadJSON_fast(str(tmp_path), 'GateSweep.json')) == 3
+	assert not (tmp_path / 'GateSweep.json.idx').exists()
@@ -1,5 +1,5 @@
-import copy
 import glob
+import hashlib
 import io
 import json
 import os
@@ -7,7 +7,6 @@ import socket
 import sys
 import time
 import webbrowser
-from collections import Mapping, Sequence
 
 import numpy as np
 import flask
@@ -23,10 +22,15 @@ from procedures import Chip_History as CH
 CH.dpu.mplu.plt.switch_backend('agg')
 
 from utilities import DataLoggerUtility as dlu
+from utilities import WorkspaceTreeUtility as wtu
+from utilities import PlotCacheUtility as pcu
+from utilities import PlotRenderUtility as pru
+from utilities import ResponseCompressionUtility as rcu
 
 # === Constants ===
 SOCKETIO_DEFAULT_IP_ADDRESS = '127.0.0.1'
-UI_REFRESH_DELAY_SECONDS = 0.01
+UI_MESSAGE_WAIT_SECONDS = 1.0
+UI_LIVE_STREAM_REFRESH_SECONDS = 0.1
 
 CONFIG_FILE_NAME = 'Config.json'
 CONFIG_DOC_PREFIX = 'Config_Doc'
@@ -35,23 +39,20 @@ HELP_DOC_PREFIX = 'Doc'
 CONFIG_DOC_SUFFIX = '.json'
 HELP_DOC_SUFFIX = '.json'
 
+CACHED_PLOT_ENDPOINTS = ['sendExperimentPlot', 'sendDevicePlot', 'sendChipPlot']
+CONDITIONAL_DATA_ENDPOINTS = ['experiments', 'indexes', 'saveCSV', 'sendParameterPlot']
+PLOT_RENDER_STATUS_CODES = {'failed':500, 'timeout':504, 'cancelled':204, 'rejected':503}
+
 # === Globals ===
 share = None
+workspace_tree = None
+plot_cache = pcu.PlotCache()
+plot_render_pool = None
+
+# Changes whenever plot definitions are added, removed, or changed, so that the possible plots saved with experiment summaries are found again
+possible_plots_version = hashlib.sha1(json.dumps({plotType:definition['description'] for plotType, definition in DH.dpu.plotDefinitions.items()}, sort_keys=True, default=str).encode('utf-8')).hexdigest()
 
 # === Defaults ===
-default_makePlot_parameters = {
-	'minExperiment': None,
-	'maxExperiment': None,
-	'minRelativeIndex': 0,
-	'maxRelativeIndex': float('inf'),
-	'specificPlot': '',
-	'plotSaveName': '',
-	'dataFolder': None,
-	'saveFolder': None,
-	'saveFigures': False,
-	'showFigures': True,
-	'plot_mode_parameters': None
-}
 default_data_path = '../../AutexysData/'
 
 # === Paths ===
@@ -90,12 +91,39 @@ socketio = flask_socketio.SocketIO(app)
 # Infinite loop for a background thread to handle UI messages that show up in the 'share' global shared memory object
 def managerMessageForwarder():
 	global share
+	liveStreamReaders = {}
 	
 	while(True):
-		while pipes.poll(share, 'QueueToUI'):
+		message = waitForManagerMessage(UI_LIVE_STREAM_REFRESH_SECONDS if(len(liveStreamReaders) > 0) else UI_MESSAGE_WAIT_SECONDS)
+		while(message is not None):
+			if(message.get('type') == 'LiveStreamStarted'):
+				liveStreamReaders[message['stream']] = pipes.LiveStreamReader(share, message)
+			elif(message.get('type') == 'LiveStreamStopped'):
+				if((message['stream'] in liveStreamReaders) and (liveStreamReaders[message['stream']].generation == message['generation'])):
+					liveStreamReaders[message['stream']].stopped = True
+			else:
+				socketio.emit('Server Message', message)
 			message = pipes.recv(share, 'QueueToUI')
-			socketio.emit('Server Message', message)
-		socketio.sleep(UI_REFRESH_DELAY_SECONDS)
+		
+		# Send the samples written to each live stream since the last time (decimated for display) as live-plot data
+		for index, reader in list(liveStreamReaders.items()):
+			plotMessage = reader.readPlotMessage()
+			if(plotMessage is not None):
+				socketio.emit('Server Message', plotMessage)
+			if(reader.stopped):
+				reader.release()
+				del liveStreamReaders[index]
+
+def waitForManagerMessage(timeout):
+	"""Wait up to timeout seconds for the next message to the UI. With gevent (or eventlet) the Queue is read in a real thread from its
+	thread pool, so every other request is still served while waiting."""
+	if(socketio.async_mode in ['gevent', 'gevent_uwsgi']):
+		import gevent
+		return gevent.get_hub().threadpool.apply(pipes.recv, (share, 'QueueToUI', timeout))
+	if(socketio.async_mode == 'eventlet'):
+		import eventlet.tpool
+		return eventlet.tpool.execute(pipes.recv, share, 'QueueToUI', timeout)
+	return pipes.recv(share, 'QueueToUI', timeout=timeout)
 
 # Create UI handler thread when socketio is connected
 managerMessageForwarderthread = None
@@ -138,12 +166,41 @@ def sendResourceFilesFromCorrectDirectory(path):
 # Disable server-side caching
 @app.after_request
 def add_header(response):
+	# Cached plots and data responses set their own ETag and Cache-Control headers so that the browser revalidates them instead
+	if(flask.request.endpoint in (CACHED_PLOT_ENDPOINTS + CONDITIONAL_DATA_ENDPOINTS)):
+		return response
 	response.cache_control.max_age = 0
 	response.cache_control.no_store = True
 	if('Cache-Control' not in response.headers):
 		response.headers['Cache-Control'] = 'no-store'
 	return response
 
+# Compress JSON, CSV, and other text responses if the browser accepts it (files sent from disk, like PNG plots, are left as they are)
+@app.after_request
+def compress_response(response):
+	if((response.status_code != 200) or response.direct_passthrough or ('Content-Encoding' in response.headers) or (response.mimetype not in rcu.COMPRESSIBLE_MIMETYPES)):
+		return response
+	response.vary.add('Accept-Encoding')
+	
+	encoding = rcu.negotiateEncoding(flask.request.headers.get('Accept-Encoding'), streaming=response.is_streamed)
+	if(encoding is None):
+		return response
+	if(response.is_streamed):
+		response.response = rcu.compressChunks(response.response, encoding, charset=response.charset)
+		response.headers.pop('Content-Length', None)
+	else:
+		data = response.get_data()
+		if(len(data) < rcu.COMPRESSION_MIN_BYTES):
+			return response
+		response.set_data(rcu.compress(data, encoding))
+	response.headers['Content-Encoding'] = encoding
+	
+	# The compressed bytes differ from the uncompressed ones, so the ETag only promises that their content is the same
+	etag, weak = response.get_etag()
+	if((etag is not None) and not weak):
+		response.set_etag(etag, weak=True)
+	return response
+
 
 
 # === Webbrowser ===
@@ -185,6 +242,11 @@ def start(share={}, debug=True, use_reloader=True, specific_port=None):
 			url = 'http://'+ SOCKETIO_DEFAULT_IP_ADDRESS +':{:}/ui/index.html'.format(port)
 			socketio.start_background_task(launchBrowser, url)
 	
+	# Start the plot rendering processes now, rather than when the first plot is requested. With the reloader, this process only watches
+	# for changes and the server runs in a child process (marked by WERKZEUG_RUN_MAIN), so only that child starts them.
+	if((not use_reloader) or (os.environ.get('WERKZEUG_RUN_MAIN') == 'true')):
+		getPlotRenderPool().start()
+	
 	# app.run(debug=True, threaded=False, port=int(os.environ['AutexysUIPort']))
 	socketio.run(app, debug=debug, port=int(os.environ['AutexysUIPort']), use_reloader=use_reloader)
 
@@ -205,27 +267,50 @@ def makeShareGlobal(localShare):
 
 # === JSON Formatting ===
 def jsonvalid(obj):
-	return json.dumps(replaceInfNan(obj))
-
-def replaceInfNan(obj):
-	if isinstance(obj, float):
-		if np.isnan(obj):
-			return None
-		if obj == float('inf'):
-			return 1e99
-		if obj == -float('inf'):
-			return -1e99
-		return obj
-	elif isinstance(obj, str):
-		return obj
-	elif isinstance(obj, bytes):
-		return obj
-	elif isinstance(obj, Sequence):
-		return [replaceInfNan(item) for item in obj]
-	elif isinstance(obj, Mapping):
-		return dict((key, replaceInfNan(value)) for key, value in obj.items())
+	return dlu.encodeJSONResponse(obj)
+
+
+
+# === Conditional Responses ===
+def conditionalResponse(validator, makeResponse):
+	"""Respond with 304 Not Modified if the request's If-None-Match holds the ETag made from validator (the modification times of the
+	files a response is made from, plus anything else it depends on), and otherwise with makeResponse(), tagged with that ETag."""
+	etag = hashlib.sha1(json.dumps(validator, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+	if(flask.request.if_none_match.contains_weak(etag)):
+		response = flask.Response(status=304)
 	else:
-		return obj
+		response = flask.make_response(makeResponse())
+	response.set_etag(etag)
+	response.cache_control.no_cache = True
+	return response
+
+def dataFilesFingerprint(*patterns):
+	"""The path, size, and modification time of every file that matches any of the glob patterns."""
+	fingerprint = []
+	for path in sorted(set(p for pattern in patterns for p in glob.glob(pattern))):
+		try:
+			fileStatus = os.stat(path)
+			fingerprint.append((path, fileStatus.st_size, fileStatus.st_mtime_ns))
+		except OSError:
+			pass
+	return fingerprint
+
+
+
+# === Workspace Tree Cache ===
+def getWorkspaceTree():
+	"""The cache of folders in the current workspace, which is replaced whenever the workspace data folder changes."""
+	global workspace_tree
+	if((workspace_tree is None) or (workspace_tree.rootPath != os.path.abspath(workspace_data_path))):
+		if(workspace_tree is not None):
+			workspace_tree.stop()
+		workspace_tree = wtu.WorkspaceTree(workspace_data_path)
+		workspace_tree.start()
+	return workspace_tree
+
+@app.route('/cacheStatistics.json')
+def cacheStatistics():
+	return jsonvalid({'workspaceTree': getWorkspaceTree().stats(), 'deviceHistoryCache': getPlotRenderPool().deviceHistoryCacheStats(), 'plotCache': plot_cache.stats(), 'plotRenderPool': getPlotRenderPool().stats()})
 
 
 
@@ -333,14 +418,12 @@ def getConfigurationFilenames(systemType):
 # === Browser ===
 @app.route('/users.json')
 def users():
-	paths = glob.glob(os.path.join(workspace_data_path, '*/'))
-	names = [os.path.basename(os.path.dirname(p)) for p in paths]
+	names = getWorkspaceTree().listFolders()
 	return jsonvalid(names)
 
 @app.route('/<user>/projects.json')
 def projects(user):
-	paths = glob.glob(os.path.join(workspace_data_path, user, '*/'))
-	names = [os.path.basename(os.path.dirname(p)) for p in paths]
+	names = getWorkspaceTree().listFolders(user)
 	
 	projects = [{'name': n} for n in names]
 	
@@ -348,16 +431,17 @@ def projects(user):
 
 @app.route('/<user>/<project>/wafers.json')
 def wafers(user, project):
-	paths = glob.glob(os.path.join(workspace_data_path, user, project, '*/'))
-	names = [os.path.basename(os.path.dirname(p)) for p in paths if((os.path.basename(os.path.dirname(p)) != 'schedules') or (len(glob.glob(os.path.join(p, '*/'))) > 0))]
-	modificationTimes = [os.path.getmtime(p) for p in paths]
-	sizes = [recursiveFileSize(p) for p in paths]
-	chipCounts = [len(glob.glob(p + '/*/')) for p in paths]
-	
-	indexFileLists = [glob.glob(p + '/**/index.json', recursive=True) for p in paths]
-	indexObjectLists = [[dlu.loadJSONIndex(os.path.dirname(indexFile)) for indexFile in indexFileList] for indexFileList in indexFileLists]
-	indexCounts = [sum([(i['index'] if 'index' in i else 0) for i in indexObjectList]) for indexObjectList in indexObjectLists]
-	experimentCounts = [sum([(i['experimentNumber'] if 'experimentNumber' in i else 0) for i in indexObjectList]) for indexObjectList in indexObjectLists]
+	tree = getWorkspaceTree()
+	names = [n for n in tree.listFolders(user, project) if((n != 'schedules') or (len(tree.listFolders(user, project, n)) > 0))]
+	modificationTimes = [tree.modificationTime(user, project, n) for n in names]
+	chipCounts = [len(tree.listFolders(user, project, n)) for n in names]
+	
+	# Sizes and counts are added up from the workspace catalog instead of crawling every device
+	totals = catalogTotals(dlu.loadWorkspaceCatalog(workspace_data_path, user, project, indexModificationTimes=deviceIndexModificationTimes(user, project)), 'wafer')
+	waferTotals = [totals.get(n, {}) for n in names]
+	sizes = [t.get('size', 0) for t in waferTotals]
+	indexCounts = [t.get('indexCount', 0) for t in waferTotals]
+	experimentCounts = [t.get('experimentCount', 0) for t in waferTotals]
 	
 	abreviatedPaths = ['Workspace' + os.sep + str(user) + os.sep + str(project) + os.sep + str(n) + os.sep for n in names]
 	
@@ -367,17 +451,17 @@ def wafers(user, project):
 
 @app.route('/<user>/<project>/<wafer>/chips.json')
 def chips(user, project, wafer):
-	paths = glob.glob(os.path.join(workspace_data_path, user, project, wafer, '*/'))
-	names = [os.path.basename(os.path.dirname(p)) for p in paths]
-	modificationTimes = [os.path.getmtime(p) for p in paths]
-	sizes = [recursiveFileSize(p) for p in paths]
-	
-	subPathsList = [glob.glob(p + '/*/') for p in paths]
-	deviceCounts = [len(subPaths) for subPaths in subPathsList]
-	
-	indexObjectLists = [[dlu.loadJSONIndex(p) for p in subPaths] for subPaths in subPathsList]
-	indexCounts = [sum([(i['index'] if 'index' in i else 0) for i in indexObjectList]) for indexObjectList in indexObjectLists]
-	experimentCounts = [sum([(i['experimentNumber'] if 'experimentNumber' in i else 0) for i in indexObjectList]) for indexObjectList in indexObjectLists]
+	tree = getWorkspaceTree()
+	names = tree.listFolders(user, project, wafer)
+	modificationTimes = [tree.modificationTime(user, project, wafer, n) for n in names]
+	
+	# Sizes and counts are added up from the workspace catalog instead of crawling every device
+	totals = catalogTotals(dlu.loadWorkspaceCatalog(workspace_data_path, user, project, wafer=wafer, indexModificationTimes=deviceIndexModificationTimes(user, project, wafer=wafer)), 'chip')
+	chipTotals = [totals.get(n, {}) for n in names]
+	sizes = [t.get('size', 0) for t in chipTotals]
+	deviceCounts = [t.get('deviceCount', 0) for t in chipTotals]
+	indexCounts = [t.get('indexCount', 0) for t in chipTotals]
+	experimentCounts = [t.get('experimentCount', 0) for t in chipTotals]
 	
 	abreviatedPaths = ['Workspace' + os.sep + str(user) + os.sep + str(project) + os.sep + str(wafer) + os.sep + str(n) + os.sep for n in names]
 	
@@ -387,14 +471,15 @@ def chips(user, project, wafer):
 
 @app.route('/<user>/<project>/<wafer>/<chip>/devices.json')
 def devices(user, project, wafer, chip):
-	paths = glob.glob(os.path.join(workspace_data_path, user, project, wafer, chip, '*/'))
-	names = [os.path.basename(os.path.dirname(p)) for p in paths]
-	modificationTimes = [os.path.getmtime(p+'ParametersHistory.json') if os.path.exists(p+'ParametersHistory.json') else os.path.getmtime(p) for p in paths]
-	sizes = [recursiveFileSize(p) for p in paths]
+	names = getWorkspaceTree().listFolders(user, project, wafer, chip)
 	
-	indexObjects = [dlu.loadJSONIndex(p) for p in paths]
-	indexCounts = [i['index'] for i in indexObjects]
-	experimentCounts = [i['experimentNumber'] for i in indexObjects]
+	# Everything else comes from the workspace catalog instead of reading every device
+	catalog = {row['device']: row for row in dlu.loadWorkspaceCatalog(workspace_data_path, user, project, wafer=wafer, chip=chip, indexModificationTimes=deviceIndexModificationTimes(user, project, wafer=wafer, chip=chip))}
+	deviceTotals = [catalog.get(n, {}) for n in names]
+	modificationTimes = [t.get('modificationTime', 0) for t in deviceTotals]
+	sizes = [t.get('size', 0) for t in deviceTotals]
+	indexCounts = [t.get('indexCount', 0) for t in deviceTotals]
+	experimentCounts = [t.get('experimentCount', 0) for t in deviceTotals]
 	
 	abreviatedPaths = ['Workspace' + os.sep + str(user) + os.sep + str(project) + os.sep + str(wafer) + os.sep + str(chip) + os.sep + str(n) + os.sep for n in names]
 	
@@ -404,73 +489,49 @@ def devices(user, project, wafer, chip):
 
 @app.route('/<user>/<project>/<wafer>/<chip>/<device>/experiments.json')
 def experiments(user, project, wafer, chip, device):	
+	"""The parameters, data files, and possible plots of every experiment of a device, from its experiment summary index. The list can be
+	paged with '?offset=&limit=', in which case the 'X-Total-Count' header holds the total number of experiments."""
 	folder = os.path.join(workspace_data_path, user, project, wafer, chip, device)
-	
-	paths = glob.glob(os.path.join(folder, '*/'))
-	names = [os.path.basename(os.path.dirname(p)) for p in paths]
-	
-	# Load all found experiment folders and make a dictionary of experiments
-	experimentDictionary = {}
-	for name in names:
-		if(defaults.EXPERIMENT_FOLDER_PREFIX in name and name.replace(defaults.EXPERIMENT_FOLDER_PREFIX, '').isdigit()):
-			experimentDictionary[int(name.replace(defaults.EXPERIMENT_FOLDER_PREFIX, ''))] = None
-	
-	# Load parameters history
 	try:
-		parametersHistory = dlu.loadJSON(folder, 'ParametersHistory.json')
-	except:
-		parametersHistory = []
-
-	# For every experiment that has a "ParametersHistory.json", add that to the information to the dictionary of experiments
-	for experimentParameters in parametersHistory:
-		experimentDictionary[experimentParameters['startIndexes']['experimentNumber']] = experimentParameters
-	
-	for experimentNumber in experimentDictionary.keys():
-		# If an experiment had no "ParametersHistory.json", load the last known data entry for that experiment and use it to reconstruct as much info as possible
-		experimentFolder = os.path.join(folder, defaults.EXPERIMENT_FOLDER_PREFIX + str(experimentNumber))
-		experimentFiles = glob.glob(os.path.join(experimentFolder, '*.json'))
-		
-		if(experimentDictionary[experimentNumber] is None):
-			lastDataEntryParameters = None
-			for dataFile in experimentFiles:
-				dataParameters = dlu.loadJSON(experimentFolder, os.path.basename(dataFile))[-1]
-				if((lastDataEntryParameters is None) or (dataParameters['index'] > lastDataEntryParameters['index'])):
-					lastDataEntryParameters = dataParameters
-			del lastDataEntryParameters['Results']
-			lastDataEntryParameters['endIndexes'] = dict(lastDataEntryParameters['startIndexes'])
-			lastDataEntryParameters['endIndexes']['index'] = lastDataEntryParameters['index']
-			lastDataEntryParameters['endIndexes']['experimentNumber'] = lastDataEntryParameters['experimentNumber']
-			lastDataEntryParameters['parametersHistoryGenerated'] = True
-			experimentDictionary[experimentNumber] = lastDataEntryParameters
-		
-		# Get the possible plots for this experiment and save that with the parameters 
-		parameter_identifiers = getIdentifierParameters(user, project, wafer, chip, device)
-		experimentDictionary[experimentNumber]['possiblePlots'] = DH.plotsForExperiments(parameter_identifiers, minExperiment=experimentNumber, maxExperiment=experimentNumber)
-		
-		experimentDictionary[experimentNumber]['dataFolderSpecific'] = experimentFolder
-		experimentDictionary[experimentNumber]['dataFolderSpecificAbs'] = os.path.abspath(experimentFolder)
-		experimentDictionary[experimentNumber]['dataFiles'] = [os.path.basename(f) for f in experimentFiles]
-		
-	# Finally, extract all of the experiments from the dictionary that we built and return the list of their parameters
-	experiments = [experimentDictionary[key] for key in sorted(experimentDictionary.keys())]
+		offset = int(flask.request.args.get('offset', 0))
+		limit = int(flask.request.args['limit']) if('limit' in flask.request.args) else None
+	except ValueError:
+		flask.abort(400)
+	if((offset < 0) or ((limit is not None) and (limit < 0))):
+		flask.abort(400)
+	
+	# Nothing has changed for the browser's copy if no data file of the device has changed since it was sent
+	dataFiles = dataFilesFingerprint(os.path.join(folder, 'index.json'), os.path.join(folder, 'ParametersHistory.json'), os.path.join(folder, defaults.EXPERIMENT_FOLDER_PREFIX + '*', '*.json'))
+	validator = {'files':dataFiles, 'offset':offset, 'limit':limit, 'possiblePlotsVersion':possible_plots_version}
+	return conditionalResponse(validator, lambda: experimentsResponse(user, project, wafer, chip, device, folder, offset, limit))
+
+def experimentsResponse(user, project, wafer, chip, device, folder, offset, limit):
+	# Possible plots are only found for experiments whose data files changed since the summary index was last updated
+	parameter_identifiers = getIdentifierParameters(user, project, wafer, chip, device)
+	getPossiblePlots = lambda experimentNumber: DH.plotsForExperiments(parameter_identifiers, minExperiment=experimentNumber, maxExperiment=experimentNumber)
+	experiments, total = dlu.loadExperimentSummaries(folder, offset=offset, limit=limit, getPossiblePlots=getPossiblePlots, possiblePlotsVersion=possible_plots_version)
+	
+	for experiment in experiments:
+		experimentFolder = os.path.join(folder, defaults.EXPERIMENT_FOLDER_PREFIX + str(experiment['startIndexes']['experimentNumber']))
+		experiment['dataFolderSpecific'] = experimentFolder
+		experiment['dataFolderSpecificAbs'] = os.path.abspath(experimentFolder)
 	
-	return jsonvalid(experiments)
+	response = flask.make_response(jsonvalid(experiments))
+	response.headers['X-Total-Count'] = str(total)
+	return response
 
 @app.route('/<user>/<projectFilter>/<waferFilter>/<chipFilter>/<deviceFilter>/<category>/recentActivity.json')
 def recentActivity(user, projectFilter, waferFilter, chipFilter, deviceFilter, category):
-	basename = lambda path: os.path.basename(os.path.dirname(path))
+	tree = getWorkspaceTree()
 	
-	# Create a regex for each directory for glob
-	projects_included = '*/' if(projectFilter is None or projectFilter == 'undefined') else ('{:}/'.format(projectFilter))
-	wafers_included   = '*/' if(waferFilter   is None or waferFilter   == 'undefined') else ('{:}/'.format(waferFilter))
-	chips_included    = '*/' if(chipFilter    is None or chipFilter    == 'undefined') else ('{:}/'.format(chipFilter))
-	devices_included  = '*/' if(deviceFilter  is None or deviceFilter  == 'undefined') else ('{:}/'.format(deviceFilter))
+	# Keep every folder name, unless a specific name was requested
+	included = lambda names, nameFilter: names if(nameFilter is None or nameFilter == 'undefined') else [n for n in names if(n == nameFilter)]
 				
 	# Get list of all projects, wafers, chips, devices for this user. Each element in the list is a dictionary containing the relevant identifiers, plus its modification time.
-	projects  =                         [{'modified':os.path.getmtime(p), 'project': basename(p)}                                                                       for p in glob.glob(os.path.join(workspace_data_path, user, projects_included))]
-	wafers    = [(elem) for sublist in [[{'modified':os.path.getmtime(w), 'project': item['project'], 'wafer':basename(w)}                                              for w in glob.glob(os.path.join(workspace_data_path, user, item['project'], wafers_included))]                               for item in projects] for elem in sublist] if(category not in ['project']) else None
-	chips     = [(elem) for sublist in [[{'modified':os.path.getmtime(c), 'project': item['project'], 'wafer':item['wafer'], 'chip':basename(c)}                        for c in glob.glob(os.path.join(workspace_data_path, user, item['project'], item['wafer'], chips_included))]                 for item in wafers]   for elem in sublist] if(category not in ['project', 'wafer']) else None
-	devices   = [(elem) for sublist in [[{'modified':os.path.getmtime(d), 'project': item['project'], 'wafer':item['wafer'], 'chip':item['chip'], 'device':basename(d)} for d in glob.glob(os.path.join(workspace_data_path, user, item['project'], item['wafer'], item['chip'], devices_included))] for item in chips]    for elem in sublist] if(category not in ['project', 'wafer', 'chip']) else None
+	projects  =                         [{'modified':tree.modificationTime(user, p), 'project': p}                                                                                                       for p in included(tree.listFolders(user), projectFilter)]
+	wafers    = [(elem) for sublist in [[{'modified':tree.modificationTime(user, item['project'], w), 'project': item['project'], 'wafer':w}                                                            for w in included(tree.listFolders(user, item['project']), waferFilter)]                                            for item in projects] for elem in sublist] if(category not in ['project']) else None
+	chips     = [(elem) for sublist in [[{'modified':tree.modificationTime(user, item['project'], item['wafer'], c), 'project': item['project'], 'wafer':item['wafer'], 'chip':c}                          for c in included(tree.listFolders(user, item['project'], item['wafer']), chipFilter)]                              for item in wafers]   for elem in sublist] if(category not in ['project', 'wafer']) else None
+	devices   = [(elem) for sublist in [[{'modified':tree.modificationTime(user, item['project'], item['wafer'], item['chip'], d), 'project': item['project'], 'wafer':item['wafer'], 'chip':item['chip'], 'device':d} for d in included(tree.listFolders(user, item['project'], item['wafer'], item['chip']), deviceFilter)] for item in chips]    for elem in sublist] if(category not in ['project', 'wafer', 'chip']) else None
 	
 	# Choose which list to report as the recent activity list
 	if(wafers is None):	
@@ -490,35 +551,48 @@ def recentActivity(user, projectFilter, waferFilter, chipFilter, deviceFilter, c
 
 @app.route('/<user>/<project>/indexes.json')
 def indexes(user, project):
+	# Nothing has changed for the browser's copy if no index.json in the project has changed since it was sent
+	validator = sorted(deviceIndexModificationTimes(user, project).items())
+	return conditionalResponse(validator, lambda: indexesResponse(user, project))
+
+def indexesResponse(user, project):
 	indexObject = {}
+	tree = getWorkspaceTree()
+	loadIndexFile = lambda path: dlu.loadJSONIndex(os.path.dirname(path))
 	
-	waferPaths = glob.glob(os.path.join(workspace_data_path, user, project, '*/'))
-	waferNames = [os.path.basename(os.path.dirname(p)) for p in waferPaths]
-	
-	for waferPath, waferName in zip(waferPaths, waferNames):
+	for waferName in tree.listFolders(user, project):
 		indexObject[waferName] = {}
-		chipPaths = glob.glob(waferPath + '/*/')
-		chipNames = [os.path.basename(os.path.dirname(p)) for p in chipPaths]
 		
-		for chipPath, chipName in zip(chipPaths, chipNames):
+		for chipName in tree.listFolders(user, project, waferName):
 			indexObject[waferName][chipName] = {}
-			devicePaths = glob.glob(chipPath + '/*/index.json')
-			deviceNames = [os.path.basename(os.path.dirname(p)) for p in devicePaths]
 			
-			for devicePath, deviceName in zip(devicePaths, deviceNames):
-				indexObject[waferName][chipName][deviceName] = dlu.loadJSONIndex(os.path.dirname(devicePath))
+			for deviceName in tree.listFolders(user, project, waferName, chipName):
+				deviceIndex = tree.loadFile(loadIndexFile, user, project, waferName, chipName, deviceName, 'index.json')
+				if(deviceIndex is not None):
+					indexObject[waferName][chipName][deviceName] = deviceIndex
 	
 	return jsonvalid(indexObject)
 
-def recursiveFileSize(directory):
-	total_size = os.path.getsize(directory)
-	for folder in os.listdir(directory):
-		subpath = os.path.join(directory, folder)
-		if(os.path.isfile(subpath)):
-			total_size += os.path.getsize(subpath)
-		else:
-			total_size += recursiveFileSize(subpath)
-	return total_size
+def deviceIndexModificationTimes(user, project, wafer=None, chip=None):
+	"""Map the identifiers of every device folder in a user/project (or just one wafer or chip) to the modification time of its index.json, using the workspace tree cache."""
+	tree = getWorkspaceTree()
+	indexModificationTimes = {}
+	for waferName in ([wafer] if(wafer is not None) else tree.listFolders(user, project)):
+		for chipName in ([chip] if(chip is not None) else tree.listFolders(user, project, waferName)):
+			for deviceName in tree.listFolders(user, project, waferName, chipName):
+				indexModificationTimes[(user, project, waferName, chipName, deviceName)] = tree.modificationTime(user, project, waferName, chipName, deviceName, 'index.json')
+	return indexModificationTimes
+
+def catalogTotals(catalogRows, identifier):
+	"""Add up the sizes, device counts, index counts, and experiment counts of the devices in catalogRows for each value of identifier (e.g. each 'wafer')."""
+	totals = {}
+	for row in catalogRows:
+		total = totals.setdefault(row[identifier], {'size':0, 'deviceCount':0, 'indexCount':0, 'experimentCount':0})
+		total['size'] += row['size']
+		total['deviceCount'] += 1
+		total['indexCount'] += row['indexCount']
+		total['experimentCount'] += row['experimentCount']
+	return totals
 
 def getIdentifierParameters(user, project, wafer, chip, device=None):
 	parameter_identifiers = {'dataFolder':workspace_data_path, 'Identifiers':{'user':user,'project':project,'wafer':wafer,'chip':chip,'device':device}} 	
@@ -533,118 +607,116 @@ def saveCSV(user, project, wafer, chip, device, experiment):
 	path = os.path.join(workspace_data_path, user, project, wafer, chip, device, defaults.EXPERIMENT_FOLDER_PREFIX + experiment)
 	fileNames = [os.path.basename(p) for p in glob.glob(os.path.join(path, '*.json'))]
 	
-	# Load data from all '.json' files
-	deviceHistories = [dlu.loadJSON(path, fileName) for fileName in fileNames]
-	
-	# Save into StringIO 
-	proxy = io.StringIO()
-	dlu.saveCSV(deviceHistories, proxy)
-	
-	# Convert from StringIO to BytesIO
-	filebuf = io.BytesIO()
-	filebuf.write(proxy.getvalue().encode('utf-8'))
-	proxy.close()
-	
-	filebuf.seek(0)
-	return flask.send_file(filebuf, as_attachment=True, attachment_filename=f"{chip}_{device}_Experiment{experiment}.csv")
+	# Stream the CSV file while the data is read, one entry from each '.json' file at a time, so the whole experiment is never in memory
+	def csvResponse():
+		deviceHistories = [dlu.iterateJSON(path, fileName) for fileName in fileNames]
+		csvText = dlu.iterateCSV(deviceHistories)
+		return flask.Response(flask.stream_with_context(csvText), mimetype='text/csv', headers={'Content-Disposition': f'attachment; filename="{chip}_{device}_Experiment{experiment}.csv"'})
+	return conditionalResponse(dataFilesFingerprint(os.path.join(path, '*.json')), csvResponse)
 
 
 
 # === Plots ===
-def getPlotSettings(plotType, filebuf, minExperiment, maxExperiment, includeChipSummarySettings=False, includeDeviceSummarySettings=False, includeCacheBust=False):
-	# === Setup ===
-	# Get default plot settings, plus any modifications specified by the UI
-	plotSettings = copy.deepcopy(default_makePlot_parameters)
+def getPlotSettings(plotType, filebuf, minExperiment, maxExperiment, includeChipSummarySettings=False, includeDeviceSummarySettings=False):
+	# Get any modifications to the default plot settings specified by the UI, and the image format to render ('png' or 'svg')
 	receivedPlotSettings = json.loads(flask.request.args.get('plotSettings'))
 	print('[UI]: Loaded plot settings: ' + str(receivedPlotSettings))
+	format = flask.request.args.get('format', 'png')
+	if(format not in pcu.PLOT_CACHE_FORMATS):
+		flask.abort(400)
 	
-	# Make nicknames for any plot setting modifications specified by the UI
-	primaryPlotSettings = receivedPlotSettings['primary']
-	modePlotSettings = receivedPlotSettings['mode_parameters']
-	chipSummarySettings = receivedPlotSettings['chip']
-	deviceSummarySettings = receivedPlotSettings['device']
-	
-	# === Update Settings ===
-	# Update dynamic arguments to DeviceHistory.makePlots() call
-	for dynamicArgument in primaryPlotSettings.keys():
-		plotSettings[dynamicArgument] = primaryPlotSettings[dynamicArgument]
-	if(includeChipSummarySettings):
-		for dynamicArgument in chipSummarySettings.keys():
-			plotSettings[dynamicArgument] = chipSummarySettings[dynamicArgument]
-	if(includeDeviceSummarySettings):
-		for dynamicArgument in deviceSummarySettings.keys():
-			plotSettings[dynamicArgument] = deviceSummarySettings[dynamicArgument]
-	
-	# Set all fixed arguments to DeviceHistory.makePlots() call
-	if plotSettings['minExperiment'] == None:
-		plotSettings['minExperiment'] = minExperiment
-	if plotSettings['maxExperiment'] == None:
-		plotSettings['maxExperiment'] = maxExperiment
+	# Combine them the same way as plots that are pre-rendered after an experiment, so that both share the plot cache
+	plotSettings = pru.makePlotSettings(plotType, receivedPlotSettings, workspace_data_path, minExperiment, maxExperiment, includeChipSummarySettings=includeChipSummarySettings, includeDeviceSummarySettings=includeDeviceSummarySettings, format=format)
 	plotSettings['plotSaveName'] = filebuf
-	plotSettings['dataFolder'] = workspace_data_path
-	plotSettings['saveFolder'] = None
-	plotSettings['saveFigures'] = True
-	plotSettings['showFigures'] = False
-	plotSettings['specificPlot'] = plotType
-	if(includeCacheBust):
-		plotSettings['cacheBust'] = flask.request.args.get('cb')
-	
-	# Set mode parameters for DeviceHistory.makePlots() call
-	if(plotSettings['plot_mode_parameters'] is None):
-		plotSettings['plot_mode_parameters'] = {}
-	for dynamicModeParameter in modePlotSettings.keys():
-		plotSettings['plot_mode_parameters'][dynamicModeParameter] = modePlotSettings[dynamicModeParameter]
-	
-	#afmPath = json.loads(flask.request.args.get('afmPath'))
-	# mode parameter 'AFMImagePath'
-	#if(plotType == 'AFMdeviationsImage'):
-	#	if(plotSettings['plot_mode_parameters'] == None):
-	#		plotSettings['plot_mode_parameters'] = {}
-	#	plotSettings['plot_mode_parameters']['afm_image_path'] = afmPath
 	
 	return plotSettings
 
+def getPlotRenderPool():
+	"""The pool of processes that render plots, so that slow plots do not hold up this process (which also forwards live data)."""
+	global plot_render_pool
+	if(plot_render_pool is None):
+		plot_render_pool = pru.PlotRenderPool()
+	return plot_render_pool
+
+def renderPlot(plotType, identifiers, plotSettings):
+	"""Render a plot in the plot rendering pool and return its finished PlotRenderJob. The job is waited on with socketio.sleep() so that
+	other requests and socketio messages are still handled in the meantime. Requests may include a 'renderGroup' that can be cancelled."""
+	plotSettings = {key:value for key, value in plotSettings.items() if(key != 'plotSaveName')}
+	job = getPlotRenderPool().submit(plotType, identifiers, plotSettings, group=flask.request.args.get('renderGroup'))
+	while(not job.done()):
+		socketio.sleep(pru.PLOT_RENDER_POLL_INTERVAL)
+	return job
+
+@app.route('/cancelPlotRenders/<renderGroup>')
+def cancelPlotRenders(renderGroup):
+	"""Cancel the rendering of every plot requested with a renderGroup other than this one (i.e. by pages of the UI that have been left)."""
+	getPlotRenderPool().cancelGroups(keepGroup=renderGroup)
+	return jsonvalid({"success": True})
+
+def sendCachedPlot(plotType, identifiers, plotSettings):
+	"""Respond with the plot from the plot cache, first rendering it in the plot rendering pool if it has not been cached. The plot is
+	rendered as a PNG unless the request asks for '?format=svg'. Requests with a matching If-None-Match or If-Modified-Since get a 304."""
+	format = plotSettings['plot_mode_parameters']['plotSaveExtension'].lstrip('.')
+	
+	# The key changes whenever the plot would, so the browser's copy is still valid if its ETag matches
+	key = plot_cache.key(plotType, identifiers, plotSettings, workspace_data_path, format=format)
+	if(key in flask.request.if_none_match):
+		response = flask.Response(status=304)
+		response.set_etag(key)
+		response.cache_control.no_cache = True
+		return response
+	
+	# === Plot ===
+	path = plot_cache.get(key, format=format)
+	if(path is None):
+		job = renderPlot(plotType, identifiers, plotSettings)
+		if(job.status != 'complete'):
+			print('[UI]: Plot was not rendered ({:}): {:}'.format(job.status, job.error))
+			return flask.Response(status=PLOT_RENDER_STATUS_CODES[job.status])
+		plotData = job.data
+		try:
+			path = (plot_cache.put(key, plotData, format=format)) if(len(plotData) > 0) else (None)
+		except OSError as e:
+			print('[UI]: Unable to save plot to the plot cache: ' + str(e))
+		if(path is None):
+			return flask.send_file(io.BytesIO(plotData), mimetype=pcu.mimetype(format))
+	
+	response = flask.send_file(path, mimetype=pcu.mimetype(format), add_etags=False)
+	response.set_etag(key)
+	response.last_modified = os.path.getmtime(path)
+	response.cache_control.no_cache = True
+	return response.make_conditional(flask.request)
+
 @app.route('/plots/<user>/<project>/<wafer>/<chip>/<device>/<experiment>/<plotType>')
 def sendExperimentPlot(user, project, wafer, chip, device, experiment, plotType):
-	# Make a new file object to save the image for this plot
-	filebuf = io.BytesIO()
-	
-	# Get all arguments for the DeviceHistory.makePlots() function call
-	plotSettings = getPlotSettings(plotType, filebuf, minExperiment=int(experiment), maxExperiment=int(experiment), includeCacheBust=True)
+	# Get all arguments for the DeviceHistory.makePlots() function call (the plot is saved to a file object by the plot rendering pool)
+	plotSettings = getPlotSettings(plotType, None, minExperiment=int(experiment), maxExperiment=int(experiment))
+	plotSettings['useCache'] = True
 	
 	# === Plot ===
-	DH.makePlots(user, project, wafer, chip, device, **plotSettings)
-	# plt.savefig(filebuf, transparent=True, dpi=pngDPI, format='png')
-	filebuf.seek(0)
-	return flask.send_file(filebuf, attachment_filename='plot.png')
+	identifiers = {'user':user, 'project':project, 'wafer':wafer, 'chip':chip, 'device':device}
+	return sendCachedPlot(plotType, identifiers, plotSettings)
 	
 @app.route('/devicePlots/<user>/<project>/<wafer>/<chip>/<device>/<plotType>')
 def sendDevicePlot(user, project, wafer, chip, device, plotType):
-	# Make a new file object to save the image for this plot
-	filebuf = io.BytesIO()
-	
-	# Get all arguments for the DeviceHistory.makePlots() function call
-	plotSettings = getPlotSettings(plotType, filebuf, minExperiment=0, maxExperiment=float('inf'), includeDeviceSummarySettings=True)
+	# Get all arguments for the DeviceHistory.makePlots() function call (the plot is saved to a file object by the plot rendering pool)
+	plotSettings = getPlotSettings(plotType, None, minExperiment=0, maxExperiment=float('inf'), includeDeviceSummarySettings=True)
 	plotSettings['loadOnlyMostRecentExperiments'] = True
+	plotSettings['useCache'] = True
 	
 	# === Plot ===
-	DH.makePlots(user, project, wafer, chip, device, **plotSettings)
-	filebuf.seek(0)
-	return flask.send_file(filebuf, attachment_filename='plot.png')
+	identifiers = {'user':user, 'project':project, 'wafer':wafer, 'chip':chip, 'device':device}
+	return sendCachedPlot(plotType, identifiers, plotSettings)
 	
 @app.route('/chipPlots/<user>/<project>/<wafer>/<chip>/<plotType>')
 def sendChipPlot(user, project, wafer, chip, plotType):
-	# Make a new file object to save the image for this plot
-	filebuf = io.BytesIO()
-	
-	# Get all arguments for the ChipHistory.makePlots() function call
-	plotSettings = getPlotSettings(plotType, filebuf, minExperiment=0, maxExperiment=float('inf'), includeChipSummarySettings=True)
+	# Get all arguments for the ChipHistory.makePlots() function call (the plot is saved to a file object by the plot rendering pool)
+	plotSettings = getPlotSettings(plotType, None, minExperiment=0, maxExperiment=float('inf'), includeChipSummarySettings=True)
 	plotSettings['numberOfRecentExperiments'] = (plotSettings['numberOfRecentIndexes']) if('numberOfRecentIndexes' in plotSettings) else (1)
 	
 	# === Plot ===
-	CH.makePlots(user, project, wafer, chip, **plotSettings)
-	filebuf.seek(0)
-	return flask.send_file(filebuf, attachment_filename='plot.png')
+	identifiers = {'user':user, 'project':project, 'wafer':wafer, 'chip':chip}
+	return sendCachedPlot(plotType, identifiers, plotSettings)
 
 @app.route('/<user>/<project>/<wafer>/<chip>/<device>/availableDevicePlots.json')
 def availableDevicePlots(user, project, wafer, chip, device):
@@ -667,12 +739,15 @@ def sendParameterPlot(user, project, fileName, standardSchedule):
 		scheduleObjects = loadSchedule(user, project, fileName)
 	parameters = json.loads(scheduleObjects)[0]
 	
-	filebuf = io.BytesIO()
-	mode_parameters = {'plotSaveName': filebuf, 'saveFigures': True, 'showFigures': False}
-	
-	DH.dpu.makeParameterPlot(parameters['runType']['default'], defaults.extractDefaults(parameters), mode_parameters=mode_parameters)
-	filebuf.seek(0)
-	return flask.send_file(filebuf, attachment_filename='plot.png')
+	# The plot is only drawn from the parameters, so it has not changed if they have not
+	def parameterPlotResponse():
+		filebuf = io.BytesIO()
+		mode_parameters = {'plotSaveName': filebuf, 'saveFigures': True, 'showFigures': False}
+		
+		DH.dpu.makeParameterPlot(parameters['runType']['default'], defaults.extractDefaults(parameters), mode_parameters=mode_parameters)
+		filebuf.seek(0)
+		return flask.send_file(filebuf, attachment_filename='plot.png', add_etags=False)
+	return conditionalResponse(parameters, parameterPlotResponse)
 
 	
 
@@ -0,0 +1,387 @@
+"""This module provides benchmarks for performance-sensitive parts of the software. Each benchmark builds its own synthetic data in a temporary folder,
+so no real data is touched. Run all of them from the 'source' folder with: python -m utilities.BenchmarkUtility"""
+
+# === Imports ===
+import json
+import multiprocessing as mp
+import os
+import random
+import re
+import shutil
+import struct
+import tempfile
+import time
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+import defaults
+import pipes
+from drivers import SourceMeasureUnit as smu
+from utilities import DataLoggerUtility as dlu
+
+
+
+# === Synthetic Data ===
+def makeSyntheticDevice(directory, experiments=3, sweepsPerExperiment=10, pointsPerSweep=1000, fileName='GateSweep'):
+	"""Save gate-sweep-like data entries for a single device in directory."""
+	for experiment in range(experiments):
+		experimentNumber = dlu.incrementJSONExperimentNumber(directory)
+		for sweep in range(sweepsPerExperiment):
+			vgs_data = np.linspace(-1, 1, pointsPerSweep)
+			jsonData = {
+				'runType': fileName,
+				'Identifiers': {'user':'benchmark', 'project':'benchmark', 'wafer':'W', 'chip':'C', 'device':os.path.basename(directory)},
+				'Results': {
+					'vds_data': list(np.full(pointsPerSweep, 0.5)),
+					'id_data': list(1e-6*np.exp(vgs_data) + 1e-9*np.random.rand(pointsPerSweep)),
+					'vgs_data': list(vgs_data),
+					'ig_data': list(1e-12*np.random.rand(pointsPerSweep)),
+					'timestamps': list(time.time() + np.arange(pointsPerSweep)*1e-3),
+				},
+				'startIndexes': dlu.loadJSONIndex(directory),
+			}
+			dlu.saveJSON(directory, fileName, jsonData, subDirectory='Ex' + str(experimentNumber))
+
+def makeSyntheticChip(directory, devices=64, experiments=3, sweepsPerExperiment=10, pointsPerSweep=1000, fileName='GateSweep'):
+	"""Create a chip folder in directory with the given number of devices, each holding synthetic data. Returns the chip folder path."""
+	chipDirectory = os.path.join(directory, 'benchmark', 'benchmark', 'W', 'C')
+	for device in range(devices):
+		deviceDirectory = os.path.join(chipDirectory, '{:}-{:}'.format(2*device + 1, 2*device + 2))
+		dlu.makeFolder(deviceDirectory)
+		makeSyntheticDevice(deviceDirectory, experiments=experiments, sweepsPerExperiment=sweepsPerExperiment, pointsPerSweep=pointsPerSweep, fileName=fileName)
+	return chipDirectory
+
+
+
+# === Timing ===
+def bestTimeOf(function, repeats=3):
+	"""Call function repeats times and return (best time in seconds, value returned by the last call)."""
+	bestTime = float('inf')
+	value = None
+	for i in range(repeats):
+		startTime = time.perf_counter()
+		value = function()
+		bestTime = min(bestTime, time.perf_counter() - startTime)
+	return (bestTime, value)
+
+
+
+# === Benchmarks ===
+def benchmarkChipHistoryLoading(devices=64, experiments=3, sweepsPerExperiment=10, pointsPerSweep=1000, workerCounts=[2, 4, 8], repeats=3):
+	"""Compare serial, thread pool, and process pool loading of an entire synthetic chip with loadSpecificChipHistory()."""
+	print('[Benchmark] Chip history loading: {:} devices x {:} experiments x {:} sweeps x {:} points'.format(devices, experiments, sweepsPerExperiment, pointsPerSweep))
+	directory = tempfile.mkdtemp(prefix='AutexysBenchmark')
+	try:
+		chipDirectory = makeSyntheticChip(directory, devices=devices, experiments=experiments, sweepsPerExperiment=sweepsPerExperiment, pointsPerSweep=pointsPerSweep)
+
+		serialTime, serialHistory = bestTimeOf(lambda: dlu.loadSpecificChipHistory(chipDirectory, 'GateSweep.json'), repeats=repeats)
+		print('  serial:              {:8.3f} s ({:} entries)'.format(serialTime, len(serialHistory)))
+
+		results = {'serial': serialTime}
+		for useProcesses in [False, True]:
+			for workers in workerCounts:
+				name = '{:} {:}'.format(workers, 'processes' if(useProcesses) else 'threads')
+				parallelTime, parallelHistory = bestTimeOf(lambda: dlu.loadSpecificChipHistory(chipDirectory, 'GateSweep.json', workers=workers, useProcesses=useProcesses), repeats=repeats)
+				sameOrder = [(entry['Identifiers']['device'], entry['index']) for entry in parallelHistory] == [(entry['Identifiers']['device'], entry['index']) for entry in serialHistory]
+				print('  {:20} {:8.3f} s ({:.2f}x){:}'.format(name + ':', parallelTime, serialTime/parallelTime, '' if(sameOrder) else ' ORDER MISMATCH'))
+				results[name] = parallelTime
+		return results
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+
+
+
+def benchmarkLineFiltering(lines=100000, repeats=3):
+	"""Compare the lines/second of the original per-line regex filters with the current single-pass filter, for a file of lines in the
+	original layout (index and experimentNumber at the end) and one in the current layout (index and experimentNumber in a fixed header)."""
+	print('[Benchmark] Line filtering: {:} lines'.format(lines))
+	directory = tempfile.mkdtemp(prefix='AutexysBenchmark')
+	try:
+		linesPerExperiment = 1000
+		filters = {'minIndex':lines//4, 'maxIndex':3*lines//4, 'minExperiment':10, 'maxExperiment':lines//linesPerExperiment - 10}
+		for layout in ['original', 'header']:
+			with open(os.path.join(directory, layout + '.json'), 'w') as file:
+				for index in range(lines):
+					jsonData = {'runType':'StaticBias', 'Identifiers':{'user':'benchmark', 'device':'1-2'}, 'runConfigs':{'StaticBias':{'totalBiasTime':60, 'measurementTime':1}}, 'startIndexes':{'index':index - index%linesPerExperiment, 'experimentNumber':index//linesPerExperiment}}
+					if(layout == 'original'):
+						jsonData.update({'Results':{'id_data':[1e-6]*8}, 'index':index, 'experimentNumber':index//linesPerExperiment, 'timestamp':time.time()})
+						file.write(json.dumps(jsonData) + '\n')
+					else:
+						jsonData.update({'index':index, 'experimentNumber':index//linesPerExperiment, 'timestamp':time.time(), 'Results':{'id_data':[1e-6]*8}})
+						file.write(dlu.serializeJSONLine(jsonData)[0].decode('utf-8'))
+			fileLines = dlu.loadJSONtoStringArray(directory, layout + '.json')
+			
+			originalTime, originalLines = bestTimeOf(lambda: originalFilterStringArrayByIndexAndExperiment(fileLines, **filters), repeats=repeats)
+			currentTime, currentLines = bestTimeOf(lambda: dlu.filterStringArrayByIndexAndExperiment(directory, fileLines, **filters), repeats=repeats)
+			print('  {:8} layout: original {:10.0f} lines/s, single-pass {:10.0f} lines/s ({:.1f}x), {:} lines kept{:}'.format(layout, lines/originalTime, lines/currentTime, originalTime/currentTime, len(currentLines), '' if((layout == 'header') or (currentLines == originalLines)) else ' RESULT MISMATCH'))
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+
+def originalFilterStringArrayByIndexAndExperiment(fileLines, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf')):
+	"""The multi-pass filter that DataLoggerUtility used before the single-pass filter, kept here as the baseline for benchmarkLineFiltering()."""
+	def filterLines(fileLines, property, keep):
+		filteredFileLines = []
+		for line in fileLines:
+			match = re.search(' "' + str(property) + '": ([^,}]*)' , line)
+			if(match and keep(float(match.group(1)))):
+				filteredFileLines.append(line)
+		return filteredFileLines
+	
+	filteredFileLines = filterLines(fileLines, 'experimentNumber', lambda value: value >= minExperiment)
+	filteredFileLines = filterLines(filteredFileLines, 'experimentNumber', lambda value: value <= maxExperiment)
+	filteredFileLines = filterLines(filteredFileLines, 'index', lambda value: value >= minIndex)
+	filteredFileLines = filterLines(filteredFileLines, 'index', lambda value: value <= maxIndex)
+	return filteredFileLines
+
+
+
+def benchmarkJSONEncoding(experiments=500, repeats=5):
+	"""Compare the original copy-then-encode jsonvalid() of the UI with dlu.encodeJSONResponse() on an experiments.json-like response
+	(the full parameters of each experiment, some holding NaN and infinite values), and check that both produce identical text."""
+	print('[Benchmark] JSON encoding: experiments.json with {:} experiments'.format(experiments))
+	payload = []
+	for experimentNumber in range(1, experiments + 1):
+		parameters = defaults.with_added({'runType':'GateSweep'})
+		parameters['startIndexes'] = {'index':10*experimentNumber, 'experimentNumber':experimentNumber, 'timestamp':time.time()}
+		parameters['endIndexes'] = {'index':10*experimentNumber + 9, 'experimentNumber':experimentNumber, 'timestamp':time.time() + 60}
+		parameters['dataFiles'] = ['GateSweep']
+		parameters['possiblePlots'] = ['TransferCurve', 'GateCurrent', 'SubthresholdCurve', 'TransconductanceCurve']
+		parameters['Computed'] = {'onOffRatio':float('inf') if(experimentNumber % 7 == 0) else 1e6, 'threshold':float('nan') if(experimentNumber % 5 == 0) else 0.5, 'maxCurrent':-float('inf') if(experimentNumber % 11 == 0) else 1e-6}
+		payload.append(parameters)
+	response = {'experiments':payload, 'dataFolderSpecific':'benchmark', 'dataFolderAbs':tempfile.gettempdir()}
+
+	originalTime, originalText = bestTimeOf(lambda: originalJSONValid(response), repeats=repeats)
+	currentTime, currentText = bestTimeOf(lambda: dlu.encodeJSONResponse(response), repeats=repeats)
+	print('  {:.1f} KB: original {:8.2f} ms, current {:8.2f} ms ({:.1f}x){:}'.format(len(currentText)/1024, 1e3*originalTime, 1e3*currentTime, originalTime/currentTime, '' if(currentText == originalText) else ' RESULT MISMATCH'))
+	return {'original':originalTime, 'current':currentTime}
+
+def originalJSONValid(obj):
+	"""The jsonvalid() that the UI used before dlu.encodeJSONResponse(), kept here as the baseline for benchmarkJSONEncoding()."""
+	def replaceInfNan(obj):
+		if isinstance(obj, float):
+			if np.isnan(obj):
+				return None
+			if obj == float('inf'):
+				return 1e99
+			if obj == -float('inf'):
+				return -1e99
+			return obj
+		elif isinstance(obj, str):
+			return obj
+		elif isinstance(obj, bytes):
+			return obj
+		elif isinstance(obj, Sequence):
+			return [replaceInfNan(item) for item in obj]
+		elif isinstance(obj, Mapping):
+			return dict((key, replaceInfNan(value)) for key, value in obj.items())
+		else:
+			return obj
+	return json.dumps(replaceInfNan(obj))
+
+
+
+def benchmarkQueueLatency(roundTrips=50, aborts=10):
+	"""Compare the original sleep-polling loops of the manager, status checker, and UI forwarder with blocking receives, using the same
+	Queues between processes. Measures the round trip of a message through two forwarding processes (like a connection status request
+	through the status checker and the manager), and the time from the UI asking a procedure to abort until it hears the dispatcher stopped."""
+	print('[Benchmark] Queue latency: {:} round trips, {:} aborts'.format(roundTrips, aborts))
+	context = mp.get_context('spawn')
+	results = {}
+	for mode in ['polling', 'blocking']:
+		share = {'QueueToStatusChecker':context.Queue(100), 'QueueToManager':context.Queue(100), 'QueueToUI':context.Queue(100), 'QueueToDispatcher':context.Queue(100)}
+		
+		# Round trip: UI -> status checker -> manager -> UI
+		forwarders = [context.Process(target=runQueueForwarder, args=(share, 'QueueToStatusChecker', 'QueueToManager', mode, 0.1)), context.Process(target=runQueueForwarder, args=(share, 'QueueToManager', 'QueueToUI', mode, 0.1))]
+		for forwarder in forwarders:
+			forwarder.start()
+		
+		# The first message waits for the processes to start, so it is not timed
+		pipes.send(share, 'QueueToStatusChecker', {'type':'Ping', 'time':time.perf_counter()})
+		receiveQueueMessage(share, 'QueueToUI', mode, 0.01)
+		roundTripTimes = []
+		for i in range(roundTrips):
+			time.sleep(random.uniform(0, 0.02))
+			pipes.send(share, 'QueueToStatusChecker', {'type':'Ping', 'time':time.perf_counter()})
+			message = receiveQueueMessage(share, 'QueueToUI', mode, 0.01)
+			roundTripTimes.append(time.perf_counter() - message['time'])
+		pipes.send(share, 'QueueToStatusChecker', {'type':'Stop'})
+		receiveQueueMessage(share, 'QueueToUI', mode, 0.01)
+		for forwarder in forwarders:
+			forwarder.join()
+		
+		# Abort: UI -> dispatcher (which stops its procedure and exits) -> manager notices -> UI
+		manager = context.Process(target=runManagerEmulation, args=(share, mode, aborts))
+		manager.start()
+		abortTimes = []
+		for i in range(aborts):
+			receiveQueueMessage(share, 'QueueToUI', mode, 0.01)
+			time.sleep(random.uniform(0.05, 0.15))
+			abortTime = time.perf_counter()
+			pipes.send(share, 'QueueToDispatcher', {'type':'Stop'})
+			receiveQueueMessage(share, 'QueueToUI', mode, 0.01)
+			abortTimes.append(time.perf_counter() - abortTime)
+		manager.join()
+		
+		results[mode] = {'roundTrip':np.median(roundTripTimes), 'abort':np.median(abortTimes)}
+		print('  {:8} round trip: median {:7.1f} ms, max {:7.1f} ms | abort: median {:7.1f} ms, max {:7.1f} ms'.format(mode, 1e3*np.median(roundTripTimes), 1e3*max(roundTripTimes), 1e3*np.median(abortTimes), 1e3*max(abortTimes)))
+	return results
+
+def receiveQueueMessage(share, qName, mode, interval):
+	"""Wait for the next message on a Queue the original way (sleep for interval until one shows up), or the current way (block until one arrives)."""
+	if(mode == 'polling'):
+		while(not pipes.poll(share, qName)):
+			time.sleep(interval)
+		return pipes.recv(share, qName)
+	message = None
+	while(message is None):
+		message = pipes.recv(share, qName, timeout=interval*100)
+	return message
+
+def runQueueForwarder(share, inputQName, outputQName, mode, interval):
+	"""Forward messages from one Queue to another, like the status checker and manager loops do, until a 'Stop' message."""
+	while(True):
+		message = receiveQueueMessage(share, inputQName, mode, interval)
+		pipes.send(share, outputQName, message)
+		if(message['type'] == 'Stop'):
+			break
+
+def runManagerEmulation(share, mode, aborts):
+	"""Start a dispatcher running a procedure until it is aborted, tell the UI when the manager notices that it has stopped, and repeat. The original manager loop sleeps between checks, the current one waits on the dispatcher's sentinel."""
+	context = mp.get_context('spawn')
+	for i in range(aborts):
+		dispatcher = context.Process(target=runProcedureEmulation, args=(share,))
+		dispatcher.start()
+		while(dispatcher.is_alive()):
+			if(mode == 'polling'):
+				if(not pipes.poll(share, 'QueueToManager')):
+					time.sleep(0.1)
+			else:
+				pipes.wait(share, ['QueueToManager'], sentinels=[dispatcher.sentinel], timeout=1.0)
+		dispatcher.join()
+		pipes.send(share, 'QueueToUI', {'type':'DispatcherStatus', 'status':{'running':False, 'error':False}})
+
+def runProcedureEmulation(share):
+	"""A procedure that takes a measurement every millisecond and checks for an abort after each one, like the sweep procedures do."""
+	pipes.send(share, 'QueueToUI', {'type':'ProcedureStarted'})
+	try:
+		while(True):
+			time.sleep(0.001)
+			pipes.checkAbortStatus(share)
+	except pipes.AbortError:
+		pipes.clear(share, 'QueueToDispatcher')
+
+
+def benchmarkCommandBatching(roundTripSeconds=0.002, sweeps=20):
+	"""Compare sending every SCPI command to a B2900A on its own with smu.B2900A.commandBatch(), for connecting to the instrument and for
+	setting up and starting sweeps (as AutoGateSweep does for each of its sweeps). The instrument is simulated by a VISA resource that takes
+	roundTripSeconds for every write or query, which is typical of USB and GPIB."""
+	print('[Benchmark] SCPI command batching: {:.1f} ms per message, {:} sweeps'.format(1e3*roundTripSeconds, sweeps))
+	results = {}
+	for mode, system_settings in [('separate', {'batchCommands':False}), ('batched', {})]:
+		resource = SimulatedVisaResource(roundTripSeconds)
+		connectTime, instance = bestTimeOf(lambda: smu.B2900A(resource, 'SIMULATED', 100e-6, system_settings), repeats=1)
+		connectMessages = resource.messages
+		
+		resource.messages = 0
+		startTime = time.perf_counter()
+		for i in range(sweeps):
+			instance.startSweep(-15, 15, 0, 0, 100, src2vals=list(np.linspace(-15, 15, 100)) if(i % 2 == 1) else None)
+		sweepTime = (time.perf_counter() - startTime)/sweeps
+		
+		results[mode] = {'connect':connectTime, 'sweep':sweepTime}
+		print('  {:8} connect: {:7.1f} ms ({:3} messages) | sweep setup: {:7.1f} ms ({:3} messages)'.format(mode, 1e3*connectTime, connectMessages, 1e3*sweepTime, resource.messages//sweeps))
+	return results
+
+def benchmarkDataTransfer(pointCounts=[10000, 100000], bytesPerSecond=1e6, resourceID=None, repeats=3):
+	"""Compare reading the data of a sweep from a B2900A (with endSweep()) as ASCII text and as 64-bit binary floats. If resourceID is the
+	VISA address of a connected B2900A, real sweeps are measured. Otherwise the instrument is simulated by a VISA resource that sends the
+	data in the format the B2900A uses at bytesPerSecond, and parses it the same way PyVISA does."""
+	print('[Benchmark] Data transfer: {:} sweep points, {:}'.format(pointCounts, str(resourceID) if(resourceID is not None) else '{:.1f} MB/s simulated link'.format(bytesPerSecond/1e6)))
+	results = {}
+	for points in pointCounts:
+		for mode in ['ascii', 'binary']:
+			system_settings = {'binaryDataTransfer':(mode == 'binary')}
+			if(resourceID is not None):
+				instance = smu.getConnectionToVisaResource(resourceID, system_settings=system_settings)
+				def fetchSweep():
+					instance.startSweep(0, 0, 0, 0, points, triggerInterval=1e-4)
+					instance.query('*OPC?')
+					startTime = time.perf_counter()
+					instance.endSweep(endMode='fixed')
+					return time.perf_counter() - startTime
+				transferTime = min(fetchSweep() for i in range(repeats))
+				transferBytes = None
+			else:
+				resource = SimulatedVisaResource(0, bytesPerSecond=bytesPerSecond, sweepPoints=points)
+				instance = smu.B2900A(resource, 'SIMULATED', 100e-6, system_settings)
+				resource.bytesSent = 0
+				transferTime, sweep = bestTimeOf(lambda: instance.endSweep(endMode='fixed'), repeats=repeats)
+				transferBytes = resource.bytesSent/repeats
+			
+			results[(points, mode)] = transferTime
+			print('  {:6} points {:6}: {:8.1f} ms{:}'.format(points, mode, 1e3*transferTime, '' if(transferBytes is None) else ' ({:.2f} MB)'.format(transferBytes/1e6)))
+		print('  {:6} points binary is {:.1f}x faster'.format(points, results[(points, 'ascii')]/results[(points, 'binary')]))
+	return results
+
+class SimulatedVisaResource:
+	"""Stands in for the VISA resource of a B2900A, taking roundTripSeconds to answer every write or query. Fetching sweep data returns
+	sweepPoints values, as ASCII text or as a binary block like the B2900A sends, which take bytesPerSecond to arrive."""
+	def __init__(self, roundTripSeconds, bytesPerSecond=None, sweepPoints=0):
+		self.roundTripSeconds = roundTripSeconds
+		self.bytesPerSecond = bytesPerSecond
+		self.timeout = 60000
+		self.values_format = SimulatedValuesFormat()
+		self.messages = 0
+		self.bytesSent = 0
+		
+		values = np.random.uniform(-1e-3, 1e-3, sweepPoints)
+		self.asciiData = ','.join('{:+.6E}'.format(value) for value in values)
+		binaryData = values.astype('<f8').tobytes()
+		self.binaryData = '#{:}{:}'.format(len(str(len(binaryData))), len(binaryData)).encode('ascii') + binaryData
+
+	def write(self, message):
+		self.messages += 1
+		time.sleep(self.roundTripSeconds)
+
+	def query(self, message):
+		self.messages += 1
+		time.sleep(self.roundTripSeconds)
+		return '+0,"No error"' if(message.lower().startswith(':system:error')) else '1'
+
+	def query_ascii_values(self, message, converter='f', separator=',', container=list):
+		self.receive(len(self.asciiData))
+		return container([float(value) for value in self.asciiData.split(separator)])
+
+	def query_binary_values(self, message, datatype='f', is_big_endian=False, container=list):
+		self.receive(len(self.binaryData))
+		headerLength = 2 + int(self.binaryData[1:2])
+		dataLength = len(self.binaryData) - headerLength
+		return container(struct.unpack_from('{:}{:}{:}'.format('>' if(is_big_endian) else '<', dataLength//struct.calcsize(datatype), datatype), self.binaryData, headerLength))
+
+	def receive(self, length):
+		self.messages += 1
+		self.bytesSent += length
+		time.sleep(self.roundTripSeconds + ((length/self.bytesPerSecond) if(self.bytesPerSecond is not None) else 0))
+
+	def clear(self):
+		self.messages += 1
+		time.sleep(self.roundTripSeconds)
+
+class SimulatedValuesFormat:
+	def use_ascii(self, converter, separator, container=list):
+		pass
+
+	def use_binary(self, datatype, is_big_endian, container=list):
+		pass
+
+
+
+# === Main ===
+if(__name__ == '__main__'):
+	benchmarkChipHistoryLoading()
+	benchmarkLineFiltering()
+	benchmarkJSONEncoding()
+	benchmarkQueueLatency()
+	benchmarkCommandBatching()
+	benchmarkDataTransfer()
@@ -1,13 +1,26 @@
 import glob
 import io
+import itertools
 import json
 import os
 import re
+import sqlite3
+import threading
 import time
-from functools import lru_cache
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 
 import numpy as np
 
+try:
+	import fcntl
+except ImportError:
+	# Windows has no fcntl module, so msvcrt is used to lock files instead
+	fcntl = None
+	import msvcrt
+
 
 
 # === File System ===
@@ -29,6 +42,9 @@ def makeEmptyJSONFile(folderPath, fileName):
 
 	with open(os.path.join(folderPath, fileName), 'w') as file:
 		file.write('')
+	
+	removeJSONLineIndex(folderPath, fileName)
+	removeBinaryResults(folderPath, fileName)
 
 def deleteJSONFile(folderPath, fileName):
 	"""Delete the file called fileName.json in the folderPath directory."""
@@ -38,6 +54,8 @@ def deleteJSONFile(folderPath, fileName):
 	fullPath = os.path.join(folderPath, fileName)
 	if os.path.exists(folderPath):
 		os.remove(fullPath)
+		removeJSONLineIndex(folderPath, fileName)
+		removeBinaryResults(folderPath, fileName)
 	else:
 		print('Warning - ' + fullPath + ' not found, so no file was deleted')
 
@@ -85,94 +103,100 @@ def saveCSV(deviceHistory, saveFileName, directory=''):
 		return
 	
 	# Handle saving multiple types of data (eg GateSweeps and StaticBias to the same CSV file)
-	if(isinstance(deviceHistory[0], list)):
-		# Split the data into the blocks separate blocks if each entry of deviceHistory is a list of data
-		blocks = {}
-		for data_segment in deviceHistory:
-			data_type = data_segment[0]['runType']
-			blocks[data_type] = {}
-			blocks[data_type]['lines'] = formatAsCSV(data_segment)
-			blocks[data_type]['filler_line'] = ','.join(['']*(blocks[data_type]['lines'][0].count(',')+1))
-		
-		# Combine the lines of each block with spacers used as needed so that each block is a group of columns in the final file
-		max_length = max([len(blocks[key]['lines']) for key in blocks.keys()])
-		lines = []
-		for i in range(max_length):
-			line = ''
-			for key in blocks.keys():
-				if(i < len(blocks[key]['lines'])):
-					line += blocks[key]['lines'][i].replace('\n','')
-				else:
-					line += blocks[key]['filler_line']
-				line += ', ,'
-			lines.append(line + '\n')
-	else:
-		lines = formatAsCSV(deviceHistory)
+	deviceHistories = deviceHistory if(isinstance(deviceHistory[0], list)) else [deviceHistory]
+	combineBlocks = isinstance(deviceHistory[0], list)
 	
-	# Write all lines to the CSV file
+	# Write the CSV file a chunk of rows at a time
 	if(isinstance(saveFileName, io.StringIO)):
 		file = saveFileName
-		for line in lines:
-			file.write(line)
+		for text in iterateCSV(deviceHistories, combineBlocks=combineBlocks):
+			file.write(text)
 	else:
 		savePath = os.path.join(directory, saveFileName)
 		with open(savePath, 'w') as file:
-			for line in lines:
-				file.write(line)
+			for text in iterateCSV(deviceHistories, combineBlocks=combineBlocks):
+				file.write(text)
 
 def formatAsCSV(deviceHistory, separateDataByEmptyRows=True):
-	if(len(deviceHistory) <= 0):
-		return []
+	return [row + '\n' for rows in iterateCSVBlock(deviceHistory, separateDataByEmptyRows=separateDataByEmptyRows) for row in rows]
+
+CSV_CHUNK_ROWS = 10000
+
+def iterateCSV(deviceHistories, chunkRows=CSV_CHUNK_ROWS, separateDataByEmptyRows=True, combineBlocks=True):
+	"""Yield the text of a CSV file chunkRows rows at a time. deviceHistories holds one iterable of data entries for each block of columns
+	(e.g. one per data file), and entries are only taken from them as they are needed, so a generator such as iterateJSON() keeps memory
+	use flat no matter how much data is exported. If combineBlocks is True the blocks are put side by side, separated by an empty column."""
+	blocks = [itertools.chain.from_iterable(iterateCSVBlock(deviceHistory, chunkRows=chunkRows, separateDataByEmptyRows=separateDataByEmptyRows)) for deviceHistory in deviceHistories]
+	if(not combineBlocks):
+		for block in blocks:
+			for rows in iter(lambda: list(itertools.islice(block, chunkRows)), []):
+				yield '\n'.join(rows) + '\n'
+		return
+	
+	# Combine the rows of each block with spacers used as needed so that each block is a group of columns in the final file
+	fillerRows = [None]*len(blocks)
+	while(True):
+		blockRows = [list(itertools.islice(block, chunkRows)) for block in blocks]
+		rowCount = max(len(rows) for rows in blockRows)
+		if(rowCount == 0):
+			return
+		for i, rows in enumerate(blockRows):
+			if(fillerRows[i] is None):
+				fillerRows[i] = ','.join(['']*(rows[0].count(',')+1)) if(len(rows) > 0) else ''
+			rows.extend([fillerRows[i]]*(rowCount - len(rows)))
+		yield ''.join([', ,'.join(row) + ', ,\n' for row in zip(*blockRows)])
+
+def iterateCSVBlock(deviceHistory, chunkRows=CSV_CHUNK_ROWS, separateDataByEmptyRows=True):
+	"""Private method. Yield the rows (without line breaks) of the CSV columns for one kind of data, in lists of up to chunkRows rows.
+	Each column holds the values of one 'Results' key from every entry in deviceHistory, one entry after the other. Values are converted
+	to text a whole array at a time and only the rows that are not yet complete are kept in memory."""
+	entries = iter(deviceHistory)
+	firstEntry = next(entries, None)
+	if(firstEntry is None):
+		return
+	
+	# Look at the first entry in the data and extract the data lists to save
+	keys = list(firstEntry['Results'].keys())
 	
-	# Look at the first line in the data and extract the data lists to save
-	data_columns = {}
-	if(len(deviceHistory) >= 1):
-		for key in deviceHistory[0]['Results'].keys():
-			data_columns[key] = []
-
-	# Flatten the data from multiple experiments into one array per column in the file, with different experiments separated by empty rows
-	for jsonData in deviceHistory:
-		for key in jsonData['Results']:
-			if(key in data_columns.keys()):
-				data_columns[key].extend(np.hstack(jsonData['Results'][key]).flatten())
-				if(separateDataByEmptyRows):
-					data_columns[key].append('')
-
 	# Try to collect identifying info from the first entry in the data
 	data_type = ''
 	data_location = ''
 	try:
-		data_type = deviceHistory[0]['runType']
-		data_location = getExperimentDirectory(getDeviceDirectory(deviceHistory[0]), deviceHistory[0]['experimentNumber'])
+		data_type = firstEntry['runType']
+		data_location = getExperimentDirectory(getDeviceDirectory(firstEntry), firstEntry['experimentNumber'])
 	except:
 		pass
-
-	lines = []
-
-	# Write all of the variable names in the first line of the CSV
-	header_line2 = ','.join(data_columns.keys()) + '\n'
-	header_line1 = data_type + ',' + data_location +  ','.join(['']*(header_line2.count(','))) + '\n'
-	lines.append(header_line1)
-	lines.append(header_line2)
-
-	# Write all of the data row-by-row to an array of CSV lines
-	index = 0
-	isDone = False
-	while(not isDone):
-		isDone = True
-		values = []
-		for key in data_columns.keys():
-			if(index < len(data_columns[key])):
-				values.append(str(data_columns[key][index]))
-				isDone = False
-			else:
-				values.append('')
-
-		row = ','.join(values) + '\n'
-		lines.append(row)
-		index += 1
 	
-	return lines
+	# Write all of the variable names in the first lines of the CSV
+	header_line2 = ','.join(keys)
+	header_line1 = data_type + ',' + data_location +  ','.join(['']*(header_line2.count(',')))
+	yield [header_line1, header_line2]
+	
+	# Flatten the data from multiple experiments into one column per key, with different experiments separated by empty rows
+	columns = OrderedDict((key, []) for key in keys)
+	for jsonData in itertools.chain([firstEntry], entries):
+		for key in jsonData['Results']:
+			if(key in columns):
+				columns[key].extend(map(str, np.hstack(jsonData['Results'][key]).flatten().tolist()))
+				if(separateDataByEmptyRows):
+					columns[key].append('')
+		
+		# Once every column has enough values for a chunk of rows, write them
+		while(min(len(column) for column in columns.values()) >= chunkRows):
+			yield takeCSVRows(columns, chunkRows)
+	
+	# Write the rest of the data a chunk of rows at a time, then one more row that is entirely empty
+	while(max([len(column) for column in columns.values()] + [0]) > 0):
+		yield takeCSVRows(columns, chunkRows)
+	yield [','.join(['']*len(keys))]
+
+def takeCSVRows(columns, rowCount):
+	"""Private method. Remove the first rowCount values from every column and return them as CSV rows. Each column is only sliced to
+	this window of rows, and the cells of columns that end within the window are left empty."""
+	window = [column[:rowCount] for column in columns.values()]
+	for column in columns.values():
+		del column[:rowCount]
+	return [','.join(row) for row in itertools.zip_longest(*window, fillvalue='')]
 
 # === TXT ===
 def saveText(directory, saveFileName, text, mode='a', appendNewLine=True):
@@ -198,7 +222,7 @@ def loadText(directory, loadFileName):
 	return textData
 
 # === JSON ===
-def saveJSON(directory, saveFileName, jsonData, subDirectory=None, incrementIndex=True):
+def saveJSON(directory, saveFileName, jsonData, subDirectory=None, incrementIndex=True, binaryResults=False):
 	"""Save the jsonData dictionary to as saveFileName.json in directory.
 	If incrementIndex is True, also create an index.json file that tracks the index and experimentNumber of this jsonData.
 	If subDirectory is not None, put saveFileName.json in a folder specified by directory + subDirectory. index.json is still put in directory."""
@@ -210,71 +234,414 @@ def saveJSON(directory, saveFileName, jsonData, subDirectory=None, incrementInde
 	if '.json' not in saveFileName:
 		saveFileName += '.json'
 
-	with open(os.path.join(savePath, saveFileName), 'a') as file:
-		if(incrementIndex):
-			indexData = loadJSONIndex(directory)
-			jsonData['index'] = indexData['index']
-			jsonData['experimentNumber'] = indexData['experimentNumber']
-			jsonData['timestamp'] = time.time()
-			incrementJSONIndex(directory)
-		json.dump(jsonData, file)
-		file.write('\n')
-
-def loadJSON(directory, loadFileName):
-	"""Load loadFileName.json as a dictionary."""
+	indexData = None
+	if(incrementIndex):
+		indexData = reserveJSONIndex(directory)
+		jsonData['index'] = indexData['index']
+		jsonData['experimentNumber'] = indexData['experimentNumber']
+		jsonData['timestamp'] = time.time()
+	
+	# Optionally move the numeric arrays in 'Results' into the binary results file and only keep a reference to them in this line
+	lineData = jsonData
+	if(binaryResults and isinstance(jsonData.get('Results'), dict)):
+		lineData = dict(jsonData)
+		lineData['Results'] = saveBinaryResults(savePath, saveFileName, jsonData['Results'], lockDirectory=directory)
+	
+	appendJSONLine(savePath, saveFileName, lineData)
+
+def appendJSONLine(savePath, saveFileName, lineData):
+	"""Private method. Append lineData as one line of the data file saveFileName in savePath and return the (offset, length) of that line."""
+	line, resultsOffset, resultsLength = serializeJSONLine(lineData)
+	with open(os.path.join(savePath, saveFileName), 'ab') as file:
+		offset = file.seek(0, os.SEEK_END)
+		file.write(line)
+	
+	# Data entries also get an entry in the line index so that they can be found later without reading the whole file
+	if(('index' in lineData) and ('experimentNumber' in lineData)):
+		entry = jsonLineIndexEntry(lineData, offset, len(line))
+		entry['resultsOffset'] = resultsOffset
+		entry['resultsLength'] = resultsLength
+		appendJSONLineIndexEntry(savePath, saveFileName, entry, isNewFile=(offset == 0))
+	return (offset, len(line))
+
+class DataJSONEncoder(json.JSONEncoder):
+	"""Private class. A JSON encoder that also accepts numpy arrays and numbers, which the SMU drivers return measurements as."""
+	def default(self, obj):
+		if(isinstance(obj, np.ndarray)):
+			return obj.tolist()
+		if(isinstance(obj, np.generic)):
+			return obj.item()
+		return json.JSONEncoder.default(self, obj)
+
+LINE_HEADER_PROPERTIES = ['index', 'experimentNumber', 'timestamp']
+LINE_HEADER_PATTERN = re.compile(r'\{"index": (?P<index>-?\d+), "experimentNumber": (?P<experimentNumber>-?\d+)(?:, "timestamp": (?P<timestamp>[^,}]*))?')
+FILE_LINE_VALUE_PATTERN = re.compile('[^,}]*')
+fileLinePatterns = {}
+
+def serializeJSONLine(jsonData):
+	"""Private method. Convert jsonData to a line of a data file. The line starts with a fixed header of 'index', 'experimentNumber', and
+	'timestamp' (when present) so filters can find them immediately, and 'Results' is written last so the parameters can be read without it.
+	Returns the line along with the position and length of the 'Results' value within it (both None if there are no 'Results')."""
+	parameters = OrderedDict((key, jsonData[key]) for key in LINE_HEADER_PROPERTIES if(key in jsonData))
+	parameters.update((key, value) for key, value in jsonData.items() if((key != 'Results') and (key not in LINE_HEADER_PROPERTIES)))
+	if('Results' not in jsonData):
+		return ((json.dumps(parameters, cls=DataJSONEncoder) + '\n').encode('utf-8'), None, None)
+	
+	parametersText = json.dumps(parameters, cls=DataJSONEncoder)[:-1] + (', ' if(len(parameters) > 0) else '') + '"Results": '
+	resultsText = json.dumps(jsonData['Results'], cls=DataJSONEncoder)
+	line = (parametersText + resultsText + '}\n').encode('utf-8')
+	resultsOffset = len(parametersText.encode('utf-8'))
+	return (line, resultsOffset, len(resultsText.encode('utf-8')))
+
+def getFileLinePattern(property, looseFiltering=False):
+	"""Private method. Compiled patterns that find the value of a property in a raw line. Outside of a line's header, a top-level property
+	is preceded by a space, which the strict pattern uses to skip over copies nested directly inside of another object. The loose pattern
+	also matches a property that follows '{' or ',' (i.e. the header of a line written by serializeJSONLine() and every nested copy)."""
+	key = (property, looseFiltering)
+	if(key not in fileLinePatterns):
+		fileLinePatterns[key] = re.compile(('[{, ]' if(looseFiltering) else ' ') + '"' + re.escape(str(property)) + '": ([^,}]*)')
+	return fileLinePatterns[key]
+
+def getFileLineHeader(line):
+	"""Private method. Get the (index, experimentNumber) of a raw line, or None for either one that cannot be found.
+	Lines without a header were saved with these properties at the very end, so they are searched for starting from the end of the line."""
+	header = LINE_HEADER_PATTERN.match(line)
+	if(header):
+		return (int(header.group('index')), int(header.group('experimentNumber')))
+	values = []
+	for key in [' "index": ', ' "experimentNumber": ']:
+		value = None
+		start = line.rfind(key)
+		if(start >= 0):
+			try:
+				value = float(FILE_LINE_VALUE_PATTERN.match(line, start + len(key)).group(0))
+			except ValueError:
+				pass
+		values.append(value)
+	return tuple(values)
+
+def getFileLineValue(line, property):
+	"""Private method. Get the numeric top-level value of property in a raw line, or None if it cannot be found."""
+	header = LINE_HEADER_PATTERN.match(line) if(property in LINE_HEADER_PROPERTIES) else None
+	if(header and (header.group(property) is not None)):
+		return float(header.group(property))
+	
+	match = getFileLinePattern(property).search(line)
+	try:
+		return float(match.group(1)) if(match) else None
+	except ValueError:
+		return None
+
+def fileLineHasLooseValue(line, property, value):
+	"""Private method. True if value appears verbatim as any of the (possibly nested) values of property in a raw line."""
+	return str(value) in getFileLinePattern(property, looseFiltering=True).findall(line)
+
+def loadJSON(directory, loadFileName, lazyResults=False):
+	"""Load loadFileName.json as a dictionary. If lazyResults is True, 'Results' are only read from the file when they are accessed."""
+	if(lazyResults):
+		return loadJSON_fast(directory, loadFileName, lazyResults=True)
 	return loadJSON_slow(directory, loadFileName)
 
 def loadJSONIndex(directory):
 	"""Load the first line of index.json in directory."""
-	indexData = {}
-	try:
-		with open(os.path.join(directory, 'index.json'), 'r') as file:
-			indexData = json.loads(file.readline())
-	except FileNotFoundError:
-		indexData = {'index':0, 'experimentNumber':0, 'timestamp':0}
-	return indexData
+	manager = getJSONIndexManager(directory)
+	if(manager is not None):
+		return manager.get()
+	return readJSONIndexFile(directory)
 
 def incrementJSONIndex(directory):
 	"""Increase index in index.json by 1 and refresh the timestamp."""
-	indexData = loadJSONIndex(directory)
-	with open(os.path.join(directory, 'index.json'), 'w') as file:
-		indexData['index'] += 1
-		indexData['timestamp'] = time.time()
-		json.dump(indexData, file)
-		file.write('\n')
-	return indexData['index']
+	return updateJSONIndex(directory, 'index')['index']
 
 def incrementJSONExperimentNumber(directory):
 	"""Increase experimentNumber in index.json by 1 and refresh the timestamp."""
-	indexData = loadJSONIndex(directory)
-	with open(os.path.join(directory, 'index.json'), 'w') as file:
-		indexData['experimentNumber'] += 1
-		indexData['timestamp'] = time.time()
-		json.dump(indexData, file)
-		file.write('\n')
-	return indexData['experimentNumber']
+	return updateJSONIndex(directory, 'experimentNumber')['experimentNumber']
+
+def reserveJSONIndex(directory):
+	"""Private method. Increase index in index.json by 1, returning the index data from just before the increase (i.e. the index that was reserved)."""
+	return updateJSONIndex(directory, 'index', returnPrevious=True)
 
 def loadJSON_slow(directory, loadFileName):
 	"""Private method. This is the traditional way of parsing json data files, but it can be slow if you only need to see one line in a large file."""
 	jsonData = []
+	binaryResultsPath = getBinaryResultsPath(directory, loadFileName)
 	with open(os.path.join(directory, loadFileName)) as file:
 		for line in file:
 			try:
-				jsonData.append(parseLine(line))
+				jsonData.append(parseLine(line, binaryResultsPath=binaryResultsPath))
 			except Exception as e:
 				print('Error loading JSON line in file {:}/{:}'.format(directory, loadFileName))
 				print(e)
-	return jsonData
+	return mergeChunkedRecords(jsonData)
 
-def loadJSON_fast(directory, loadFileName, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), looseFiltering=False):
-	"""Private method. Given filters of min/max index, experimentNumber, and relativeIndex this loads individual file lines much faster."""
-	fileLines = loadJSONtoStringArray(directory, loadFileName)
-	filteredFileLines = filterStringArrayByIndexAndExperiment(directory, fileLines, minIndex, maxIndex, minExperiment, maxExperiment, minRelativeIndex, maxRelativeIndex, looseFiltering=looseFiltering)
-	jsonData = parseLines(filteredFileLines)
+def iterateJSON(directory, loadFileName):
+	"""Yield the entries of loadFileName.json one at a time (merging the lines of streamed records), so only one entry is in memory at once."""
+	binaryResultsPath = getBinaryResultsPath(directory, loadFileName)
+	recordLines = []
+	with open(os.path.join(directory, loadFileName), 'rb') as file:
+		for line in file:
+			try:
+				data = parseLine(line.decode('utf-8'), binaryResultsPath=binaryResultsPath)
+			except Exception as e:
+				print('Error loading JSON line in file {:}/{:}'.format(directory, loadFileName))
+				print(e)
+				continue
+			
+			# The lines of a streamed record are held until its final line (or the next entry) is reached
+			if((len(recordLines) > 0) and (not isChunkedRecordLine(data) or ((data.get('index'), data.get('experimentNumber')) != (recordLines[0].get('index'), recordLines[0].get('experimentNumber'))))):
+				yield mergeChunkedRecord(recordLines)
+				recordLines = []
+			if(not isChunkedRecordLine(data)):
+				yield data
+				continue
+			recordLines.append(data)
+			if(JSON_RECORD_CHUNK_COUNT_KEY in data):
+				yield mergeChunkedRecord(recordLines)
+				recordLines = []
+	if(len(recordLines) > 0):
+		yield mergeChunkedRecord(recordLines)
+
+def loadJSON_fast(directory, loadFileName, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), looseFiltering=False, lazyResults=False):
+	"""Private method. Given filters of min/max index, experimentNumber, and relativeIndex this loads individual file lines much faster.
+	If the file has a valid line index, only the lines that pass the filters are read from disk. Loose filtering matches values
+	nested anywhere in a line, so it always falls back to scanning the raw lines.
+	If lazyResults is True, lines that were indexed along with the position of their 'Results' are returned as LazyRecords."""
+	lineIndex = None if(looseFiltering) else loadJSONLineIndex(directory, loadFileName)
+	if(lineIndex is not None):
+		filteredEntries = filterJSONLineIndex(directory, lineIndex, minIndex, maxIndex, minExperiment, maxExperiment, minRelativeIndex, maxRelativeIndex)
+		if(lazyResults):
+			return loadLazyRecordsAt(directory, loadFileName, filteredEntries)
+		filteredFileLines = loadJSONLinesAt(directory, loadFileName, filteredEntries)
+	else:
+		fileLines = loadJSONtoStringArray(directory, loadFileName)
+		filteredFileLines = filterStringArrayByIndexAndExperiment(directory, fileLines, minIndex, maxIndex, minExperiment, maxExperiment, minRelativeIndex, maxRelativeIndex, looseFiltering=looseFiltering)
+	jsonData = parseLines(filteredFileLines, binaryResultsPath=getBinaryResultsPath(directory, loadFileName))
 	return jsonData
 
 
 
+# === JSON Index ===
+"""index.json holds the counters used to number every data entry (index) and experiment (experimentNumber) of a device. Every update to it is
+a read-modify-write guarded by an advisory lock on an 'index.lock' file, and index.json is written atomically, so other processes never
+see a partially written index.json and never hand out the same index twice. The lock is only held for the update itself, and index.json
+is always read again once the lock is held, so any number of processes can save to the same device at once.
+While a procedure is running, the launcher opens a JSONIndexManager for each device, which keeps the device's lock file open between
+updates rather than reopening it for every saved entry."""
+
+JSON_INDEX_LOCK_FILE_NAME = 'index.lock'
+JSON_INDEX_LOCK_TIMEOUT = 10
+
+jsonIndexManagers = {}
+jsonIndexManagersLock = threading.Lock()
+
+def readJSONIndexFile(directory):
+	"""Private method. Read index.json directly from disk."""
+	try:
+		with open(os.path.join(directory, 'index.json'), 'r') as file:
+			return json.loads(file.readline())
+	except FileNotFoundError:
+		return {'index':0, 'experimentNumber':0, 'timestamp':0}
+
+def writeJSONIndexFile(directory, indexData):
+	"""Private method. Replace index.json by renaming a complete temporary file over it."""
+	indexPath = os.path.join(directory, 'index.json')
+	temporaryPath = indexPath + '.tmp' + str(os.getpid()) + '-' + str(threading.get_ident())
+	with open(temporaryPath, 'w') as file:
+		json.dump(indexData, file)
+		file.write('\n')
+	try:
+		os.replace(temporaryPath, indexPath)
+	except OSError:
+		# Windows refuses to replace a file that another process has open, so fall back to overwriting it in place
+		with open(indexPath, 'w') as file:
+			json.dump(indexData, file)
+			file.write('\n')
+		os.remove(temporaryPath)
+
+def updateJSONIndex(directory, counter, returnPrevious=False):
+	"""Private method. Increase one of the counters in index.json by 1 and refresh the timestamp. Returns the updated index data."""
+	manager = getJSONIndexManager(directory)
+	if(manager is not None):
+		return manager.increment(counter, returnPrevious=returnPrevious)
+	
+	with JSONIndexFileLock(directory):
+		return updateJSONIndexWhileLocked(directory, counter, returnPrevious)
+
+def updateJSONIndexWhileLocked(directory, counter, returnPrevious=False):
+	"""Private method. The read-modify-write of index.json, for callers that already hold its lock."""
+	indexData = readJSONIndexFile(directory)
+	previousIndexData = dict(indexData)
+	indexData[counter] += 1
+	indexData['timestamp'] = time.time()
+	writeJSONIndexFile(directory, indexData)
+	return previousIndexData if(returnPrevious) else indexData
+
+def getJSONIndexManager(directory):
+	"""Return the active JSONIndexManager for directory, or None if there is not one."""
+	return jsonIndexManagers.get(os.path.abspath(directory))
+
+def openJSONIndexManager(directory):
+	"""Keep the index lock file of directory open until closeJSONIndexManager() is called. Returns the manager."""
+	with jsonIndexManagersLock:
+		key = os.path.abspath(directory)
+		if(key not in jsonIndexManagers):
+			jsonIndexManagers[key] = JSONIndexManager(directory)
+		manager = jsonIndexManagers[key]
+		manager.users += 1
+		return manager
+
+def closeJSONIndexManager(directory):
+	"""Stop keeping the index lock file of directory open."""
+	with jsonIndexManagersLock:
+		key = os.path.abspath(directory)
+		manager = jsonIndexManagers.get(key)
+		if(manager is None):
+			return
+		manager.users -= 1
+		if(manager.users <= 0):
+			del jsonIndexManagers[key]
+			manager.close()
+
+class JSONIndexManager:
+	"""index.json updates for a single device folder. The lock file stays open while the manager is open, but it is only locked for
+	each update. Threads of this process are serialized by self.lock, since the file lock does not exclude other threads of its holder."""
+	
+	def __init__(self, directory):
+		self.directory = directory
+		self.lock = threading.Lock()
+		self.users = 0
+		self.fileLock = JSONIndexFileLock(directory, keepOpen=True)
+	
+	def get(self):
+		return readJSONIndexFile(self.directory)
+	
+	def increment(self, counter, returnPrevious=False):
+		with self.lock, self.fileLock:
+			return updateJSONIndexWhileLocked(self.directory, counter, returnPrevious)
+	
+	def close(self):
+		with self.lock:
+			self.fileLock.close()
+
+class JSONIndexFileLock:
+	"""Advisory lock on a device folder's index counters, shared between processes. If the lock cannot be acquired within timeout seconds,
+	a warning is printed and the caller continues without it rather than stopping a measurement. If keepOpen is True, the lock file
+	stays open after the lock is released so that it can be locked again without reopening it (until close() is called)."""
+	
+	def __init__(self, directory, timeout=JSON_INDEX_LOCK_TIMEOUT, keepOpen=False):
+		self.path = os.path.join(directory, JSON_INDEX_LOCK_FILE_NAME)
+		self.timeout = timeout
+		self.keepOpen = keepOpen
+		self.file = None
+		self.locked = False
+	
+	def acquire(self):
+		if(self.file is None):
+			makeFolder(os.path.dirname(self.path))
+			self.file = open(self.path, 'a+')
+		startTime = time.time()
+		while(True):
+			try:
+				if(fcntl is not None):
+					fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+				else:
+					self.file.seek(0)
+					msvcrt.locking(self.file.fileno(), msvcrt.LK_NBLCK, 1)
+				self.locked = True
+				return self
+			except OSError:
+				if(time.time() - startTime > self.timeout):
+					print('Warning - unable to lock "' + self.path + '", continuing without it')
+					return self
+				time.sleep(0.01)
+	
+	def release(self):
+		try:
+			if(self.locked):
+				if(fcntl is not None):
+					fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+				else:
+					self.file.seek(0)
+					msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+		finally:
+			self.locked = False
+			if(not self.keepOpen):
+				self.close()
+	
+	def close(self):
+		if(self.locked):
+			self.keepOpen = False
+			self.release()
+		elif(self.file is not None):
+			self.file.close()
+			self.file = None
+	
+	def __enter__(self):
+		return self.acquire()
+	
+	def __exit__(self, exceptionType, exceptionValue, traceback):
+		self.release()
+
+
+
+# === JSON Responses ===
+"""Responses sent to the UI must be strict JSON, so NaN is sent as null and infinite values as +/-1e99. Rather than copying every response
+to replace these values first, responses are encoded by the standard library's C encoder (which writes them as NaN and Infinity) and only
+those tokens are then replaced. A token is only replaced if it is outside of a string, which is known from the number of unescaped quotes
+before it. numpy arrays and numbers are converted to lists and Python numbers as they are found."""
+
+JSON_NONFINITE_REPLACEMENTS = {'NaN':'null', 'Infinity':'1e+99', '-Infinity':'-1e+99'}
+
+class JSONResponseEncoder(DataJSONEncoder):
+	"""Private class. A JSON encoder that also accepts numpy arrays and numbers, and any other kind of Mapping or Sequence."""
+	def default(self, obj):
+		if(isinstance(obj, Mapping)):
+			return dict(obj)
+		if(isinstance(obj, Sequence) and not isinstance(obj, (str, bytes))):
+			return list(obj)
+		return DataJSONEncoder.default(self, obj)
+
+jsonResponseEncoder = JSONResponseEncoder()
+
+def encodeJSONResponse(obj):
+	"""Encode obj as strict JSON text, with NaN as null and +/-infinity as +/-1e99."""
+	text = jsonResponseEncoder.encode(obj)
+	tokens = sorted(findNonFiniteJSONTokens(text, 'NaN') + findNonFiniteJSONTokens(text, 'Infinity'))
+	if(len(tokens) == 0):
+		return text
+
+	parts = []
+	copiedUpTo = 0
+	scannedUpTo = 0
+	insideString = False
+	for start, token in tokens:
+		# Escapes are always two characters (or \uXXXX), so after dropping escaped backslashes and quotes every remaining quote opens or closes a string
+		scanned = text[scannedUpTo:start]
+		if('\\' in scanned):
+			scanned = scanned.replace('\\\\', '').replace('\\"', '')
+		insideString ^= (scanned.count('"') % 2 == 1)
+		scannedUpTo = start
+		if(not insideString):
+			parts.append(text[copiedUpTo:start])
+			parts.append(JSON_NONFINITE_REPLACEMENTS[token])
+			copiedUpTo = start + len(token)
+	parts.append(text[copiedUpTo:])
+	return ''.join(parts)
+
+def findNonFiniteJSONTokens(text, token):
+	"""Private method. Get the (start, token) of every occurrence of 'NaN' or 'Infinity' in text, including the sign of '-Infinity'."""
+	tokens = []
+	start = text.find(token)
+	while(start >= 0):
+		if((token == 'Infinity') and (start > 0) and (text[start - 1] == '-')):
+			tokens.append((start - 1, '-' + token))
+		else:
+			tokens.append((start, token))
+		start = text.find(token, start + len(token))
+	return tokens
+
+
+
 # === Device History API ===
 """These are the public methods used specifically to load device data."""
 
@@ -286,9 +653,53 @@ def getExperimentDirectory(device_directory, experimentNumber):
 	"""Given the typical parameters used to run an experiment, return the path to the directory where data will be saved for this device."""
 	return os.path.join(device_directory, 'Ex'+str(experimentNumber)) + os.sep
 
-def loadSpecificDeviceHistory(directory, fileName, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), looseFiltering=False):
+def loadJSON_tail(directory, loadFileName, numberOfLines=1, blockSize=64*1024):
+	"""Private method. Load only the last numberOfLines entries of a data file. The line index is used to find them if it is valid,
+	otherwise the file is read backwards in blocks from the end until enough complete lines have been found."""
+	if(numberOfLines <= 0):
+		return []
+	binaryResultsPath = getBinaryResultsPath(directory, loadFileName)
+	lineIndex = loadJSONLineIndex(directory, loadFileName)
+	if(lineIndex is not None):
+		lastEntries = lastRecordLines(lineIndex, numberOfLines, lambda entry: entry['index'])
+		return parseLines(loadJSONLinesAt(directory, loadFileName, lastEntries), binaryResultsPath=binaryResultsPath)
+	
+	# Streamed records span several lines, so lines are grouped into records by their index
+	lineRecordIndex = lambda line: getFileLineHeader(line)[0]
+	countTailRecords = lambda tail: len(set(lineRecordIndex(line.decode('utf-8')) for line in tail.split(b'\n')[1:-1] if(line.strip() != b'')))
+	with open(os.path.join(directory, loadFileName), 'rb') as file:
+		position = file.seek(0, os.SEEK_END)
+		tail = b''
+		# Stop once there are more complete records than requested so that the first record kept is known to be complete
+		while((position > 0) and ((tail.count(b'\n') <= numberOfLines) or (countTailRecords(tail) <= numberOfLines))):
+			readSize = min(blockSize, position)
+			position -= readSize
+			file.seek(position)
+			tail = file.read(readSize) + tail
+	
+	# A final line without a line break is still being written, so it is left out
+	fileLines = tail.split(b'\n')[:-1]
+	if(position > 0):
+		fileLines = fileLines[1:]
+	fileLines = [line.decode('utf-8') for line in fileLines if(line.strip() != b'')]
+	return parseLines(lastRecordLines(fileLines, numberOfLines, lineRecordIndex), binaryResultsPath=binaryResultsPath)
+
+def lastRecordLines(lines, numberOfRecords, getRecordIndex):
+	"""Private method. Return the trailing items of lines that belong to the last numberOfRecords distinct record indexes."""
+	recordIndexes = set()
+	start = len(lines)
+	while(start > 0):
+		recordIndex = getRecordIndex(lines[start-1])
+		if((recordIndex not in recordIndexes) and (len(recordIndexes) >= numberOfRecords)):
+			break
+		recordIndexes.add(recordIndex)
+		start -= 1
+	return lines[start:]
+
+def loadSpecificDeviceHistory(directory, fileName, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), looseFiltering=False, lazyResults=False):
 	"""Given a folder path and fileName, load data for a device over a range of indices or experiments.
-	If minIndex/maxIndex or minExperiment/maxExperiment are negative, then index backwards (-1 == the most recent index/experiment)"""
+	If minIndex/maxIndex or minExperiment/maxExperiment are negative, then index backwards (-1 == the most recent index/experiment)
+	If lazyResults is True, the 'Results' of each entry are only read from disk when they are first accessed (see LazyRecord)."""
 	
 	# Handle negative indexing (loads data starting from the end of the file)
 	indexData = loadJSONIndex(directory)
@@ -307,13 +718,13 @@ def loadSpecificDeviceHistory(directory, fileName, minIndex=0, maxIndex=float('i
 	natural_keys = lambda text: [string_to_int(c) for c in re.split('(\d+)', text)]
 
 	for experimentSubdirectory in sorted([name for name in os.listdir(directory) if(os.path.isdir(os.path.join(directory, name)) and os.path.exists(os.path.join(directory, name, fileName)) and (name[0:2] == 'Ex' and name[2:].isdigit()) and (int(name[2:]) >= minExperiment) and (int(name[2:]) <= maxExperiment))], key=natural_keys):
-		filteredHistory += loadJSON_fast(os.path.join(directory, experimentSubdirectory), fileName, minIndex, maxIndex, minExperiment, maxExperiment, minRelativeIndex, maxRelativeIndex, looseFiltering=looseFiltering)
+		filteredHistory += loadJSON_fast(os.path.join(directory, experimentSubdirectory), fileName, minIndex, maxIndex, minExperiment, maxExperiment, minRelativeIndex, maxRelativeIndex, looseFiltering=looseFiltering, lazyResults=lazyResults)
 
 	return filteredHistory
 
-@lru_cache(maxsize=32)
-def loadSpecificDeviceHistoryWithCaching(cacheBust, *args, **kwargs):
-	return loadSpecificDeviceHistory(*args, **kwargs)
+def loadSpecificDeviceHistoryWithCaching(directory, fileName, **kwargs):
+	"""Same as loadSpecificDeviceHistory(), but reuses previously loaded data for as long as none of the device's data files have changed."""
+	return deviceHistoryCache.load(loadSpecificDeviceHistory, directory, fileName, **kwargs)
 
 def loadOldestDeviceHistory(directory, fileName, numberOfOldestExperiments=1, numberOfOldestIndexes=1):
 	"""Given a folder path and fileName, load oldest data for a device. Can specify the number of oldest experiments to include, and the number of data entries within each old experiment to include."""
@@ -332,11 +743,27 @@ def loadMostRecentDeviceHistory(directory, fileName, numberOfRecentExperiments=1
 	recentDeviceExperimentNumber = mostRecentExperimentNumber
 	while(not os.path.exists(os.path.join(directory, 'Ex' + str(recentDeviceExperimentNumber), fileName)) and (recentDeviceExperimentNumber > 0)):
 		recentDeviceExperimentNumber -= 1
+	
+	# When only a limited number of entries is needed, read them from the end of each experiment's file (newest experiment first)
+	if(numberOfRecentIndexes < float('inf')):
+		recentEntries = []
+		for experimentNumber in range(recentDeviceExperimentNumber, recentDeviceExperimentNumber - numberOfRecentExperiments, -1):
+			if(len(recentEntries) >= numberOfRecentIndexes):
+				break
+			experimentDirectory = os.path.join(directory, 'Ex' + str(experimentNumber))
+			if(os.path.exists(os.path.join(experimentDirectory, fileName))):
+				recentEntries = loadJSON_tail(experimentDirectory, fileName, numberOfRecentIndexes - len(recentEntries)) + recentEntries
+		return recentEntries
+	
 	recentExperiments = loadSpecificDeviceHistory(directory, fileName, minExperiment=recentDeviceExperimentNumber-(numberOfRecentExperiments-1), maxExperiment=recentDeviceExperimentNumber)
 	if(len(recentExperiments) <= numberOfRecentIndexes):
 		return recentExperiments
 	return recentExperiments[-numberOfRecentIndexes:]
 
+def loadMostRecentDeviceHistoryWithCaching(directory, fileName, **kwargs):
+	"""Same as loadMostRecentDeviceHistory(), but reuses previously loaded data for as long as none of the device's data files have changed."""
+	return deviceHistoryCache.load(loadMostRecentDeviceHistory, directory, fileName, **kwargs)
+
 def getDataFileNamesForDeviceExperiments(directory, minExperiment=0, maxExperiment=float('inf')):
 	"""Given a folder path and range of experiments, get all of the unique .json file names that hold data in that directory."""
 	dataFileNames = []
@@ -366,8 +793,13 @@ def getIndexesForExperiments(directory, minExperiment, maxExperiment):
 	indexes = []
 	for experimentSubdirectory in [name for name in os.listdir(directory) if(os.path.isdir(os.path.join(directory, name)) and (name[0:2] == 'Ex' and name[2:].isdigit()) and (int(name[2:]) >= minExperiment) and (int(name[2:]) <= maxExperiment))]:
 		for filePath in glob.glob(os.path.join(directory, experimentSubdirectory) + '/*.json'):
-			jsonData = loadJSON_fast('', filePath, minExperiment=minExperiment, maxExperiment=maxExperiment)
+			# The line index already knows the index of every entry, so there is no need to parse the data itself
+			lineIndex = loadJSONLineIndex('', filePath)
+			jsonData = lineIndex if(lineIndex is not None) else loadJSON_fast('', filePath, minExperiment=minExperiment, maxExperiment=maxExperiment)
 			for deviceRun in jsonData:
+				# Entries for lines without a header or properties (e.g. written by older versions) cannot be placed in an experiment
+				if(deviceRun.get('experimentNumber') is None) or (deviceRun.get('index') is None):
+					continue
 				if(deviceRun['experimentNumber'] >= minExperiment) and (deviceRun['experimentNumber'] <= maxExperiment):
 					indexes.append(deviceRun['index'])
 	indexes.sort()
@@ -375,6 +807,98 @@ def getIndexesForExperiments(directory, minExperiment, maxExperiment):
 
 
 
+# === Device History Cache ===
+"""Loaded device histories are kept in memory so that consecutive plots of the same data do not need to load it again. Entries are looked up
+by the loading function, its arguments, and the size and modification time of every data file the device has, so anything newly saved
+(or rewritten) for the device is never hidden by the cache. Once the cache holds more than its memory budget, the least recently
+used entries are discarded."""
+
+DEVICE_HISTORY_CACHE_BYTES = 512*1024*1024
+
+class DeviceHistoryCache:
+	def __init__(self, maxBytes=DEVICE_HISTORY_CACHE_BYTES):
+		self.maxBytes = maxBytes
+		self.entries = OrderedDict()
+		self.lock = threading.Lock()
+		self.currentBytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+	
+	def load(self, loadFunction, directory, fileName, **kwargs):
+		"""Return loadFunction(directory, fileName, **kwargs), using a cached result if the device's files are unchanged since it was loaded."""
+		key = (loadFunction.__name__, os.path.abspath(directory), fileName, tuple(sorted(kwargs.items())), deviceFilesFingerprint(directory, fileName))
+		with self.lock:
+			if(key in self.entries):
+				self.entries.move_to_end(key)
+				self.hits += 1
+				return copyDeviceHistory(self.entries[key][0])
+			self.misses += 1
+		
+		deviceHistory = loadFunction(directory, fileName, **kwargs)
+		size = estimateDeviceHistorySize(deviceHistory)
+		if(size <= self.maxBytes):
+			with self.lock:
+				if(key not in self.entries):
+					self.entries[key] = (deviceHistory, size)
+					self.currentBytes += size
+				while(self.currentBytes > self.maxBytes):
+					evictedHistory, evictedSize = self.entries.popitem(last=False)[1]
+					self.currentBytes -= evictedSize
+					self.evictions += 1
+		return copyDeviceHistory(deviceHistory)
+	
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+			self.currentBytes = 0
+	
+	def stats(self):
+		with self.lock:
+			requests = self.hits + self.misses
+			return {'entries':len(self.entries), 'bytes':self.currentBytes, 'maxBytes':self.maxBytes, 'hits':self.hits, 'misses':self.misses, 'evictions':self.evictions, 'hitRate':(self.hits/requests if(requests > 0) else 0)}
+
+deviceHistoryCache = DeviceHistoryCache()
+
+def getDeviceHistoryCacheStats():
+	return deviceHistoryCache.stats()
+
+def deviceFilesFingerprint(directory, fileName):
+	"""Private method. Get the size and modification time of index.json and every data file in the device's experiment folders.
+	Relative index filtering depends on the other data files in an experiment, so all of them are included (not just fileName)."""
+	fingerprint = []
+	for path in [os.path.join(directory, 'index.json')] + glob.glob(os.path.join(directory, 'Ex*', '*.json')):
+		try:
+			fileStatus = os.stat(path)
+			fingerprint.append((path, fileStatus.st_size, fileStatus.st_mtime_ns))
+		except OSError:
+			pass
+	return tuple(sorted(fingerprint))
+
+def copyDeviceHistory(deviceHistory):
+	"""Private method. Copy each entry (and its 'Results') so callers can add or replace keys without changing what is in the cache."""
+	copiedHistory = []
+	for deviceRun in deviceHistory:
+		copiedRun = dict(deviceRun)
+		if(isinstance(copiedRun.get('Results'), dict)):
+			copiedRun['Results'] = dict(copiedRun['Results'])
+		copiedHistory.append(copiedRun)
+	return copiedHistory
+
+def estimateDeviceHistorySize(deviceHistory):
+	"""Private method. Roughly estimate the memory used by a loaded device history, dominated by the numbers stored in 'Results'."""
+	size = 0
+	for deviceRun in deviceHistory:
+		size += 4096
+		for value in (deviceRun.get('Results') or {}).values():
+			if(isinstance(value, list)):
+				size += 32*len(value)
+				if((len(value) > 0) and isinstance(value[0], list)):
+					size += 32*len(value)*len(value[0])
+	return size
+
+
+
 # === Chip History API ===
 """These are the public methods used specifically to load data from multiple devices on the same chip."""
 
@@ -390,44 +914,56 @@ def loadChipIndexes(directory):
 		chipIndexes[deviceSubdirectory] = indexData
 	return chipIndexes
 
-def loadSpecificChipHistory(directory, fileName, specificDeviceList=None, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf')):
+def loadSpecificChipHistory(directory, fileName, specificDeviceList=None, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), workers=1, useProcesses=False):
 	"""Given a chip's folder path and a data fileName, load data over a range of indices or experiments for devices on that chip.
-	The default loads all devices on the chip but specific devices can also be specified."""
-	chipHistory = []
-	for deviceSubdirectory in [name for name in os.listdir(directory) if(os.path.isdir(os.path.join(directory, name)) and (specificDeviceList is None or name in specificDeviceList))]:
-		deviceHistory = loadSpecificDeviceHistory(os.path.join(directory, deviceSubdirectory), fileName, minIndex=minIndex, maxIndex=maxIndex, minExperiment=minExperiment, maxExperiment=maxExperiment, minRelativeIndex=minRelativeIndex, maxRelativeIndex=maxRelativeIndex)
-		chipHistory.extend(deviceHistory)
-	return chipHistory
+	The default loads all devices on the chip but specific devices can also be specified.
+	If workers > 1, devices are loaded in parallel by a pool of threads (or processes if useProcesses is True)."""
+	deviceDirectories = [os.path.join(directory, name) for name in os.listdir(directory) if(os.path.isdir(os.path.join(directory, name)) and (specificDeviceList is None or name in specificDeviceList))]
+	loadDevice = partial(loadSpecificDeviceHistory, fileName=fileName, minIndex=minIndex, maxIndex=maxIndex, minExperiment=minExperiment, maxExperiment=maxExperiment, minRelativeIndex=minRelativeIndex, maxRelativeIndex=maxRelativeIndex)
+	return loadForEachDevice(loadDevice, deviceDirectories, workers=workers, useProcesses=useProcesses)
 
-def loadChipHistoryByIndex(directory, fileName, deviceIndexes={}, specificDeviceList=None):
+def loadChipHistoryByIndex(directory, fileName, deviceIndexes={}, specificDeviceList=None, workers=1, useProcesses=False):
 	"""Given a chip's folder path and a data fileName, load data from devices with specific individual experiments listed in the 'deviceIndexes' dictionary.
 	The default loads all devices with an index but specific devices can also be specified."""
 	linkedDevices = list(sorted(deviceIndexes.keys()))
-	chipHistory = []
-	for device in [device for device in linkedDevices if(os.path.isdir(os.path.join(directory, device)) and (specificDeviceList is None or device in specificDeviceList))]:
-		indexData = deviceIndexes[device]
-		deviceHistory = loadSpecificDeviceHistory(os.path.join(directory, device), fileName, minExperiment=indexData['experimentNumber'], maxExperiment=indexData['experimentNumber'])
-		chipHistory.extend(deviceHistory)
-	return chipHistory
+	devices = [device for device in linkedDevices if(os.path.isdir(os.path.join(directory, device)) and (specificDeviceList is None or device in specificDeviceList))]
+	loadDevices = [partial(loadSpecificDeviceHistory, os.path.join(directory, device), fileName, minExperiment=deviceIndexes[device]['experimentNumber'], maxExperiment=deviceIndexes[device]['experimentNumber']) for device in devices]
+	return loadForEachDevice(callPartial, loadDevices, workers=workers, useProcesses=useProcesses)
 
-def loadOldestChipHistory(directory, fileName, numberOfOldestExperiments=1, numberOfOldestIndexes=1, specificDeviceList=None):
+def loadOldestChipHistory(directory, fileName, numberOfOldestExperiments=1, numberOfOldestIndexes=1, specificDeviceList=None, workers=1, useProcesses=False):
 	"""Given a chip's folder path and a data fileName, load the oldest saved jsonData for devices on that chip.
 	The default loads all devices on the chip but specific devices can also be specified."""
-	chipHistory = []
-	for deviceSubdirectory in [name for name in os.listdir(directory) if(os.path.isdir(os.path.join(directory, name)) and (specificDeviceList is None or name in specificDeviceList))]:
-		deviceHistory = loadOldestDeviceHistory(os.path.join(directory, deviceSubdirectory), fileName, numberOfOldestExperiments=numberOfOldestExperiments, numberOfOldestIndexes=numberOfOldestIndexes)
-		chipHistory.extend(deviceHistory)
-	return chipHistory
+	deviceDirectories = [os.path.join(directory, name) for name in os.listdir(directory) if(os.path.isdir(os.path.join(directory, name)) and (specificDeviceList is None or name in specificDeviceList))]
+	loadDevice = partial(loadOldestDeviceHistory, fileName=fileName, numberOfOldestExperiments=numberOfOldestExperiments, numberOfOldestIndexes=numberOfOldestIndexes)
+	return loadForEachDevice(loadDevice, deviceDirectories, workers=workers, useProcesses=useProcesses)
 
-def loadMostRecentChipHistory(directory, fileName, numberOfRecentExperiments=1, numberOfRecentIndexes=1, specificDeviceList=None):
+def loadMostRecentChipHistory(directory, fileName, numberOfRecentExperiments=1, numberOfRecentIndexes=1, specificDeviceList=None, workers=1, useProcesses=False):
 	"""Given a chip's folder path and a data fileName, load the most recently saved jsonData for devices on that chip.
 	The default loads all devices on the chip but specific devices can also be specified."""
+	deviceDirectories = [os.path.join(directory, name) for name in os.listdir(directory) if(os.path.isdir(os.path.join(directory, name)) and (specificDeviceList is None or name in specificDeviceList))]
+	loadDevice = partial(loadMostRecentDeviceHistory, fileName=fileName, numberOfRecentExperiments=numberOfRecentExperiments, numberOfRecentIndexes=numberOfRecentIndexes)
+	return loadForEachDevice(loadDevice, deviceDirectories, workers=workers, useProcesses=useProcesses)
+
+def loadForEachDevice(loadDevice, devices, workers=1, useProcesses=False):
+	"""Private method. Call loadDevice for each entry of devices and combine the loaded histories, keeping them in the same order as devices.
+	With more than one worker the devices are loaded by a thread pool, or by a process pool if useProcesses is True (which also
+	parallelizes JSON parsing, but loadDevice must then be picklable)."""
 	chipHistory = []
-	for deviceSubdirectory in [name for name in os.listdir(directory) if(os.path.isdir(os.path.join(directory, name)) and (specificDeviceList is None or name in specificDeviceList))]:
-		deviceHistory = loadMostRecentDeviceHistory(os.path.join(directory, deviceSubdirectory), fileName, numberOfRecentExperiments=numberOfRecentExperiments, numberOfRecentIndexes=numberOfRecentIndexes)
-		chipHistory.extend(deviceHistory)
+	if((workers is None) or (workers <= 1) or (len(devices) <= 1)):
+		for device in devices:
+			chipHistory.extend(loadDevice(device))
+		return chipHistory
+	
+	Executor = ProcessPoolExecutor if(useProcesses) else ThreadPoolExecutor
+	with Executor(max_workers=min(workers, len(devices))) as executor:
+		for deviceHistory in executor.map(loadDevice, devices):
+			chipHistory.extend(deviceHistory)
 	return chipHistory
 
+def callPartial(function):
+	"""Private method. Allows a list of partial functions to be mapped over by loadForEachDevice."""
+	return function()
+
 def getDataFileNamesForChipExperiments(directory, minExperiment=0, maxExperiment=float('inf'), specificDeviceList=None):
 	"""Given a folder path and range of experiments, get all of the unique .json file names that hold data in that directory."""
 	dataFileNames = []
@@ -456,70 +992,874 @@ def getWaferDirectory(parameters):
 
 
 
+# === Workspace Catalog ===
+"""The workspace catalog is a small SQLite database ('catalog.sqlite') at the top of a workspace data folder that holds the size, modification
+time, index count, and experiment count of every device folder, so the data browser can summarize entire projects without crawling them.
+It is created the first time the browser asks for it. After that, the launcher rescans each device once its experiment has ended, and any
+device folder that is new or whose index.json has changed since it was last scanned is rescanned when the catalog is loaded."""
+
+WORKSPACE_CATALOG_FILE_NAME = 'catalog.sqlite'
+WORKSPACE_CATALOG_COLUMNS = ['user', 'project', 'wafer', 'chip', 'device', 'size', 'modificationTime', 'indexCount', 'experimentCount', 'indexModificationTime']
+
+workspaceCatalogs = {}
+workspaceCatalogLock = threading.RLock()
+
+def loadWorkspaceCatalog(workspacePath, user, project, wafer='*', chip='*', indexModificationTimes=None):
+	"""Return a list of dictionaries (one per device folder in the given user/project, optionally limited to one wafer or chip) with the
+	'size', 'modificationTime', 'indexCount', and 'experimentCount' of each device along with its identifiers.
+	indexModificationTimes can map the identifiers (user, project, wafer, chip, device) of every device folder to the modification time of
+	its index.json if the caller already knows them, otherwise they are found on disk."""
+	# Listing the device folders is cheap, it is only reading every file in them that needs to be avoided
+	if(indexModificationTimes is None):
+		indexModificationTimes = {}
+		for deviceDirectory in glob.glob(os.path.join(workspacePath, user, project, wafer, chip, '*/')):
+			identifiers = tuple(os.path.normpath(deviceDirectory).split(os.sep)[-5:])
+			indexModificationTimes[identifiers] = getModificationTime(os.path.join(deviceDirectory, 'index.json'))
+	
+	with workspaceCatalogLock:
+		catalog = getWorkspaceCatalog(workspacePath)
+		rows = selectWorkspaceCatalogRows(catalog, user, project, wafer, chip)
+		for identifiers, indexModificationTime in indexModificationTimes.items():
+			if((identifiers not in rows) or (rows[identifiers]['indexModificationTime'] != indexModificationTime)):
+				scanWorkspaceCatalogDevice(catalog, workspacePath, identifiers)
+		for identifiers in rows:
+			if(identifiers not in indexModificationTimes):
+				catalog.execute('DELETE FROM devices WHERE user = ? AND project = ? AND wafer = ? AND chip = ? AND device = ?', identifiers)
+		catalog.commit()
+		return list(selectWorkspaceCatalogRows(catalog, user, project, wafer, chip).values())
+
+def updateWorkspaceCatalog(deviceDirectory):
+	"""Rescan the catalog row of the device in deviceDirectory, e.g. after an experiment on it has ended. Does nothing if the workspace does
+	not have a catalog yet, and never interrupts saving data."""
+	try:
+		identifiers = tuple(os.path.normpath(os.path.abspath(deviceDirectory)).split(os.sep)[-5:])
+		workspacePath = os.path.abspath(os.path.join(deviceDirectory, *(['..']*5)))
+		with workspaceCatalogLock:
+			catalog = getWorkspaceCatalog(workspacePath, create=False)
+			if(catalog is None):
+				return
+			scanWorkspaceCatalogDevice(catalog, workspacePath, identifiers)
+			catalog.commit()
+	except Exception as e:
+		print('Unable to update the workspace catalog for: ' + str(deviceDirectory))
+		print(e)
+
+def getWorkspaceCatalog(workspacePath, create=True):
+	"""Private method. Return this process's connection to the catalog of workspacePath (or None if there is no catalog and create is False).
+	The connection is shared by every thread, so it must only be used while holding workspaceCatalogLock."""
+	catalogPath = os.path.abspath(os.path.join(workspacePath, WORKSPACE_CATALOG_FILE_NAME))
+	key = (catalogPath, os.getpid())
+	with workspaceCatalogLock:
+		if(key not in workspaceCatalogs):
+			if((not create) and (not os.path.exists(catalogPath))):
+				return None
+			catalog = sqlite3.connect(catalogPath, timeout=JSON_INDEX_LOCK_TIMEOUT, check_same_thread=False)
+			catalog.execute('PRAGMA journal_mode = WAL')
+			catalog.execute('PRAGMA synchronous = NORMAL')
+			catalog.execute('CREATE TABLE IF NOT EXISTS devices (user TEXT, project TEXT, wafer TEXT, chip TEXT, device TEXT, size INTEGER, modificationTime REAL, indexCount INTEGER, experimentCount INTEGER, indexModificationTime REAL, PRIMARY KEY (user, project, wafer, chip, device))')
+			catalog.commit()
+			workspaceCatalogs[key] = catalog
+		return workspaceCatalogs[key]
+
+def selectWorkspaceCatalogRows(catalog, user, project, wafer='*', chip='*'):
+	"""Private method. Return the catalog rows for a user/project (and wafer and chip, unless they are '*') keyed by their identifiers."""
+	query = 'SELECT ' + ', '.join(WORKSPACE_CATALOG_COLUMNS) + ' FROM devices WHERE user = ? AND project = ?'
+	arguments = [user, project]
+	for column, value in [('wafer', wafer), ('chip', chip)]:
+		if(value != '*'):
+			query += ' AND ' + column + ' = ?'
+			arguments.append(value)
+	rows = [dict(zip(WORKSPACE_CATALOG_COLUMNS, row)) for row in catalog.execute(query, arguments)]
+	return OrderedDict((tuple(row[column] for column in WORKSPACE_CATALOG_COLUMNS[:5]), row) for row in rows)
+
+def scanWorkspaceCatalogDevice(catalog, workspacePath, identifiers):
+	"""Private method. Read the size, modification time, and index counters of one device folder from disk and save them in the catalog."""
+	deviceDirectory = os.path.join(workspacePath, *identifiers)
+	try:
+		indexData = loadJSONIndex(deviceDirectory)
+	except Exception as e:
+		print('Unable to read index.json for: ' + str(deviceDirectory))
+		print(e)
+		indexData = {}
+	parametersHistoryPath = os.path.join(deviceDirectory, 'ParametersHistory.json')
+	modificationTime = getModificationTime(parametersHistoryPath) if(os.path.exists(parametersHistoryPath)) else getModificationTime(deviceDirectory)
+	row = tuple(identifiers) + (directorySize(deviceDirectory), modificationTime, indexData.get('index', 0), indexData.get('experimentNumber', 0), getModificationTime(os.path.join(deviceDirectory, 'index.json')))
+	catalog.execute('INSERT OR REPLACE INTO devices (' + ', '.join(WORKSPACE_CATALOG_COLUMNS) + ') VALUES (' + ', '.join(['?']*len(WORKSPACE_CATALOG_COLUMNS)) + ')', row)
+
+def directorySize(directory):
+	"""Total size in bytes of directory, everything in it, and all of its subdirectories."""
+	totalSize = os.path.getsize(directory)
+	for entry in os.scandir(directory):
+		totalSize += directorySize(entry.path) if(entry.is_dir()) else entry.stat().st_size
+	return totalSize
+
+def getModificationTime(path):
+	"""Private method. The modification time of path, or 0 if it does not exist."""
+	try:
+		return os.path.getmtime(path)
+	except OSError:
+		return 0
+
+
+
+# === Experiment Summaries ===
+"""Each device folder can hold a summary index ('ExperimentSummaries.json') with one entry per experiment: its parameters (from
+ParametersHistory.json, or rebuilt from its last data entry if the experiment never finished), its data files, and the plots that can be made
+from them. An entry is rebuilt only when the size or modification time of one of its experiment's data files changes, and new lines of
+ParametersHistory.json are read from where the last read stopped, so listing a device's experiments does not reread every file it holds."""
+
+EXPERIMENT_SUMMARIES_FILE_NAME = 'ExperimentSummaries.json'
+EXPERIMENT_SUMMARIES_VERSION = 1
+
+experimentSummariesLock = threading.Lock()
+
+def loadExperimentSummaries(deviceDirectory, offset=0, limit=None, getPossiblePlots=None, possiblePlotsVersion=None):
+	"""Return (summaries, total): the summaries of the device's experiments sorted by experiment number (only the ones from offset up to
+	offset + limit, if a limit is given) and the total number of experiments. Each summary is a dictionary of the experiment's parameters
+	with its 'dataFiles' added and, if getPossiblePlots is given, its 'possiblePlots' (as returned by getPossiblePlots(experimentNumber)).
+	Saved possible plots are only reused while possiblePlotsVersion (e.g. a hash of the available plot definitions) stays the same."""
+	with experimentSummariesLock:
+		summaries = readExperimentSummaries(deviceDirectory)
+		changed = updateParametersHistorySummaries(summaries, deviceDirectory)
+		if((getPossiblePlots is not None) and (summaries.get('possiblePlotsVersion') != possiblePlotsVersion)):
+			for summary in summaries['experiments'].values():
+				summary['possiblePlots'] = None
+			summaries['possiblePlotsVersion'] = possiblePlotsVersion
+			changed = True
+		
+		# Experiments are listed from their folders, plus any in ParametersHistory.json whose folder is missing
+		experimentNumbers = sorted(set(experimentFolderNumbers(deviceDirectory)) | set(int(number) for number, summary in summaries['experiments'].items() if(summary['fromParametersHistory'])))
+		listedNumbers = set(experimentNumbers)
+		for number in [number for number in summaries['experiments'] if(int(number) not in listedNumbers)]:
+			del summaries['experiments'][number]
+			changed = True
+		pageNumbers = experimentNumbers[offset:] if(limit is None) else experimentNumbers[offset:offset + limit]
+		changed = updateExperimentSummaries(summaries, deviceDirectory, pageNumbers, getPossiblePlots) or changed
+		if(changed):
+			writeExperimentSummaries(deviceDirectory, summaries)
+	
+	page = []
+	for experimentNumber in pageNumbers:
+		summary = summaries['experiments'][str(experimentNumber)]
+		experiment = dict(summary['parameters'])
+		experiment['dataFiles'] = list(summary['dataFiles'])
+		if(getPossiblePlots is not None):
+			experiment['possiblePlots'] = summary['possiblePlots']
+		page.append(experiment)
+	return (page, len(experimentNumbers))
+
+def refreshExperimentSummaries(deviceDirectory, experimentNumbers):
+	"""Bring the summaries of the given experiments up to date (e.g. once an experiment finishes), without computing their possible plots."""
+	with experimentSummariesLock:
+		summaries = readExperimentSummaries(deviceDirectory)
+		updateParametersHistorySummaries(summaries, deviceDirectory)
+		updateExperimentSummaries(summaries, deviceDirectory, experimentNumbers, None)
+		writeExperimentSummaries(deviceDirectory, summaries)
+
+def readExperimentSummaries(deviceDirectory):
+	"""Private method. Load the summary index of a device, or an empty one if it is missing, unreadable, or from another version."""
+	try:
+		with open(os.path.join(deviceDirectory, EXPERIMENT_SUMMARIES_FILE_NAME)) as file:
+			summaries = json.load(file)
+		if(summaries.get('version') == EXPERIMENT_SUMMARIES_VERSION):
+			return summaries
+	except (OSError, ValueError):
+		pass
+	return {'version':EXPERIMENT_SUMMARIES_VERSION, 'parametersHistoryOffset':0, 'experiments':{}}
+
+def writeExperimentSummaries(deviceDirectory, summaries):
+	"""Private method. Save the summary index of a device, replacing the old one in a single step so it is never seen half written."""
+	path = os.path.join(deviceDirectory, EXPERIMENT_SUMMARIES_FILE_NAME)
+	temporaryPath = path + '.' + str(os.getpid()) + '.tmp'
+	try:
+		with open(temporaryPath, 'w') as file:
+			json.dump(summaries, file)
+		os.replace(temporaryPath, path)
+	except OSError as e:
+		print('Unable to save experiment summaries for: ' + str(deviceDirectory))
+		print(e)
+
+def updateParametersHistorySummaries(summaries, deviceDirectory):
+	"""Private method. Read any lines added to ParametersHistory.json since it was last read into summaries. Returns True if anything changed."""
+	path = os.path.join(deviceDirectory, 'ParametersHistory.json')
+	size = os.path.getsize(path) if(os.path.exists(path)) else 0
+	offset = summaries['parametersHistoryOffset']
+	if(size == offset):
+		return False
+	
+	# A file that shrank was rewritten, so all of it is read again
+	if(size < offset):
+		offset = 0
+		for summary in summaries['experiments'].values():
+			summary['fromParametersHistory'] = False
+			summary['files'] = None
+	
+	with open(path, 'rb') as file:
+		file.seek(offset)
+		text = file.read(size - offset)
+	
+	# A final line without a line break is still being written, so it is left for next time
+	completeLength = text.rfind(b'\n') + 1
+	for experimentParameters in parseLines([line.decode('utf-8') for line in text[:completeLength].split(b'\n') if(line.strip() != b'')]):
+		number = str(experimentParameters['startIndexes']['experimentNumber'])
+		summary = summaries['experiments'].setdefault(number, {'files':None, 'dataFiles':[], 'possiblePlots':None})
+		summary['parameters'] = experimentParameters
+		summary['fromParametersHistory'] = True
+	summaries['parametersHistoryOffset'] = offset + completeLength
+	return True
+
+def updateExperimentSummaries(summaries, deviceDirectory, experimentNumbers, getPossiblePlots):
+	"""Private method. Rebuild the summaries of the given experiments whose data files have changed, and find the possible plots of any
+	that do not have them yet (if getPossiblePlots is given). Returns True if anything changed."""
+	changed = False
+	for experimentNumber in experimentNumbers:
+		experimentDirectory = os.path.join(deviceDirectory, 'Ex' + str(experimentNumber))
+		files = experimentFilesFingerprint(experimentDirectory)
+		summary = summaries['experiments'].setdefault(str(experimentNumber), {'files':None, 'dataFiles':[], 'possiblePlots':None, 'fromParametersHistory':False})
+		if(summary['files'] != files):
+			summary['files'] = files
+			summary['dataFiles'] = [name for name, size, modificationTime in files]
+			summary['possiblePlots'] = None
+			if(not summary['fromParametersHistory']):
+				summary['parameters'] = lastDataEntryParameters(experimentDirectory, experimentNumber, summary['dataFiles'])
+			changed = True
+		if((getPossiblePlots is not None) and (summary['possiblePlots'] is None)):
+			summary['possiblePlots'] = getPossiblePlots(experimentNumber)
+			changed = True
+	return changed
+
+def lastDataEntryParameters(experimentDirectory, experimentNumber, dataFiles):
+	"""Private method. For an experiment without a ParametersHistory.json entry, reconstruct as much of its parameters as possible from
+	the last data entry it saved (only its experiment number is known if it has not saved any)."""
+	lastParameters = None
+	for dataFile in dataFiles:
+		lastEntries = loadJSON_tail(experimentDirectory, dataFile, numberOfLines=1)
+		if((len(lastEntries) > 0) and ((lastParameters is None) or (lastEntries[-1]['index'] > lastParameters['index']))):
+			lastParameters = lastEntries[-1]
+	if(lastParameters is None):
+		return {'startIndexes':{'experimentNumber':experimentNumber}, 'parametersHistoryGenerated':True}
+	lastParameters = dict(lastParameters)
+	lastParameters.pop('Results', None)
+	lastParameters['endIndexes'] = dict(lastParameters['startIndexes'])
+	lastParameters['endIndexes']['index'] = lastParameters['index']
+	lastParameters['endIndexes']['experimentNumber'] = lastParameters['experimentNumber']
+	lastParameters['parametersHistoryGenerated'] = True
+	return lastParameters
+
+def experimentFolderNumbers(deviceDirectory):
+	"""Private method. The numbers of the experiment folders (Ex1, Ex2, ...) in a device folder."""
+	if(not os.path.isdir(deviceDirectory)):
+		return []
+	return [int(entry.name[2:]) for entry in os.scandir(deviceDirectory) if(entry.is_dir() and (entry.name[0:2] == 'Ex') and entry.name[2:].isdigit())]
+
+def experimentFilesFingerprint(experimentDirectory):
+	"""Private method. The name, size, and modification time of every data file in an experiment folder, sorted by name."""
+	if(not os.path.isdir(experimentDirectory)):
+		return []
+	files = []
+	for entry in os.scandir(experimentDirectory):
+		if(entry.is_file() and entry.name.endswith('.json')):
+			fileStatus = entry.stat()
+			files.append([entry.name, fileStatus.st_size, fileStatus.st_mtime_ns])
+	return sorted(files)
+
+
+
 # === Faster JSON Loading ===
 """Private methods used to load data faster when only a few lines are needed from a large file."""
 
 def loadJSONtoStringArray(directory, loadFileName):
 	fileLines = []
-	with open(os.path.join(directory, loadFileName)) as file:
+	with open(os.path.join(directory, loadFileName), 'rb') as file:
 		for line in file:
-			fileLines.append(line)
+			fileLines.append(line.decode('utf-8'))
 	return fileLines
 
-def filterStringArrayByIndexAndExperiment(directory, fileLines, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), looseFiltering=False):
-	filteredFileLines = fileLines
-
-	if(minExperiment == maxExperiment):
-		filteredFileLines = filterFileLines(filteredFileLines, 'experimentNumber', minExperiment, looseFiltering=looseFiltering)
-	else:
-		if(minExperiment > 0):
-			filteredFileLines = filterFileLinesGreaterThan(filteredFileLines, 'experimentNumber', minExperiment, looseFiltering=looseFiltering)
-		if(maxExperiment < float('inf')):
-			filteredFileLines = filterFileLinesLessThan(filteredFileLines, 'experimentNumber', maxExperiment, looseFiltering=looseFiltering)
-
-	if(minIndex == maxIndex):
-		filteredFileLines = filterFileLines(filteredFileLines, 'index', minIndex, looseFiltering=looseFiltering)
-	else:
-		if(minIndex > 0):
-			filteredFileLines = filterFileLinesGreaterThan(filteredFileLines, 'index', minIndex, looseFiltering=looseFiltering)
-		if(maxIndex < float('inf')):
-			filteredFileLines = filterFileLinesLessThan(filteredFileLines, 'index', maxIndex, looseFiltering=looseFiltering)
+def loadJSONLinesAt(directory, loadFileName, lineIndexEntries):
+	"""Read only the lines described by lineIndexEntries from a data file."""
+	fileLines = []
+	with open(os.path.join(directory, loadFileName), 'rb') as file:
+		for entry in lineIndexEntries:
+			file.seek(entry['offset'])
+			fileLines.append(file.read(entry['length']).decode('utf-8'))
+	return fileLines
 
+def filterStringArrayByIndexAndExperiment(directory, fileLines, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf'), looseFiltering=False):
+	"""Keep the lines of a data file that pass every requested filter. All of the filters are checked together in one pass, and each
+	line is only searched once for its index and experimentNumber."""
+	looseBounds = lambda minimum, maximum: [minimum] if(minimum == maximum) else ([minimum] if(minimum > 0) else []) + ([maximum] if(maximum < float('inf')) else [])
+	looseExperiments = looseBounds(minExperiment, maxExperiment)
+	looseIndexes = looseBounds(minIndex, maxIndex)
+	filterExperiment = len(looseExperiments) > 0
+	filterIndex = len(looseIndexes) > 0
+	
+	# Relative indexes are just another range of absolute indexes once the first index of the experiments is known
 	if(minRelativeIndex > 0 or maxRelativeIndex < 1e10):
 		experimentBaseIndex = min(getIndexesForExperiments(os.path.join(directory, '../'), minExperiment, maxExperiment))
-		if(minRelativeIndex > 0):
-			filteredFileLines = filterFileLinesGreaterThan(filteredFileLines, 'index', experimentBaseIndex + minRelativeIndex, looseFiltering=looseFiltering)
-		if(maxRelativeIndex < float('inf')):
-			filteredFileLines = filterFileLinesLessThan(filteredFileLines, 'index', experimentBaseIndex + maxRelativeIndex, looseFiltering=looseFiltering)
-
+		looseIndexes += ([experimentBaseIndex + minRelativeIndex] if(minRelativeIndex > 0) else []) + ([experimentBaseIndex + maxRelativeIndex] if(maxRelativeIndex < float('inf')) else [])
+		minIndex = max(minIndex, experimentBaseIndex + minRelativeIndex)
+		maxIndex = min(maxIndex, experimentBaseIndex + maxRelativeIndex)
+		filterIndex = True
+	
+	if(not filterExperiment and not filterIndex):
+		return fileLines
+	
+	isBetween = lambda value, minimum, maximum: (value is not None) and (value >= minimum) and (value <= maximum)
+	filteredFileLines = []
+	for line in fileLines:
+		index, experimentNumber = getFileLineHeader(line)
+		
+		# Loose filtering also keeps a line if every bound that was set appears verbatim as one of its (possibly nested) values
+		if(filterExperiment and not isBetween(experimentNumber, minExperiment, maxExperiment)):
+			if(not (looseFiltering and all(fileLineHasLooseValue(line, 'experimentNumber', value) for value in looseExperiments))):
+				continue
+		if(filterIndex and not isBetween(index, minIndex, maxIndex)):
+			if(not (looseFiltering and all(fileLineHasLooseValue(line, 'index', value) for value in looseIndexes))):
+				continue
+		filteredFileLines.append(line)
+	
 	return filteredFileLines
 
-def parseLines(fileLines):
+def parseLines(fileLines, binaryResultsPath=None):
 	jsonData = []
 	for line in fileLines:
 		try:
-			jsonData.append(parseLine(line))
+			jsonData.append(parseLine(line, binaryResultsPath=binaryResultsPath))
 		except Exception as e:
 			print('Error loading JSON line')
 			print(e)
-	return jsonData
+	return mergeChunkedRecords(jsonData)
 
-def parseLine(line, correctLengths=True):
+def parseLine(line, correctLengths=True, binaryResultsPath=None):
 	data = json.loads(str(line))
 	
-	if correctLengths and ('Results' in data):
+	# The lengths of a streamed record are only corrected once all of its chunks have been merged
+	if ('Results' in data):
+		parseResults(data['Results'], correctLengths=(correctLengths and not isChunkedRecordLine(data)), binaryResultsPath=binaryResultsPath)
+	
+	return data
+
+def parseResults(results, correctLengths=True, binaryResultsPath=None):
+	if (binaryResultsPath is not None) and isinstance(results, dict):
+		loadBinaryResults(binaryResultsPath, results)
+	
+	if correctLengths:
 		equalLengthNames = ['id_data', 'ig_data', 'vds_data', 'vgs_data', 'smu2_i1_data', 'smu2_i2_data', 'smu2_v1_data', 'smu2_v2_data', 'timestamps', 'timestamps_smu2']
-		lengths = [len(data['Results'][n]) for n in equalLengthNames if n in data['Results']]
+		lengths = [len(results[n]) for n in equalLengthNames if n in results]
 		
 		if len(lengths) > 0:
 			if max(lengths) - min(lengths) == 1:
 				print('Unequal Lengths, altering data length by 1! Beware!')
 				for n in equalLengthNames:
-					if n in data['Results']:
-						if len(data['Results'][n]) == min(lengths):
-							data['Results'][n].append(data['Results'][n][-1])
+					if n in results:
+						if len(results[n]) == min(lengths):
+							results[n].append(results[n][-1])
 	
-	return data
+	return results
+
+
+
+# === Lazy Loading ===
+"""A LazyRecord is a loaded line of a data file whose 'Results' are left on disk until they are needed. Listing and filtering large numbers of
+data entries only requires their parameters, so this avoids reading and decoding every measurement along the way."""
+
+def loadLazyRecordsAt(directory, loadFileName, lineIndexEntries):
+	"""Private method. Load the lines described by lineIndexEntries, reading only the parameters of lines whose 'Results' position is known."""
+	path = os.path.join(directory, loadFileName)
+	binaryResultsPath = getBinaryResultsPath(directory, loadFileName)
+	records = []
+	with open(path, 'rb') as file:
+		for entry in lineIndexEntries:
+			try:
+				file.seek(entry['offset'])
+				if(entry.get('resultsOffset') is None):
+					records.append(parseLine(file.read(entry['length']).decode('utf-8'), binaryResultsPath=binaryResultsPath))
+					continue
+				parametersText = file.read(entry['resultsOffset']).decode('utf-8')
+				parametersText = parametersText[:parametersText.rfind('"Results"')].rstrip().rstrip(',') + '}'
+				parameters = json.loads(parametersText)
+				if(isChunkedRecordLine(parameters)):
+					# The pieces of a streamed record have to be read in full to be put back together
+					file.seek(entry['offset'])
+					records.append(parseLine(file.read(entry['length']).decode('utf-8'), binaryResultsPath=binaryResultsPath))
+					continue
+				resultsSource = (path, entry['offset'] + entry['resultsOffset'], entry['resultsLength'], binaryResultsPath)
+				records.append(LazyRecord(parameters, resultsSource))
+			except Exception as e:
+				print('Error loading JSON line')
+				print(e)
+	return mergeChunkedRecords(records)
+
+class LazyRecord(dict):
+	"""Dictionary of a data entry's parameters that reads its 'Results' from the data file the first time they are accessed.
+	Anything that needs every key (iterating, items(), copy(), comparing, printing, etc.) also loads the 'Results' first.
+	Pickling produces an ordinary dictionary."""
+	
+	def __init__(self, parameters, resultsSource):
+		dict.__init__(self, parameters)
+		self._resultsSource = resultsSource
+	
+	def isLoaded(self):
+		return self._resultsSource is None
+	
+	def loadResults(self):
+		if(self._resultsSource is not None):
+			path, offset, length, binaryResultsPath = self._resultsSource
+			with open(path, 'rb') as file:
+				file.seek(offset)
+				results = json.loads(file.read(length).decode('utf-8'))
+			dict.__setitem__(self, 'Results', parseResults(results, binaryResultsPath=binaryResultsPath))
+			self._resultsSource = None
+		return self
+	
+	def __getitem__(self, key):
+		if(key == 'Results'):
+			self.loadResults()
+		return dict.__getitem__(self, key)
+	
+	def get(self, key, default=None):
+		if(key == 'Results'):
+			self.loadResults()
+		return dict.get(self, key, default)
+	
+	def __contains__(self, key):
+		return ((key == 'Results') and (self._resultsSource is not None)) or dict.__contains__(self, key)
+	
+	def __setitem__(self, key, value):
+		if(key == 'Results'):
+			self._resultsSource = None
+		dict.__setitem__(self, key, value)
+	
+	def __delitem__(self, key):
+		if((key == 'Results') and (self._resultsSource is not None)):
+			self._resultsSource = None
+			return
+		dict.__delitem__(self, key)
+	
+	def pop(self, key, *default):
+		if(key == 'Results'):
+			self.loadResults()
+		return dict.pop(self, key, *default)
+	
+	def setdefault(self, key, default=None):
+		if(key == 'Results'):
+			self.loadResults()
+		return dict.setdefault(self, key, default)
+	
+	def __iter__(self):
+		return dict.__iter__(self.loadResults())
+	
+	def __len__(self):
+		return dict.__len__(self.loadResults())
+	
+	def __eq__(self, other):
+		return dict.__eq__(self.loadResults(), other)
+	
+	def __ne__(self, other):
+		return dict.__ne__(self.loadResults(), other)
+	
+	def __repr__(self):
+		return dict.__repr__(self.loadResults())
+	
+	def __reduce__(self):
+		return (dict, (self.copy(),))
+	
+	def keys(self):
+		return dict.keys(self.loadResults())
+	
+	def values(self):
+		return dict.values(self.loadResults())
+	
+	def items(self):
+		return dict.items(self.loadResults())
+	
+	def copy(self):
+		return dict(dict.items(self.loadResults()))
+
+
+
+# === Streaming Records ===
+"""Long procedures can stream their 'Results' to disk a chunk at a time instead of holding every measurement in memory until the end.
+A streamed record is saved as several lines that all share the record's index and experimentNumber: one line per chunk (marked with
+'chunk': <number>, the first of which also holds the parameters known when the record was opened), followed by a final line with the
+complete parameters (marked with 'chunks': <number of chunks>). The loaders merge these lines back into a single entry whose 'Results'
+lists are the concatenation of every chunk, so a streamed record looks exactly like one saved all at once with saveJSON(). If a procedure
+never closes its record (e.g. the process dies) the chunks that were already written are still loaded, using the parameters of the first chunk."""
+
+JSON_RECORD_CHUNK_KEY = 'chunk'
+JSON_RECORD_CHUNK_COUNT_KEY = 'chunks'
+JSON_RECORD_FLUSH_INTERVAL = 30
+JSON_RECORD_MAX_BUFFERED_POINTS = 1000
+
+def openJSONRecord(directory, saveFileName, jsonData, subDirectory=None, flushInterval=JSON_RECORD_FLUSH_INTERVAL, maxBufferedPoints=JSON_RECORD_MAX_BUFFERED_POINTS):
+	"""Start streaming a data entry to saveFileName.json in directory (or directory + subDirectory), reserving its index right away.
+	jsonData holds the parameters of the entry, and its 'Results' (if any) lists the keys that will be streamed.
+	Returns a JSONRecordWriter: append() measurements to it while the procedure runs and close() it with the final parameters when done."""
+	return JSONRecordWriter(directory, saveFileName, jsonData, subDirectory=subDirectory, flushInterval=flushInterval, maxBufferedPoints=maxBufferedPoints)
+
+class JSONRecordWriter:
+	"""Buffers the 'Results' of one data entry and appends them to its data file as chunks, whenever maxBufferedPoints have been appended or
+	flushInterval seconds have passed, so at most one chunk of data is ever held in memory."""
+	def __init__(self, directory, saveFileName, jsonData, subDirectory=None, flushInterval=JSON_RECORD_FLUSH_INTERVAL, maxBufferedPoints=JSON_RECORD_MAX_BUFFERED_POINTS):
+		self.savePath = directory if(subDirectory is None) else os.path.join(directory, subDirectory)
+		self.saveFileName = saveFileName if('.json' in saveFileName) else (saveFileName + '.json')
+		self.flushInterval = flushInterval
+		self.maxBufferedPoints = maxBufferedPoints
+		makeFolder(self.savePath)
+		
+		indexData = reserveJSONIndex(directory)
+		self.header = {'index':indexData['index'], 'experimentNumber':indexData['experimentNumber']}
+		self.parameters = {key:value for key, value in jsonData.items() if(key != 'Results')}
+		self.resultKeys = list(jsonData.get('Results', {}).keys())
+		
+		self.results = OrderedDict()
+		self.bufferedPoints = 0
+		self.chunkLines = []
+		self.lastFlushTime = time.time()
+		self.closed = False
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exceptionType, exceptionValue, traceback):
+		self.close()
+	
+	def append(self, point):
+		"""Append one value to the 'Results' list of each key in the point dictionary."""
+		for key, value in point.items():
+			self.results.setdefault(key, []).append(value)
+		self.bufferedPoints += 1
+		self.flushIfDue()
+	
+	def extend(self, chunk):
+		"""Append every value in the lists of the chunk dictionary to the 'Results' list of the same key."""
+		for key, values in chunk.items():
+			self.results.setdefault(key, []).extend(values)
+		self.bufferedPoints += max([len(values) for values in chunk.values()] + [0])
+		self.flushIfDue()
+	
+	def flushIfDue(self):
+		if((self.bufferedPoints >= self.maxBufferedPoints) or (time.time() - self.lastFlushTime >= self.flushInterval)):
+			self.flush()
+	
+	def flush(self):
+		"""Write everything appended since the last flush to the data file as the next chunk."""
+		self.lastFlushTime = time.time()
+		if(self.closed or (len(self.results) == 0)):
+			return
+		
+		lineData = dict(self.parameters) if(len(self.chunkLines) == 0) else {}
+		lineData.update(self.header)
+		lineData['timestamp'] = time.time()
+		lineData[JSON_RECORD_CHUNK_KEY] = len(self.chunkLines)
+		lineData['Results'] = self.results
+		self.chunkLines.append(appendJSONLine(self.savePath, self.saveFileName, lineData))
+		
+		self.results = OrderedDict()
+		self.bufferedPoints = 0
+	
+	def iterateResults(self, key):
+		"""Yield every value appended to Results[key] so far, reading the chunks back from the data file one at a time."""
+		self.flush()
+		with open(os.path.join(self.savePath, self.saveFileName), 'rb') as file:
+			for offset, length in self.chunkLines:
+				file.seek(offset)
+				yield from json.loads(file.read(length).decode('utf-8'))['Results'].get(key, [])
+	
+	def close(self, jsonData=None):
+		"""Flush the remaining data and write the final line of the record. jsonData holds the final parameters (by default, the ones the record
+		was opened with) and any values in its 'Results' are added after the streamed ones. Like saveJSON(), this sets 'index',
+		'experimentNumber', and 'timestamp' in jsonData."""
+		if(self.closed):
+			return
+		self.flush()
+		
+		lineData = {key:value for key, value in (self.parameters if(jsonData is None) else jsonData).items() if(key != 'Results')}
+		lineData.update(self.header)
+		lineData['timestamp'] = time.time()
+		lineData[JSON_RECORD_CHUNK_COUNT_KEY] = len(self.chunkLines)
+		lineData['Results'] = OrderedDict((key, []) for key in self.resultKeys)
+		if(jsonData is not None):
+			lineData['Results'].update(jsonData.get('Results', {}))
+			jsonData.update(self.header)
+			jsonData['timestamp'] = lineData['timestamp']
+		appendJSONLine(self.savePath, self.saveFileName, lineData)
+		self.closed = True
+
+def isChunkedRecordLine(data):
+	"""Private method. True if data was loaded from one of the lines of a streamed record."""
+	return (JSON_RECORD_CHUNK_KEY in data) or (JSON_RECORD_CHUNK_COUNT_KEY in data)
+
+def mergeChunkedRecords(jsonData):
+	"""Private method. Combine the lines of each streamed record in jsonData (a list of loaded lines) into a single entry, kept at the position
+	of the record's first line. Lines that are not part of a streamed record are returned unchanged."""
+	if(not any(isChunkedRecordLine(data) for data in jsonData)):
+		return jsonData
+	
+	mergedData = []
+	records = {}
+	for data in jsonData:
+		if(not isChunkedRecordLine(data)):
+			mergedData.append(data)
+			continue
+		key = (data.get('index'), data.get('experimentNumber'))
+		if(key not in records):
+			records[key] = []
+			mergedData.append(records[key])
+		records[key].append(data)
+	return [(mergeChunkedRecord(data) if(isinstance(data, list)) else data) for data in mergedData]
+
+def mergeChunkedRecord(lines):
+	"""Private method. Build a single entry from the loaded lines of one streamed record."""
+	chunks = sorted([data for data in lines if(JSON_RECORD_CHUNK_KEY in data)], key=lambda data: data[JSON_RECORD_CHUNK_KEY])
+	finalLines = [data for data in lines if(JSON_RECORD_CHUNK_COUNT_KEY in data)]
+	
+	# The final line has the complete parameters, but the first chunk is the best there is for a record that was never closed
+	parameterLine = finalLines[-1] if(len(finalLines) > 0) else chunks[0]
+	record = {key:value for key, value in parameterLine.items() if(key not in ['Results', JSON_RECORD_CHUNK_KEY, JSON_RECORD_CHUNK_COUNT_KEY])}
+	
+	results = OrderedDict()
+	for data in chunks + finalLines[-1:]:
+		for key, value in data.get('Results', {}).items():
+			if(isinstance(value, list) and isinstance(results.get(key), list)):
+				results[key].extend(value)
+			else:
+				results[key] = value
+	record['Results'] = parseResults(dict(results))
+	return record
+
+def newStreamedStatistics():
+	"""Running statistics of a drain current that is streamed to disk rather than kept in memory (see updateStreamedStatistics())."""
+	return {'count':0, 'id_start':None, 'id_sum':0, 'id_max':float('-inf'), 'id_min':float('inf'), 'id_std_sum':0, 'first_timestamp':None, 'last_timestamp':None}
+
+def updateStreamedStatistics(statistics, id_data, id_std, timestamp):
+	if(statistics['count'] == 0):
+		statistics['id_start'] = id_data
+		statistics['first_timestamp'] = timestamp
+	statistics['count'] += 1
+	statistics['id_sum'] += id_data
+	statistics['id_max'] = max(statistics['id_max'], id_data)
+	statistics['id_min'] = min(statistics['id_min'], id_data)
+	statistics['id_std_sum'] += id_std
+	statistics['last_timestamp'] = timestamp
+
+def streamedSettlingTimeConstant(record, statistics):
+	"""Time for id_data to settle 1/e of the way from its first value to its mean, with id_data and timestamps read back from the streamed
+	record one chunk at a time."""
+	if(statistics['count'] == 0):
+		return 0
+	id_mean = statistics['id_sum']/statistics['count']
+	id_settled = (statistics['id_start'] - id_mean)*np.exp(-1) + id_mean
+	if(statistics['count'] > 2):
+		previous_id = None
+		for id_value, timestamp in zip(record.iterateResults('id_data'), record.iterateResults('timestamps')):
+			if((previous_id is not None) and (((previous_id <= id_settled) and (id_value >= id_settled)) or ((previous_id >= id_settled) and (id_value <= id_settled)))):
+				return (previous_timestamp - statistics['first_timestamp'])
+			previous_id, previous_timestamp = id_value, timestamp
+	return (statistics['last_timestamp'] - statistics['first_timestamp'])
+
+
+
+# === JSON Line Index ===
+"""Private methods that maintain a small '.idx' file next to each data file. The line index has one entry per line of the data file that
+records where the line starts, how long it is, and the properties used to look it up (index, experimentNumber, timestamp, runType).
+Loaders can then seek straight to the lines they need instead of reading and searching the entire data file."""
+
+JSON_LINE_INDEX_SUFFIX = '.idx'
+JSON_LINE_INDEX_PROPERTIES = ['index', 'experimentNumber', 'timestamp', 'runType']
+
+def getJSONLineIndexPath(directory, fileName):
+	if '.json' not in fileName:
+		fileName += '.json'
+	return os.path.join(directory, fileName + JSON_LINE_INDEX_SUFFIX)
+
+def jsonLineIndexEntry(jsonData, offset, length):
+	entry = {'offset':offset, 'length':length}
+	for property in JSON_LINE_INDEX_PROPERTIES:
+		entry[property] = jsonData.get(property)
+	return entry
+
+def jsonLineIndexEntryFromLine(line, offset):
+	"""Build a line index entry for a raw (bytes) line without parsing all of its data. Lines written by older versions have no header,
+	but their top-level properties are saved after the nested ones (e.g. 'startIndexes'), so the last occurrence of each property name is
+	the one that belongs to this line."""
+	entry = {'offset':offset, 'length':len(line)}
+	header = LINE_HEADER_PATTERN.match(line[:256].decode('utf-8', 'ignore'))
+	for property in JSON_LINE_INDEX_PROPERTIES:
+		entry[property] = None
+		if(header and (property in LINE_HEADER_PROPERTIES) and (header.group(property) is not None)):
+			entry[property] = json.loads(header.group(property))
+			continue
+		key = b'"' + property.encode('utf-8') + b'": '
+		start = line.find(key) if(property == 'runType') else line.rfind(key)
+		if(start >= 0):
+			match = re.match(rb'"[^"]*"|[^,}]*', line[start + len(key):])
+			try:
+				entry[property] = json.loads(match.group(0).decode('utf-8'))
+			except ValueError:
+				pass
+	return entry
+
+def appendJSONLineIndexEntry(directory, fileName, entry, isNewFile=False):
+	"""Add an entry to the line index of a data file. Line indexes are only started alongside new data files, since appending to a
+	data file that was never indexed would leave gaps. Those files can be indexed explicitly with buildJSONLineIndex instead."""
+	indexPath = getJSONLineIndexPath(directory, fileName)
+	if(not isNewFile and not os.path.exists(indexPath)):
+		return
+	try:
+		with open(indexPath, 'w' if(isNewFile) else 'a') as file:
+			json.dump(entry, file)
+			file.write('\n')
+	except OSError as e:
+		print('Unable to update line index: "' + indexPath + '"')
+
+def saveJSONLineIndex(directory, fileName, lineIndex):
+	"""Overwrite the line index of a data file. The index is written to a temporary file first so that readers never see half of it."""
+	indexPath = getJSONLineIndexPath(directory, fileName)
+	temporaryPath = indexPath + '.tmp' + str(os.getpid())
+	try:
+		with open(temporaryPath, 'w') as file:
+			for entry in lineIndex:
+				json.dump(entry, file)
+				file.write('\n')
+		os.replace(temporaryPath, indexPath)
+	except OSError as e:
+		print('Unable to save line index: "' + indexPath + '"')
+
+def buildJSONLineIndex(directory, fileName):
+	"""Read every line of a data file and save a line index for it. Returns the new line index, or None if the last line of the file is
+	unfinished (e.g. it is still being written)."""
+	lineIndex = []
+	offset = 0
+	with open(os.path.join(directory, fileName), 'rb') as file:
+		for line in file:
+			if(not line.endswith(b'\n')):
+				return None
+			lineIndex.append(jsonLineIndexEntryFromLine(line, offset))
+			offset += len(line)
+	saveJSONLineIndex(directory, fileName, lineIndex)
+	return lineIndex
+
+def loadJSONLineIndex(directory, fileName):
+	"""Load the line index of a data file. Returns None if there is no line index, or if it does not exactly describe the data file
+	(e.g. it is missing lines that were appended by an older version of this software)."""
+	indexPath = getJSONLineIndexPath(directory, fileName)
+	try:
+		dataFileSize = os.path.getsize(os.path.join(directory, fileName))
+		with open(indexPath, 'r') as file:
+			lineIndex = [json.loads(line) for line in file]
+	except (OSError, ValueError):
+		return None
+	
+	# Every line of the data file must be accounted for, in order
+	offset = 0
+	for entry in lineIndex:
+		if(entry['offset'] != offset):
+			return None
+		offset += entry['length']
+	if(offset != dataFileSize):
+		return None
+	
+	return lineIndex
+
+def removeJSONLineIndex(directory, fileName):
+	indexPath = getJSONLineIndexPath(directory, fileName)
+	if(os.path.exists(indexPath)):
+		os.remove(indexPath)
+
+def filterJSONLineIndex(directory, lineIndex, minIndex=0, maxIndex=float('inf'), minExperiment=0, maxExperiment=float('inf'), minRelativeIndex=0, maxRelativeIndex=float('inf')):
+	"""Equivalent of filterStringArrayByIndexAndExperiment() for line index entries."""
+	isBetween = lambda value, minimum, maximum: (value is not None) and (value >= minimum) and (value <= maximum)
+	
+	filteredEntries = lineIndex
+	if((minExperiment == maxExperiment) or (minExperiment > 0) or (maxExperiment < float('inf'))):
+		filteredEntries = [entry for entry in filteredEntries if isBetween(entry['experimentNumber'], minExperiment, maxExperiment)]
+	if((minIndex == maxIndex) or (minIndex > 0) or (maxIndex < float('inf'))):
+		filteredEntries = [entry for entry in filteredEntries if isBetween(entry['index'], minIndex, maxIndex)]
+	if(minRelativeIndex > 0 or maxRelativeIndex < 1e10):
+		experimentBaseIndex = min(getIndexesForExperiments(os.path.join(directory, '../'), minExperiment, maxExperiment))
+		filteredEntries = [entry for entry in filteredEntries if isBetween(entry['index'], experimentBaseIndex + minRelativeIndex, experimentBaseIndex + maxRelativeIndex)]
+	
+	return filteredEntries
+
+
+
+# === Binary Results ===
+"""Private methods that store the numeric arrays of 'Results' as raw binary blocks in a '.bin' file next to each data file. The JSON line
+keeps a small reference in place of each array, e.g. {"id_data": {"__binary__": {"offset": 0, "shape": [10000], "dtype": "<f8"}}}, and
+the loaders swap the arrays back in (as lists) so that the loaded data is identical to data saved entirely as JSON. Appends to a '.bin' file
+are guarded by the device folder's index lock, since other processes may be saving to the same data file."""
+
+BINARY_RESULTS_SUFFIX = '.bin'
+BINARY_RESULTS_KEY = '__binary__'
+
+binaryResultsLock = threading.Lock()
+
+def getBinaryResultsPath(directory, fileName):
+	if '.json' not in fileName:
+		fileName += '.json'
+	return os.path.join(directory, fileName + BINARY_RESULTS_SUFFIX)
+
+def saveBinaryResults(directory, fileName, results, lockDirectory=None):
+	"""Append every numeric array in results to the binary results file. Returns a copy of results with those arrays replaced by references.
+	A list of numeric rows with different lengths (e.g. one per sweep direction) is stored as one reference per row, and anything else that
+	is not numeric is left to be saved as JSON. lockDirectory is the device folder whose index lock is held while appending (by default, directory)."""
+	referencedResults = dict(results)
+	with binaryResultsLock, JSONIndexFileLock((lockDirectory) if(lockDirectory is not None) else (directory)):
+		with open(getBinaryResultsPath(directory, fileName), 'ab') as file:
+			offset = file.seek(0, os.SEEK_END)
+			for key, value in results.items():
+				if(not isinstance(value, (list, tuple, np.ndarray))):
+					continue
+				array = binaryResultsArray(value)
+				rows = None if(array is not None) else [binaryResultsArray(row) if(isinstance(row, (list, tuple, np.ndarray))) else None for row in value]
+				if((array is None) and ((len(rows) == 0) or any(row is None for row in rows))):
+					continue
+				
+				references = []
+				for array in ([array] if(array is not None) else rows):
+					array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+					file.write(array.tobytes())
+					references.append({'offset':offset, 'shape':list(array.shape), 'dtype':array.dtype.str})
+					offset += array.nbytes
+				referencedResults[key] = {BINARY_RESULTS_KEY: (references[0] if(rows is None) else {'rows':references})}
+	return referencedResults
+
+def binaryResultsArray(value):
+	"""Private method. value as a non-empty numeric numpy array, or None if it is not one (e.g. rows of different lengths)."""
+	try:
+		array = np.asarray(value)
+	except ValueError:
+		return None # numpy 1.24 and later refuse to make an array of rows with different lengths
+	if((array.dtype.kind not in 'biuf') or (array.size == 0)):
+		return None
+	return array
+
+def loadBinaryResults(binaryResultsPath, results):
+	"""Replace any references in results with the lists they refer to in the binary results file (the file is closed again afterwards).
+	Results that were saved as rows of different lengths are replaced by a list of rows."""
+	references = [key for key, value in results.items() if(isinstance(value, dict) and (BINARY_RESULTS_KEY in value))]
+	if(len(references) == 0):
+		return
+	with open(binaryResultsPath, 'rb') as file:
+		for key in references:
+			reference = results[key][BINARY_RESULTS_KEY]
+			if('rows' in reference):
+				results[key] = [readBinaryResultsArray(file, row) for row in reference['rows']]
+			else:
+				results[key] = readBinaryResultsArray(file, reference)
+
+def readBinaryResultsArray(file, reference):
+	"""Private method. Read the array described by reference from the open binary results file, as a (nested) list."""
+	dtype = np.dtype(reference['dtype'])
+	shape = tuple(reference['shape'])
+	file.seek(reference['offset'])
+	return np.frombuffer(file.read(dtype.itemsize*int(np.prod(shape))), dtype=dtype).reshape(shape).tolist()
+
+def removeBinaryResults(directory, fileName):
+	binaryResultsPath = getBinaryResultsPath(directory, fileName)
+	if(os.path.exists(binaryResultsPath)):
+		os.remove(binaryResultsPath)
 
 
 
@@ -560,42 +1900,27 @@ def filterHistoryLessThan(deviceHistory, property, threshold):
 	return filteredHistory
 
 def filterFileLines(fileLines, property, value, looseFiltering=False):
+	"""Keep the lines whose top-level property equals value. Loose filtering also keeps lines where value appears as any nested copy of it."""
 	filteredFileLines = []
 	for line in fileLines:
-		if(looseFiltering):
-			matches = re.findall(' "' + str(property) + '": ([^,}]*)' , line)
-			if(str(value) in matches):
-				filteredFileLines.append(line)
-		else:
-			match = re.search(' "' + str(property) + '": ([^,}]*)' , line)
-			if(match and (match.group(1) == str(value))):
-				filteredFileLines.append(line)
+		if((getFileLineValue(line, property) == value) or (looseFiltering and fileLineHasLooseValue(line, property, value))):
+			filteredFileLines.append(line)
 	return filteredFileLines
 
 def filterFileLinesGreaterThan(fileLines, property, value, looseFiltering=False):
 	filteredFileLines = []
 	for line in fileLines:
-		if(looseFiltering):
-			matches = re.findall(' "' + str(property) + '": ([^,}]*)' , line)
-			if(str(value) in matches):
-				filteredFileLines.append(line)
-		else:
-			match = re.search(' "' + str(property) + '": ([^,}]*)' , line)
-			if(match and (float(match.group(1)) >= value)):
-				filteredFileLines.append(line)
+		lineValue = getFileLineValue(line, property)
+		if(((lineValue is not None) and (lineValue >= value)) or (looseFiltering and fileLineHasLooseValue(line, property, value))):
+			filteredFileLines.append(line)
 	return filteredFileLines
 
 def filterFileLinesLessThan(fileLines, property, value, looseFiltering=False):
 	filteredFileLines = []
 	for line in fileLines:
-		if(looseFiltering):
-			matches = re.findall(' "' + str(property) + '": ([^,}]*)' , line)
-			if(str(value) in matches):
-				filteredFileLines.append(line)
-		else:
-			match = re.search(' "' + str(property) + '": ([^,}]*)' , line)
-			if(match and (float(match.group(1)) <= value)):
-				filteredFileLines.append(line)
+		lineValue = getFileLineValue(line, property)
+		if(((lineValue is not None) and (lineValue <= value)) or (looseFiltering and fileLineHasLooseValue(line, property, value))):
+			filteredFileLines.append(line)
 	return filteredFileLines
 
 
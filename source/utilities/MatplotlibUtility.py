@@ -472,7 +472,7 @@ def adjustAndSaveFigure(figure, plotType, mode_parameters, subplotWidthPad=0, su
 		print('[MPL]: Saving figures.')
 		start = time.time()
 		if isinstance(mode_parameters['plotSaveName'], io.BytesIO):
-			plt.savefig(mode_parameters['plotSaveName'], transparent=True, dpi=pngDPI, format='png')
+			plt.savefig(mode_parameters['plotSaveName'], transparent=True, dpi=pngDPI, format=mode_parameters['plotSaveExtension'].lstrip('.'))
 		else:
 			plt.savefig(os.path.join(mode_parameters['plotSaveFolder'], mode_parameters['plotSaveName'] + plotType + mode_parameters['plotSaveExtension']), transparent=True, dpi=pngDPI)
 		end = time.time()
@@ -0,0 +1,175 @@
+"""This module keeps rendered plots (PNG or SVG files) on disk so that a plot of data that has not changed is only drawn once. Each plot is
+saved under a key made from the plot type, the identifiers of the device or chip, the plot settings (which include the experiment range),
+and the size and modification time of every data file the plot could have loaded, so saving new data for a device never shows a stale plot.
+Once the cache grows past its size limit, the least recently used plots are deleted. The key doubles as the ETag sent to the browser."""
+
+# === Imports ===
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+
+
+# === Constants ===
+PLOT_CACHE_VERSION = 1
+PLOT_CACHE_FOLDER = os.path.join(tempfile.gettempdir(), 'AutexysPlotCache')
+PLOT_CACHE_MAX_BYTES = 256*1024*1024
+PLOT_CACHE_FORMATS = {'png':'image/png', 'svg':'image/svg+xml'}
+
+# Device plots fall back on the data of the devices listed in this file (see Device_History.py), so those data files are part of the key too
+PLOT_CACHE_LINKING_FILE = 'DeviceCycling.json'
+
+# Settings that only control where or how a plot is delivered, not what it looks like ('dataFolder' is part of the key as an absolute path)
+PLOT_CACHE_IGNORED_SETTINGS = ['plotSaveName', 'dataFolder', 'saveFolder', 'saveFigures', 'showFigures', 'useCache', 'loadingWorkers', 'loadWithProcesses']
+
+
+
+# === External API ===
+class PlotCache:
+	"""Folder of rendered plots named by their key, limited to maxBytes. The modification time of each file is when it was rendered (used
+	for Last-Modified) and its access time is when it was last served (used to choose which plots to evict)."""
+	def __init__(self, cacheFolder=PLOT_CACHE_FOLDER, maxBytes=PLOT_CACHE_MAX_BYTES):
+		self.cacheFolder = cacheFolder
+		self.maxBytes = maxBytes
+		self.lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def key(self, plotType, identifiers, plotSettings, dataFolder, format='png'):
+		"""The key of a plot of the device (or chip, if identifiers has no 'device') in dataFolder, made with the given plotSettings."""
+		deviceDirectories = plotDeviceDirectories(dataFolder, identifiers)
+		minExperiment = plotSettings.get('minExperiment', 0)
+		maxExperiment = plotSettings.get('maxExperiment', float('inf'))
+		keyData = {
+			'version': PLOT_CACHE_VERSION,
+			'plotType': plotType,
+			'identifiers': identifiers,
+			'format': format,
+			'dataFolder': os.path.abspath(dataFolder),
+			'plotSettings': normalizedPlotSettings(plotSettings),
+			'fingerprint': dataFilesFingerprint(dataFolder, identifiers, deviceDirectories, minExperiment, maxExperiment),
+		}
+		return hashlib.sha1(json.dumps(keyData, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+	def path(self, key, format='png'):
+		return os.path.join(self.cacheFolder, key + '.' + format)
+
+	def get(self, key, format='png'):
+		"""Path of the cached plot with this key, or None if it has not been rendered (or was evicted)."""
+		path = self.path(key, format)
+		try:
+			os.utime(path, (time.time(), os.path.getmtime(path)))
+		except OSError:
+			with self.lock:
+				self.misses += 1
+			return None
+		with self.lock:
+			self.hits += 1
+		return path
+
+	def put(self, key, data, format='png'):
+		"""Save the rendered bytes of a plot under key, evict old plots if the cache is too big, and return the path of the saved plot."""
+		if(not os.path.exists(self.cacheFolder)):
+			os.makedirs(self.cacheFolder, exist_ok=True)
+
+		# Write to a temporary file first so that other threads (or processes) never serve a partially written plot
+		fileDescriptor, temporaryPath = tempfile.mkstemp(dir=self.cacheFolder, prefix='.rendering')
+		with os.fdopen(fileDescriptor, 'wb') as file:
+			file.write(data)
+		os.replace(temporaryPath, self.path(key, format))
+		self.evict()
+		return self.path(key, format)
+
+	def evict(self):
+		"""Delete the least recently served plots until the cache is no larger than maxBytes."""
+		cachedFiles = []
+		for entry in os.scandir(self.cacheFolder):
+			try:
+				if(entry.is_file() and not entry.name.startswith('.')):
+					fileStatus = entry.stat()
+					cachedFiles.append((fileStatus.st_atime, fileStatus.st_size, entry.path))
+			except OSError:
+				pass
+
+		totalBytes = sum(size for accessTime, size, path in cachedFiles)
+		for accessTime, size, path in sorted(cachedFiles):
+			if(totalBytes <= self.maxBytes):
+				break
+			try:
+				os.remove(path)
+				totalBytes -= size
+				with self.lock:
+					self.evictions += 1
+			except OSError:
+				pass
+
+	def clear(self):
+		for path in glob.glob(os.path.join(self.cacheFolder, '*')):
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+
+	def stats(self):
+		cachedSizes = [os.path.getsize(path) for path in glob.glob(os.path.join(self.cacheFolder, '*'))]
+		with self.lock:
+			requests = self.hits + self.misses
+			return {'folder':self.cacheFolder, 'entries':len(cachedSizes), 'bytes':sum(cachedSizes), 'maxBytes':self.maxBytes, 'hits':self.hits, 'misses':self.misses, 'evictions':self.evictions, 'hitRate':(self.hits/requests if(requests > 0) else 0)}
+
+def mimetype(format):
+	return PLOT_CACHE_FORMATS[format]
+
+
+
+# === Internal ===
+def normalizedPlotSettings(plotSettings):
+	"""Private method. The plot settings that change what a plot looks like, with any that do not removed."""
+	return {key:value for key, value in plotSettings.items() if(key not in PLOT_CACHE_IGNORED_SETTINGS)}
+
+def plotDeviceDirectories(dataFolder, identifiers):
+	"""Private method. The folder of the device in identifiers, or of every device on the chip if identifiers has no 'device'."""
+	chipDirectory = os.path.join(dataFolder, identifiers['user'], identifiers['project'], identifiers['wafer'], identifiers['chip'])
+	if('device' in identifiers):
+		return [os.path.join(chipDirectory, identifiers['device'])]
+	return sorted(glob.glob(os.path.join(chipDirectory, '*', '')))
+
+def dataFilesFingerprint(dataFolder, identifiers, deviceDirectories, minExperiment, maxExperiment):
+	"""Private method. Get the size and modification time of wafer.json and of every data file in the experiments between minExperiment
+	and maxExperiment, including the experiments of other devices that a linking file in them points to. When the range is open-ended
+	index.json is included as well, since a new experiment changes which ones are plotted."""
+	paths = [os.path.join(dataFolder, identifiers['user'], identifiers['project'], identifiers['wafer'], 'wafer.json')]
+	for deviceDirectory in deviceDirectories:
+		if(maxExperiment == float('inf')):
+			paths.append(os.path.join(deviceDirectory, 'index.json'))
+		for experimentDirectory in glob.glob(os.path.join(deviceDirectory, 'Ex*')):
+			match = re.match(r'Ex(\d+)$', os.path.basename(experimentDirectory))
+			if(match and (minExperiment <= int(match.group(1)) <= maxExperiment)):
+				paths.extend(glob.glob(os.path.join(experimentDirectory, '*.json')))
+				paths.extend(linkedDataFiles(os.path.dirname(os.path.normpath(deviceDirectory)), os.path.join(experimentDirectory, PLOT_CACHE_LINKING_FILE)))
+
+	fingerprint = []
+	for path in paths:
+		try:
+			fileStatus = os.stat(path)
+			fingerprint.append((os.path.relpath(path, dataFolder), fileStatus.st_size, fileStatus.st_mtime_ns))
+		except OSError:
+			pass
+	return sorted(fingerprint)
+
+def linkedDataFiles(chipDirectory, linkingFilePath):
+	"""Private method. Every data file in the experiments of other devices on the chip that the linking file at linkingFilePath points to."""
+	paths = []
+	try:
+		with open(linkingFilePath) as file:
+			for line in file:
+				for device, deviceIndex in json.loads(line).get('DeviceCycling', {}).get('deviceIndexes', {}).items():
+					paths.extend(glob.glob(os.path.join(chipDirectory, device, 'Ex' + str(deviceIndex['experimentNumber']), '*.json')))
+	except (OSError, ValueError, KeyError, AttributeError):
+		pass
+	return paths
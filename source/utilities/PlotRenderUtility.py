@@ -0,0 +1,362 @@
+"""This module renders plots in a pool of separate worker processes, so that a slow plot never holds up the process that asked for it
+(e.g. the UI, which also forwards live data from the dispatcher). Jobs wait in a queue of limited length until a worker is free. A job
+that takes longer than its timeout, or is cancelled, has its worker process terminated and replaced, since a plot cannot be interrupted
+partway through. Every job can be given a group (such as the page of the UI that requested it) so that whole groups can be cancelled.
+Each worker keeps its own cache of loaded device histories, so the plots of a device are sent to the worker that last rendered that
+device whenever it is free soon enough."""
+
+# === Imports ===
+import collections
+import copy
+import io
+import multiprocessing as mp
+import multiprocessing.connection
+import os
+import threading
+import time
+
+
+
+# === Constants ===
+PLOT_RENDER_PROCESSES = max(1, min(4, (os.cpu_count() or 2)//2))
+PLOT_RENDER_MAX_PENDING_JOBS = 64
+PLOT_RENDER_TIMEOUT = 120
+PLOT_RENDER_POLL_INTERVAL = 0.05
+PLOT_RENDER_AFFINITY_WAIT = 2
+
+PLOT_PRERENDER_COUNT = 6
+
+# Workers are always spawned (never forked) so they do not inherit the threads and open sockets of the process that renders with them
+PLOT_RENDER_CONTEXT = mp.get_context('spawn')
+
+
+
+# === Defaults ===
+default_makePlot_parameters = {
+	'minExperiment': None,
+	'maxExperiment': None,
+	'minRelativeIndex': 0,
+	'maxRelativeIndex': float('inf'),
+	'specificPlot': '',
+	'plotSaveName': '',
+	'dataFolder': None,
+	'saveFolder': None,
+	'saveFigures': False,
+	'showFigures': True,
+	'plot_mode_parameters': None
+}
+
+# The plot settings sent by the UI when none of them have been changed from their defaults
+default_received_plot_settings = {'primary':{}, 'mode_parameters':{}, 'chip':{}, 'device':{}}
+
+
+
+# === External API ===
+class PlotRenderJob:
+	"""A plot waiting to be rendered. Once done() is True, 'status' is one of 'complete', 'failed', 'timeout', 'cancelled', or
+	'rejected' and, if it is 'complete', 'data' holds the bytes of the rendered plot."""
+	def __init__(self, plotType, identifiers, plotSettings, group=None, timeout=PLOT_RENDER_TIMEOUT):
+		self.plotType = plotType
+		self.identifiers = identifiers
+		self.plotSettings = plotSettings
+		self.group = group
+		self.timeout = timeout
+		self.deviceKey = tuple(sorted(identifiers.items()))
+		self.status = 'pending'
+		self.data = None
+		self.error = None
+		self.submitTime = time.time()
+		self.startTime = None
+		self.finished = threading.Event()
+
+	def done(self):
+		return self.finished.is_set()
+
+	def wait(self, timeout=None):
+		"""Block until the job is done (or timeout seconds pass). Returns done()."""
+		return self.finished.wait(timeout)
+
+	def finish(self, status, data=None, error=None):
+		self.status = status
+		self.data = data
+		self.error = error
+		self.finished.set()
+
+class PlotRenderPool:
+	"""Renders PlotRenderJobs with the given number of worker processes. The workers are started by start(), or by the first submit()."""
+	def __init__(self, processes=PLOT_RENDER_PROCESSES, maxPendingJobs=PLOT_RENDER_MAX_PENDING_JOBS, timeout=PLOT_RENDER_TIMEOUT, renderFunction=None):
+		self.processes = processes
+		self.maxPendingJobs = maxPendingJobs
+		self.timeout = timeout
+		self.renderFunction = (renderFunction) if(renderFunction is not None) else (renderPlot)
+		self.pendingJobs = collections.deque()
+		self.workers = []
+		self.lock = threading.Lock()
+		self.deviceWorkers = {}
+		self.schedulingThread = None
+		self.running = False
+		self.counts = {'complete':0, 'failed':0, 'timeout':0, 'cancelled':0, 'rejected':0}
+
+	def submit(self, plotType, identifiers, plotSettings, group=None, timeout=None):
+		"""Queue a plot of the device (or chip, if identifiers has no 'device') to be rendered and return its PlotRenderJob. The job is
+		'rejected' straight away if the queue is full."""
+		self.start()
+		job = PlotRenderJob(plotType, identifiers, plotSettings, group=group, timeout=(timeout) if(timeout is not None) else (self.timeout))
+		with self.lock:
+			if(len(self.pendingJobs) >= self.maxPendingJobs):
+				self.finishJob(job, 'rejected', error='Too many plots are already waiting to be rendered.')
+			else:
+				self.pendingJobs.append(job)
+		return job
+
+	def cancel(self, job):
+		"""Cancel a job, terminating its worker if it is already being rendered."""
+		with self.lock:
+			if(job in self.pendingJobs):
+				self.pendingJobs.remove(job)
+				self.finishJob(job, 'cancelled')
+			elif(not job.done()):
+				job.status = 'cancelling'
+
+	def cancelGroups(self, keepGroup=None):
+		"""Cancel every job that is not in keepGroup (e.g. the plots of pages that the UI has since left)."""
+		with self.lock:
+			jobs = list(self.pendingJobs) + [worker.job for worker in self.workers if(worker.job is not None)]
+		for job in jobs:
+			if(job.group != keepGroup):
+				self.cancel(job)
+
+	def start(self):
+		with self.lock:
+			if(self.running):
+				return
+			self.running = True
+			self.workers = [PlotRenderWorker(self.renderFunction) for i in range(self.processes)]
+		self.schedulingThread = threading.Thread(target=self.schedule, daemon=True)
+		self.schedulingThread.start()
+
+	def stop(self):
+		"""Stop every worker, cancelling any jobs that are still waiting or being rendered."""
+		with self.lock:
+			self.running = False
+			for job in self.pendingJobs:
+				self.finishJob(job, 'cancelled')
+			self.pendingJobs.clear()
+			for worker in self.workers:
+				if(worker.job is not None):
+					self.finishJob(worker.job, 'cancelled')
+				worker.stop()
+			self.workers = []
+
+	def stats(self):
+		with self.lock:
+			return dict(self.counts, workers=len(self.workers), busy=len([worker for worker in self.workers if(worker.job is not None)]), pending=len(self.pendingJobs), maxPendingJobs=self.maxPendingJobs)
+
+	def deviceHistoryCacheStats(self):
+		"""The device history cache statistics of every current worker added together (as of the last plot each of them rendered)."""
+		with self.lock:
+			workerStats = [worker.deviceHistoryCacheStats for worker in self.workers if(worker.deviceHistoryCacheStats is not None)]
+		totals = {key:sum(stats[key] for stats in workerStats) for key in ['entries', 'bytes', 'maxBytes', 'hits', 'misses', 'evictions']}
+		requests = totals['hits'] + totals['misses']
+		return dict(totals, workers=len(workerStats), hitRate=(totals['hits']/requests if(requests > 0) else 0))
+
+	# === Internal ===
+	def finishJob(self, job, status, data=None, error=None):
+		self.counts[status] += 1
+		job.finish(status, data=data, error=error)
+
+	def schedule(self):
+		"""Runs in its own thread: collect finished plots, stop workers whose job timed out or was cancelled, and hand out waiting jobs."""
+		while(self.running):
+			with self.lock:
+				busyConnections = [worker.connection for worker in self.workers if(worker.job is not None)]
+			if(len(busyConnections) > 0):
+				multiprocessing.connection.wait(busyConnections, timeout=PLOT_RENDER_POLL_INTERVAL)
+			else:
+				time.sleep(PLOT_RENDER_POLL_INTERVAL)
+
+			with self.lock:
+				if(not self.running):
+					return
+				for i, worker in enumerate(self.workers):
+					if(worker.job is None):
+						continue
+					job = worker.job
+					try:
+						if(worker.connection.poll()):
+							result = worker.connection.recv()
+							worker.job = None
+							worker.deviceHistoryCacheStats = result.get('deviceHistoryCache', worker.deviceHistoryCacheStats)
+							if('error' in result):
+								self.finishJob(job, 'failed', error=result['error'])
+							else:
+								self.finishJob(job, 'complete', data=result['data'])
+							continue
+					except (EOFError, OSError):
+						pass
+
+					if(job.status == 'cancelling'):
+						self.finishJob(job, 'cancelled')
+					elif(time.time() - job.startTime > job.timeout):
+						self.finishJob(job, 'timeout', error='Rendering took longer than {:} seconds.'.format(job.timeout))
+					elif(not worker.process.is_alive()):
+						self.finishJob(job, 'failed', error='The plot rendering process exited unexpectedly.')
+					else:
+						continue
+					worker.stop()
+					self.workers[i] = PlotRenderWorker(self.renderFunction)
+					self.deviceWorkers = {key:owner for key, owner in self.deviceWorkers.items() if(owner is not worker)}
+
+				for worker in self.workers:
+					job = self.nextJobFor(worker) if(worker.job is None) else None
+					if(job is not None):
+						self.pendingJobs.remove(job)
+						self.deviceWorkers[job.deviceKey] = worker
+						job.status = 'rendering'
+						job.startTime = time.time()
+						worker.job = job
+						worker.connection.send({'plotType':job.plotType, 'identifiers':job.identifiers, 'plotSettings':job.plotSettings})
+
+	def nextJobFor(self, worker):
+		"""Private method. The oldest waiting job of a device that worker rendered last, otherwise the oldest one of a device that no other
+		worker has rendered or that has already waited PLOT_RENDER_AFFINITY_WAIT seconds for its worker. Must be called with the lock held."""
+		otherJob = None
+		for job in self.pendingJobs:
+			owner = self.deviceWorkers.get(job.deviceKey)
+			if(owner is worker):
+				return job
+			if((otherJob is None) and ((owner is None) or (time.time() - job.submitTime > PLOT_RENDER_AFFINITY_WAIT))):
+				otherJob = job
+		return otherJob
+
+class PlotRenderWorker:
+	"""Private class. One worker process and the connection used to send it jobs and receive the rendered plots."""
+	def __init__(self, renderFunction):
+		self.connection, workerConnection = PLOT_RENDER_CONTEXT.Pipe()
+		self.process = PLOT_RENDER_CONTEXT.Process(target=runPlotRenderWorker, args=(workerConnection, renderFunction))
+		self.process.start()
+		workerConnection.close()
+		self.job = None
+		self.deviceHistoryCacheStats = None
+
+	def stop(self):
+		self.connection.close()
+		if(self.process.is_alive()):
+			self.process.terminate()
+		self.process.join()
+
+def renderPlot(plotType, identifiers, plotSettings):
+	"""Render a plot of the device (or chip, if identifiers has no 'device') with DeviceHistory/ChipHistory.makePlots() and return its bytes."""
+	filebuf = io.BytesIO()
+	plotSettings = dict(plotSettings, plotSaveName=filebuf, specificPlot=plotType, saveFigures=True, showFigures=False)
+	if('device' in identifiers):
+		from procedures import Device_History as DH
+		DH.dpu.mplu.plt.switch_backend('agg')
+		DH.makePlots(identifiers['user'], identifiers['project'], identifiers['wafer'], identifiers['chip'], identifiers['device'], **plotSettings)
+	else:
+		from procedures import Chip_History as CH
+		CH.dpu.mplu.plt.switch_backend('agg')
+		CH.makePlots(identifiers['user'], identifiers['project'], identifiers['wafer'], identifiers['chip'], **plotSettings)
+	return filebuf.getvalue()
+
+def makePlotSettings(plotType, receivedPlotSettings, dataFolder, minExperiment, maxExperiment, includeChipSummarySettings=False, includeDeviceSummarySettings=False, format='png'):
+	"""Get the arguments for a DeviceHistory/ChipHistory.makePlots() call that makes the plot requested by the UI, given the plot settings
+	it sent (changes to the default 'primary' settings, 'mode_parameters', and 'chip' and 'device' summary settings)."""
+	# === Setup ===
+	# Get default plot settings, plus any modifications specified by the UI
+	plotSettings = copy.deepcopy(default_makePlot_parameters)
+	
+	# Make nicknames for any plot setting modifications specified by the UI
+	primaryPlotSettings = receivedPlotSettings['primary']
+	modePlotSettings = receivedPlotSettings['mode_parameters']
+	chipSummarySettings = receivedPlotSettings['chip']
+	deviceSummarySettings = receivedPlotSettings['device']
+	
+	# === Update Settings ===
+	# Update dynamic arguments to DeviceHistory.makePlots() call
+	for dynamicArgument in primaryPlotSettings.keys():
+		plotSettings[dynamicArgument] = primaryPlotSettings[dynamicArgument]
+	if(includeChipSummarySettings):
+		for dynamicArgument in chipSummarySettings.keys():
+			plotSettings[dynamicArgument] = chipSummarySettings[dynamicArgument]
+	if(includeDeviceSummarySettings):
+		for dynamicArgument in deviceSummarySettings.keys():
+			plotSettings[dynamicArgument] = deviceSummarySettings[dynamicArgument]
+	
+	# Set all fixed arguments to DeviceHistory.makePlots() call
+	if plotSettings['minExperiment'] == None:
+		plotSettings['minExperiment'] = minExperiment
+	if plotSettings['maxExperiment'] == None:
+		plotSettings['maxExperiment'] = maxExperiment
+	plotSettings['dataFolder'] = dataFolder
+	plotSettings['saveFolder'] = None
+	plotSettings['saveFigures'] = True
+	plotSettings['showFigures'] = False
+	plotSettings['specificPlot'] = plotType
+	
+	# Set mode parameters for DeviceHistory.makePlots() call
+	if(plotSettings['plot_mode_parameters'] is None):
+		plotSettings['plot_mode_parameters'] = {}
+	for dynamicModeParameter in modePlotSettings.keys():
+		plotSettings['plot_mode_parameters'][dynamicModeParameter] = modePlotSettings[dynamicModeParameter]
+	plotSettings['plot_mode_parameters']['plotSaveExtension'] = '.' + format
+	
+	#afmPath = json.loads(flask.request.args.get('afmPath'))
+	# mode parameter 'AFMImagePath'
+	#if(plotType == 'AFMdeviationsImage'):
+	#	if(plotSettings['plot_mode_parameters'] == None):
+	#		plotSettings['plot_mode_parameters'] = {}
+	#	plotSettings['plot_mode_parameters']['afm_image_path'] = afmPath
+	
+	return plotSettings
+
+
+
+# === Pre-rendering ===
+def prerenderExperimentPlots(dataFolder, identifiers, experimentNumber, plotCount=PLOT_PRERENDER_COUNT, plotCache=None):
+	"""Render the highest priority plots of a device's experiment into the plot cache, with the settings the UI uses by default, so that
+	they load instantly the first time the experiment is opened. Plots that are already cached are skipped."""
+	from procedures import Device_History as DH
+	from utilities import PlotCacheUtility as pcu
+	plotCache = (plotCache) if(plotCache is not None) else (pcu.PlotCache())
+	
+	parameters = {'dataFolder':dataFolder, 'Identifiers':identifiers}
+	for plot in DH.plotsForExperiments(parameters, minExperiment=experimentNumber, maxExperiment=experimentNumber)[:plotCount]:
+		plotSettings = makePlotSettings(plot['type'], default_received_plot_settings, dataFolder, experimentNumber, experimentNumber)
+		key = plotCache.key(plot['type'], identifiers, plotSettings, dataFolder)
+		if(plotCache.get(key) is not None):
+			continue
+		try:
+			plotData = renderPlot(plot['type'], identifiers, plotSettings)
+			if(len(plotData) > 0):
+				plotCache.put(key, plotData)
+		except Exception as e:
+			print('[PRERENDER]: Unable to pre-render plot: ' + str(plot['type']))
+			print(e)
+
+def runPlotPrerender(jobs):
+	"""A target method for a pre-rendering process: call prerenderExperimentPlots() for each job (a dictionary of its arguments)."""
+	for job in jobs:
+		prerenderExperimentPlots(job['dataFolder'], job['identifiers'], job['experimentNumber'])
+
+
+
+# === Worker Process ===
+def runPlotRenderWorker(connection, renderFunction):
+	"""A target method for a worker process: render each job received on connection and send back its bytes (along with the statistics
+	of this process's device history cache), until the pool closes it."""
+	from utilities import DataLoggerUtility as dlu
+	while(True):
+		try:
+			job = connection.recv()
+		except (EOFError, OSError):
+			return
+		try:
+			result = {'data': renderFunction(**job)}
+		except Exception as e:
+			result = {'error': str(e)}
+		result['deviceHistoryCache'] = dlu.getDeviceHistoryCacheStats()
+		try:
+			connection.send(result)
+		except (EOFError, OSError):
+			return
@@ -0,0 +1,87 @@
+"""This module chooses and applies the compression for responses sent by the UI server, so that large JSON and CSV responses take less
+time to send over slow connections (e.g. remote desktop or a VPN to the lab computer). Responses are compressed with gzip or deflate, or
+with brotli when the 'brotli' package is installed and the browser accepts it. Streamed responses are compressed as they are sent."""
+
+# === Imports ===
+import gzip
+import zlib
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+
+
+# === Constants ===
+COMPRESSION_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSION_MIN_BYTES = 1024
+
+# Responses of any other type (e.g. PNG plots) are already compressed, or too small to be worth compressing
+COMPRESSIBLE_MIMETYPES = ['text/html', 'text/plain', 'text/csv', 'text/css', 'text/markdown', 'application/json', 'application/javascript', 'image/svg+xml']
+
+# Most preferred first, when the browser accepts more than one equally
+ENCODING_PREFERENCE = ['br', 'gzip', 'deflate']
+
+
+
+# === External API ===
+def negotiateEncoding(acceptEncoding, streaming=False):
+	"""Choose the encoding ('br', 'gzip', or 'deflate') to compress a response with, given the request's Accept-Encoding header, or None
+	if the browser accepts none of them. Brotli is only used if it is installed and the response is not streamed."""
+	acceptedQualities = parseAcceptEncoding(acceptEncoding)
+	bestEncoding = None
+	bestQuality = 0
+	for encoding in availableEncodings(streaming):
+		quality = acceptedQualities.get(encoding, acceptedQualities.get('*', 0))
+		if(quality > bestQuality):
+			bestEncoding = encoding
+			bestQuality = quality
+	return bestEncoding
+
+def compress(data, encoding):
+	"""Compress the bytes of an entire response with the given encoding."""
+	if(encoding == 'br'):
+		return brotli.compress(data, quality=BROTLI_QUALITY)
+	if(encoding == 'gzip'):
+		return gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+	if(encoding == 'deflate'):
+		return zlib.compress(data, COMPRESSION_LEVEL)
+	raise ValueError('Unsupported encoding: ' + str(encoding))
+
+def compressChunks(chunks, encoding, charset='utf-8'):
+	"""Compress a streamed response with the given encoding ('gzip' or 'deflate'), yielding compressed bytes as chunks are produced."""
+	if(encoding not in ['gzip', 'deflate']):
+		raise ValueError('Unsupported encoding for streamed responses: ' + str(encoding))
+	compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, (zlib.MAX_WBITS | 16) if(encoding == 'gzip') else (zlib.MAX_WBITS))
+	for chunk in chunks:
+		compressedChunk = compressor.compress(chunk.encode(charset) if(isinstance(chunk, str)) else chunk)
+		if(len(compressedChunk) > 0):
+			yield compressedChunk
+	yield compressor.flush()
+
+
+
+# === Internal ===
+def parseAcceptEncoding(acceptEncoding):
+	"""Private method. Map each encoding named in an Accept-Encoding header (e.g. 'gzip, deflate, br;q=0.5') to its quality."""
+	acceptedQualities = {}
+	for part in (acceptEncoding or '').split(','):
+		fields = part.split(';')
+		encoding = fields[0].strip().lower()
+		quality = 1.0
+		for field in fields[1:]:
+			name, separator, value = field.partition('=')
+			if(name.strip().lower() == 'q'):
+				try:
+					quality = float(value)
+				except ValueError:
+					quality = 0
+		if(encoding != ''):
+			acceptedQualities[encoding] = quality
+	return acceptedQualities
+
+def availableEncodings(streaming=False):
+	"""Private method. The encodings that can be used for a (streamed) response, most preferred first."""
+	return [encoding for encoding in ENCODING_PREFERENCE if((encoding != 'br') or ((brotli is not None) and not streaming))]
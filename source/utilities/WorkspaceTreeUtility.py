@@ -0,0 +1,162 @@
+"""This module keeps an in-memory copy of the folder structure of a workspace (plus small files that are read often, like index.json) so
+the UI does not have to crawl the workspace on every request. A watcher invalidates only the cached folders and files that change: it uses
+the 'watchdog' package when it is installed, and otherwise polls the modification times of everything in the cache."""
+
+# === Imports ===
+import os
+import threading
+import time
+
+try:
+	from watchdog.events import FileSystemEventHandler
+	from watchdog.observers import Observer
+except ImportError:
+	FileSystemEventHandler = object
+	Observer = None
+
+
+
+# === Constants ===
+WORKSPACE_TREE_POLL_INTERVAL = 2
+
+
+
+# === External API ===
+class WorkspaceTree:
+	"""Cache of the folders, modification times, and loaded files under rootPath. Every method takes the path of a folder or file as
+	its parts relative to rootPath (e.g. tree.listFolders(user, project)). Call start() to begin watching for changes."""
+	def __init__(self, rootPath, pollInterval=WORKSPACE_TREE_POLL_INTERVAL, useWatchdog=True):
+		self.rootPath = os.path.abspath(rootPath)
+		self.pollInterval = pollInterval
+		self.useWatchdog = useWatchdog
+		self.entries = {}
+		self.lock = threading.RLock()
+		self.hits = 0
+		self.misses = 0
+		self.invalidations = 0
+		self.lastInvalidationTime = None
+		self.watcher = None
+		self.observer = None
+		self.pollingThread = None
+		self.running = False
+
+	def listFolders(self, *parts):
+		"""Names of the folders in a folder (skipping hidden ones, like glob(os.path.join(folder, '*/')) does), or [] if it does not exist."""
+		listFolders = lambda path: [entry.name for entry in os.scandir(path) if(entry.is_dir() and not entry.name.startswith('.'))]
+		return list(self.cached(self.getPath(*parts), 'folders', listFolders, default=[]))
+
+	def modificationTime(self, *parts):
+		"""Modification time of a folder or file, or 0 if it does not exist."""
+		return self.cached(self.getPath(*parts), 'modificationTime', os.path.getmtime, default=0)
+
+	def loadFile(self, loadFunction, *parts):
+		"""The result of loadFunction(path) for a file, which is only called again once the file has changed. Returns None if it does not exist."""
+		return self.cached(self.getPath(*parts), loadFunction, loadFunction, default=None)
+
+	def invalidate(self, path):
+		"""Forget everything cached for path, the folder that contains it, and (if path is a folder) everything inside of it."""
+		path = os.path.normpath(path)
+		with self.lock:
+			if(path in self.entries):
+				descendantPrefix = path + os.sep
+				for cachedPath in [p for p in self.entries if(p.startswith(descendantPrefix))]:
+					del self.entries[cachedPath]
+			self.entries.pop(path, None)
+			self.entries.pop(os.path.dirname(path), None)
+			self.invalidations += 1
+			self.lastInvalidationTime = time.time()
+
+	def clear(self):
+		with self.lock:
+			self.entries = {}
+
+	def stats(self):
+		"""Metrics about the cache: how it is being watched, how many paths are cached, the age in seconds of the oldest cached path,
+		the number of hits, misses, and invalidations, and the time in seconds since the last invalidation."""
+		with self.lock:
+			now = time.time()
+			oldestLoadTime = min([entry['loadTime'] for entry in self.entries.values()] + [now])
+			return {
+				'watcher': self.watcher,
+				'entries': len(self.entries),
+				'age': now - oldestLoadTime,
+				'hits': self.hits,
+				'misses': self.misses,
+				'invalidations': self.invalidations,
+				'timeSinceLastInvalidation': (now - self.lastInvalidationTime) if(self.lastInvalidationTime is not None) else None,
+			}
+
+	def start(self):
+		"""Start watching rootPath for changes, with watchdog if possible and otherwise with a polling thread."""
+		if(self.running):
+			return
+		self.running = True
+		if(self.useWatchdog and (Observer is not None)):
+			try:
+				self.observer = Observer()
+				self.observer.schedule(WorkspaceTreeEventHandler(self), self.rootPath, recursive=True)
+				self.observer.daemon = True
+				self.observer.start()
+				self.watcher = 'watchdog'
+				return
+			except Exception as e:
+				print('Unable to watch workspace with watchdog, polling for changes instead: ' + str(self.rootPath))
+				print(e)
+				self.observer = None
+		self.pollingThread = threading.Thread(target=self.pollForChanges, daemon=True)
+		self.pollingThread.start()
+		self.watcher = 'polling'
+
+	def stop(self):
+		self.running = False
+		if(self.observer is not None):
+			self.observer.stop()
+			self.observer = None
+		self.watcher = None
+
+	# === Internal ===
+	def getPath(self, *parts):
+		return os.path.normpath(os.path.join(self.rootPath, *parts))
+
+	def cached(self, path, kind, load, default=None):
+		with self.lock:
+			entry = self.entries.get(path)
+			if((entry is not None) and (kind in entry['values'])):
+				self.hits += 1
+				return entry['values'][kind]
+			self.misses += 1
+
+		# The modification time is taken before loading so that a change made while loading is still noticed when polling
+		try:
+			modificationTime = os.path.getmtime(path)
+			value = load(path)
+		except OSError:
+			return default
+
+		with self.lock:
+			entry = self.entries.setdefault(path, {'modificationTime':modificationTime, 'loadTime':time.time(), 'values':{}})
+			entry['values'][kind] = value
+		return value
+
+	def pollForChanges(self):
+		while(self.running):
+			time.sleep(self.pollInterval)
+			with self.lock:
+				cachedModificationTimes = [(path, entry['modificationTime']) for path, entry in self.entries.items()]
+			for path, modificationTime in cachedModificationTimes:
+				try:
+					changed = (os.path.getmtime(path) != modificationTime)
+				except OSError:
+					changed = True
+				if(changed):
+					self.invalidate(path)
+
+class WorkspaceTreeEventHandler(FileSystemEventHandler):
+	"""Invalidates the parts of a WorkspaceTree touched by each filesystem event that watchdog reports."""
+	def __init__(self, tree):
+		self.tree = tree
+
+	def on_any_event(self, event):
+		self.tree.invalidate(event.src_path)
+		if(getattr(event, 'dest_path', None)):
+			self.tree.invalidate(event.dest_path)